@@ -1,5 +1,6 @@
 from app.models.document_extraction_model import DocumentIntelligenceAgentOutput
 from app.llm.builder import LLMProviderFactory
+from app.utils.tracing import span
 
 
 INVOICE_VALIDATION_PROMPT = """
@@ -51,13 +52,14 @@ business discrepancies based on specific organizational rules.
 
 async def validate_invoice(invoice_str: str) -> DocumentIntelligenceAgentOutput:
 
-    # Prepare the input for the prompt
-    prompt_load = {
-        "INVOICE_DETAILS": invoice_str,
-    }
+    with span("prompt.build"):
+        # Prepare the input for the prompt
+        prompt_load = {
+            "INVOICE_DETAILS": invoice_str,
+        }
 
-    # Format the prompt using the template
-    prompt = INVOICE_VALIDATION_PROMPT.format(**prompt_load)
+        # Format the prompt using the template
+        prompt = INVOICE_VALIDATION_PROMPT.format(**prompt_load)
 
     # Invoke the LLM with the formatted prompt
     llm = LLMProviderFactory.groq()
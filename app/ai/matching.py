@@ -1,8 +1,26 @@
+import time
+from typing import Dict, Optional
+
+from app.ai.payload import (
+    compact_invoice,
+    compact_tier_results,
+    prompt_size_report,
+    to_json,
+)
 from app.models.matching_model import MatchingAgentOutput
+from app.core.config import (
+    MATCHING_FAST_PATH_ENABLED,
+    MATCHING_TIER_MODE,
+    MATCHING_TIER_WORKERS,
+    PAIRING_MODE_PRIMARY,
+    PAIRING_MODE_SECONDARY,
+    PAIRING_MODE_TERTIARY,
+)
 from app.llm.builder import LLMProviderFactory
-from app.matching.primary import primary_matching
-from app.matching.secondary import secondary_matching
-from app.matching.tertiary import tertiary_matching
+from app.matching.context import MatchingContext
+from app.matching.fast_path import build_matching_output
+from app.matching.tiers import run_matching_tiers
+from app.utils.tracing import span
 from app.models.invoice_extraction_model import InvoiceExtractionResults
 
 
@@ -32,6 +50,12 @@ You MUST NOT reinterpret, invalidate, or override them.
 - SECONDARY_MATCH (supplier_date_product): {SECONDARY_MATCH}
 - TERTIARY_MATCH (product_only): {TERTIARY_MATCH}
 
+- PURCHASE_ORDERS (keyed by po_number): {PURCHASE_ORDERS}
+
+Match inputs reference a PO by its po_number in PURCHASE_ORDERS. In a pairing
+result, `invoice_line` / `po_line` and the unmatched line lists are 0-based
+indices into the invoice's and that PO's `line_items`.
+
 
 # MATCH SELECTION POLICY (STRICT PRIORITY)
 
@@ -240,38 +264,68 @@ Explain the decision path clearly.
 """
 
 
+def matching_prompt_load(
+    extracted_invoice: InvoiceExtractionResults,
+    tier_results: Dict[str, Optional[dict]],
+) -> Dict[str, str]:
+    """Prompt sections as minified JSON, each PO record emitted once."""
+    compact_tiers, purchase_orders = compact_tier_results(extracted_invoice, tier_results)
+    return {
+        "EXTRACTED_INVOICE": to_json(compact_invoice(extracted_invoice)),
+        "PRIMARY_MATCH": to_json(compact_tiers["primary"]),
+        "SECONDARY_MATCH": to_json(compact_tiers["secondary"]),
+        "TERTIARY_MATCH": to_json(compact_tiers["tertiary"]),
+        "PURCHASE_ORDERS": to_json(purchase_orders),
+    }
+
+
 async def match_invoice_with_db(
     extracted_invoice: InvoiceExtractionResults,
+    context: MatchingContext | None = None,
 ) -> MatchingAgentOutput:
-
-    primary_match_result, secondary_match_result, tertiary_match_result = (
-        None,
-        None,
-        None,
+    ## One cache for all tiers (and, via the graph state, the validator)
+    context = context or MatchingContext(extracted_invoice)
+
+    ## Primary, then Secondary if Primary fails, then Tertiary if Secondary fails;
+    ## with a thread / process tier mode all three race and lower tiers get cancelled
+    tier_results = await run_matching_tiers(
+        extracted_invoice,
+        context,
+        pairing_modes={
+            "primary": PAIRING_MODE_PRIMARY,
+            "secondary": PAIRING_MODE_SECONDARY,
+            "tertiary": PAIRING_MODE_TERTIARY,
+        },
+        mode=MATCHING_TIER_MODE,
+        max_workers=MATCHING_TIER_WORKERS,
     )
 
-    ## Carry Out Primary Search
-    primary_match_result = primary_matching(extracted_invoice)
-    ## Fallback to Secondary if Primary Fails
-    if not primary_match_result.get("matched"):
-        secondary_match_result = secondary_matching(extracted_invoice)
-        if not secondary_match_result.get("matched"):
-            ## Fallback to Tertiary if Secondary Fails
-            tertiary_match_result = tertiary_matching(extracted_invoice)
-
-    # Prepare the input for the prompt
-    prompt_load = {
-        "EXTRACTED_INVOICE": extracted_invoice,
-        "PRIMARY_MATCH": primary_match_result,
-        "SECONDARY_MATCH": secondary_match_result,
-        "TERTIARY_MATCH": tertiary_match_result,
-    }
+    starttime = time.perf_counter()
+
+    ## Unambiguous tier results don't need the decision agent
+    if MATCHING_FAST_PATH_ENABLED:
+        with span("matching.fast_path"):
+            result = build_matching_output(extracted_invoice, tier_results)
+        if result is not None:
+            context.decision = "fast_path"
+            context.decision_sec = round(time.perf_counter() - starttime, 3)
+            return result
+
+    with span("prompt.build"):
+        # Prepare the input for the prompt
+        prompt_load = matching_prompt_load(extracted_invoice, tier_results)
+        print(
+            "[Matching Prompt]: ~tokens",
+            prompt_size_report(MATCHING_DECISION_AGENT_PROMPT, prompt_load),
+        )
 
-    # Format the prompt using the template
-    prompt = MATCHING_DECISION_AGENT_PROMPT.format(**prompt_load)
+        # Format the prompt using the template
+        prompt = MATCHING_DECISION_AGENT_PROMPT.format(**prompt_load)
 
     # Invoke the LLM with the formatted prompt
     llm = LLMProviderFactory.groq()
     result = await llm.invoke(prompt, MatchingAgentOutput)
 
+    context.decision = "llm"
+    context.decision_sec = round(time.perf_counter() - starttime, 3)
     return result
@@ -0,0 +1,156 @@
+import json
+import string
+from typing import Dict, Iterable, Optional
+
+from pydantic import BaseModel
+
+from app.models.invoice_extraction_model import InvoiceExtractionResults
+from app.utils.db_helpers import find_po_by_number
+
+## Rough chars-per-token of JSON / English text for Llama-family tokenizers
+CHARS_PER_TOKEN = 4
+
+## Invoice fields the matching and audit prompts actually read
+INVOICE_FIELDS = (
+    "invoice_number",
+    "invoice_date",
+    "supplier_name",
+    "po_number",
+    "currency",
+    "line_items",
+    "totals",
+)
+LINE_ITEM_FIELDS = ("item_id", "description", "quantity", "unit_price", "line_total")
+
+
+def _plain(value):
+    """JSON-ready copy of `value` with models dumped and None values dropped."""
+    if isinstance(value, BaseModel):
+        value = value.model_dump(mode="json")
+    if isinstance(value, dict):
+        return {
+            key: _plain(item)
+            for key, item in value.items()
+            if item is not None
+        }
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    return value
+
+
+def to_json(value) -> str:
+    """Minified JSON for a prompt section."""
+    return json.dumps(_plain(value), separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _pick(record: dict, fields: Iterable[str]) -> dict:
+    return {field: record[field] for field in fields if field in record}
+
+
+def compact_invoice(invoice: InvoiceExtractionResults) -> dict:
+    """The invoice without the fields no prompt reads (address, VAT no., bill-to, per-line confidence)."""
+    record = _pick(invoice.model_dump(mode="json"), INVOICE_FIELDS)
+    record["line_items"] = [_pick(line, LINE_ITEM_FIELDS) for line in record["line_items"]]
+    return record
+
+
+def _line_index(lines: list, item: dict) -> Optional[int]:
+    for index, line in enumerate(lines):
+        if line is item or line == item:
+            return index
+    return None
+
+
+def compact_pairing(pairing_result: dict, invoice_lines: list, po_lines: list) -> dict:
+    """
+    A pairing result with every line item replaced by its 0-based index into
+    the invoice's / PO's line_items, instead of a full copy of the line.
+    """
+    return {
+        "pairs": [
+            {
+                "invoice_line": _line_index(invoice_lines, pair["invoice_item"]),
+                "po_line": _line_index(po_lines, pair["po_item"]),
+                "match_score": pair["match_score"],
+                "matched_by": pair["matched_by"],
+            }
+            for pair in pairing_result["pairs"]
+        ],
+        "unmatched_invoice_lines": [
+            _line_index(invoice_lines, item)
+            for item in pairing_result["unmatched_invoice_items"]
+        ],
+        "unmatched_po_lines": [
+            _line_index(po_lines, item)
+            for item in pairing_result["unmatched_database_queried_po_items"]
+        ],
+        "match_ratio": round(pairing_result["match_ratio"], 3),
+    }
+
+
+def compact_tier_results(
+    invoice: InvoiceExtractionResults,
+    tier_results: Dict[str, Optional[dict]],
+) -> tuple:
+    """
+    Tier results for the matching prompt with each PO record emitted once.
+
+    Candidates reference their PO by po_number; the records themselves are
+    collected, de-duplicated, in the returned purchase_orders dict. Paired
+    lines are indices (see `compact_pairing`).
+
+    Returns:
+        ({ tier: compact result | None }, { po_number: PO record })
+    """
+    invoice_lines = [line.model_dump() for line in invoice.line_items]
+    purchase_orders = {}
+
+    def reference(po: dict) -> str:
+        purchase_orders.setdefault(po.get("po_number"), po)
+        return po.get("po_number")
+
+    compact = {}
+    for tier, result in tier_results.items():
+        if result is None:
+            compact[tier] = None
+            continue
+
+        result = dict(result)
+        ## Primary results carry no PO record; it's the one the invoice references
+        po = find_po_by_number(invoice.po_number) if tier == "primary" else None
+        if po is not None:
+            reference(po)
+        if "pairing_result" in result and po is not None:
+            result["pairing_result"] = compact_pairing(
+                result["pairing_result"], invoice_lines, po.get("line_items", [])
+            )
+
+        if "candidates" in result:
+            result["candidates"] = [
+                {
+                    **candidate,
+                    "matched_po": reference(candidate["matched_po"]),
+                    "pairing_result": compact_pairing(
+                        candidate["pairing_result"],
+                        invoice_lines,
+                        candidate["matched_po"].get("line_items", []),
+                    ),
+                }
+                for candidate in result["candidates"]
+            ]
+        compact[tier] = result
+
+    return compact, purchase_orders
+
+
+def prompt_size_report(template: str, sections: Dict[str, str]) -> dict:
+    """Estimated tokens of the template text and of each filled-in section."""
+    fixed = "".join(literal for literal, *_ in string.Formatter().parse(template))
+    report = {"template": estimate_tokens(fixed)}
+    report.update({name: estimate_tokens(text) for name, text in sections.items()})
+    report["total"] = sum(report.values())
+    return report
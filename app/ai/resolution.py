@@ -2,9 +2,13 @@ from app.models.validation_model import ValidationAgentOutput
 from app.models.resolution_model import ResolutionAgentOutput
 from typing import Optional
 from app.llm.builder import LLMProviderFactory
+from app.ai.payload import prompt_size_report, to_json
 from app.models.document_extraction_model import DocumentIntelligenceAgentOutput
 from app.models.matching_model import MatchingAgentOutput
-import json
+import time
+from app.core.config import RESOLUTION_RULES_ENABLED
+from app.resolution.rules import Findings, resolve_by_rules
+from app.utils.tracing import span
 
 RESOLUTION_AGENT_PROMPT = """
 # ROLE
@@ -44,13 +48,12 @@ Return a valid JSON object matching the `ResolutionAgentOutput` schema.
 """
 
 
-async def resolve_invoice_findings(
+def gather_findings(
     extraction_results: Optional[DocumentIntelligenceAgentOutput],
     matching_results: Optional[MatchingAgentOutput],
     validation_results: Optional[ValidationAgentOutput],
-) -> ResolutionAgentOutput:
-
-    # 1. Collect all discrepancies from whatever nodes actually ran
+) -> Findings:
+    """Collects all discrepancies from whatever nodes actually ran."""
     discrepancies = []
     nodes_run = []
 
@@ -69,38 +72,64 @@ async def resolve_invoice_findings(
         if validation_results.discrepancies:
             discrepancies.extend(validation_results.discrepancies)
 
-    # If we didn't reach validation, it's an automatic 'escalate' in spirit
-    pipeline_reached_end = "validation" in nodes_run
+    return Findings(
+        extraction_results, matching_results, validation_results, discrepancies, nodes_run
+    )
 
-    # 2. Creative Evidence Bundle
-    evidence_bundle = {
+
+def evidence_bundle(findings: Findings) -> dict:
+    """What the resolution agent sees of each node's output, keyed by prompt section."""
+    return {
         "extraction_summary": (
-            extract_valid_document_states(extraction_results)
-            if extraction_results
+            extract_valid_document_states(findings.extraction)
+            if findings.extraction
             else "NOT_PERFORMED"
         ),
         "matching_summary": (
-            extract_valid_matching_states(matching_results)
-            if matching_results
+            extract_valid_matching_states(findings.matching)
+            if findings.matching
             else "NOT_PERFORMED"
         ),
         "validation_summary": (
-            extract_valid_validation_states(validation_results)
-            if validation_results
+            extract_valid_validation_states(findings.validation)
+            if findings.validation
             else "NOT_PERFORMED"
         ),
-        "discrepancies": [d.model_dump() for d in discrepancies],
+        "discrepancies_list": [d.model_dump() for d in findings.discrepancies],
+    }
+
+
+def resolution_prompt_load(findings: Findings) -> dict:
+    """Prompt sections as minified JSON."""
+    return {
+        section.upper(): to_json(evidence)
+        for section, evidence in evidence_bundle(findings).items()
     }
 
-    # 3. Preparation of Payload
-    prompt = RESOLUTION_AGENT_PROMPT.format(
-        EXTRACTION_SUMMARY=evidence_bundle["extraction_summary"],
-        MATCHING_SUMMARY=evidence_bundle["matching_summary"],
-        VALIDATION_SUMMARY=evidence_bundle["validation_summary"],
-        DISCREPANCIES_LIST=evidence_bundle["discrepancies"],
-    )
 
-    # 4. Invoke the LLM with the formatted prompt
+async def resolve_invoice_findings(
+    extraction_results: Optional[DocumentIntelligenceAgentOutput],
+    matching_results: Optional[MatchingAgentOutput],
+    validation_results: Optional[ValidationAgentOutput],
+) -> ResolutionAgentOutput:
+
+    # 1. Collect all discrepancies from whatever nodes actually ran
+    findings = gather_findings(extraction_results, matching_results, validation_results)
+    discrepancies, nodes_run = findings.discrepancies, findings.nodes_run
+
+    # If we didn't reach validation, it's an automatic 'escalate' in spirit
+    pipeline_reached_end = "validation" in nodes_run
+
+    # 2. Evidence Bundle, as minified JSON
+    with span("prompt.build"):
+        prompt_load = resolution_prompt_load(findings)
+        print(
+            "[Resolution Prompt]: ~tokens",
+            prompt_size_report(RESOLUTION_AGENT_PROMPT, prompt_load),
+        )
+        prompt = RESOLUTION_AGENT_PROMPT.format(**prompt_load)
+
+    # 3. Invoke the LLM with the formatted prompt
     llm = LLMProviderFactory.groq()
 
     final_state = await llm.invoke(prompt, ResolutionAgentOutput)
@@ -122,6 +151,34 @@ async def resolve_invoice_findings(
     return final_state
 
 
+async def decide_resolution(
+    extraction_results: Optional[DocumentIntelligenceAgentOutput],
+    matching_results: Optional[MatchingAgentOutput],
+    validation_results: Optional[ValidationAgentOutput],
+) -> tuple:
+    """
+    Resolves from the rules table when it covers the findings (forced
+    escalations, fully clean runs), otherwise asks the resolution agent.
+
+    Returns:
+        (ResolutionAgentOutput, "rules" | "llm", decision_sec)
+    """
+    starttime = time.perf_counter()
+
+    if RESOLUTION_RULES_ENABLED:
+        with span("resolution.rules"):
+            result = resolve_by_rules(
+                gather_findings(extraction_results, matching_results, validation_results)
+            )
+        if result is not None:
+            return result, "rules", round(time.perf_counter() - starttime, 3)
+
+    result = await resolve_invoice_findings(
+        extraction_results, matching_results, validation_results
+    )
+    return result, "llm", round(time.perf_counter() - starttime, 3)
+
+
 ## HELPER FUNCS TO CREATE PAYLOAD
 
 def extract_valid_document_states(doc_state: DocumentIntelligenceAgentOutput):
@@ -1,8 +1,19 @@
+import time
+from typing import Dict
+
+from app.ai.payload import compact_invoice, prompt_size_report, to_json
 from app.models.validation_model import ValidationAgentOutput
+from app.core.config import VALIDATION_RULES_ENABLED
 from app.llm.builder import LLMProviderFactory
 from app.utils.db_helpers import find_po_by_number
-from app.validation.validator import validate_invoice_wrt_po
+from app.validation.rules import build_validation_output
+from app.validation.validator import (
+    ITEM_DESCRIPTION_SIMILARITY_THRESHOLD,
+    validate_invoice_wrt_po,
+)
 from app.models.invoice_extraction_model import InvoiceExtractionResults
+from app.matching.context import MatchingContext
+from app.utils.tracing import span
 
 AUDIT_VALIDATION_PROMPT = """
 ## ROLE
@@ -189,21 +200,57 @@ Do NOT change field names.
 """
 
 
-async def validate_invoice_with_po(
-    invoice: InvoiceExtractionResults, matched_po_number: str
-) -> ValidationAgentOutput:
-
-    # Prepare the input for the prompt
-    prompt_load = {
-        "INVOICE_DETAILS": invoice.model_dump(),
-        "PO_RECORD": find_po_by_number(matched_po_number),
-        "VALIDATION_RESULT": validate_invoice_wrt_po(invoice, matched_po_number),
+def validation_prompt_load(
+    invoice: InvoiceExtractionResults,
+    po: dict | None,
+    validation_result: dict,
+) -> Dict[str, str]:
+    """Prompt sections as minified JSON."""
+    return {
+        "INVOICE_DETAILS": to_json(compact_invoice(invoice)),
+        "PO_RECORD": to_json(po),
+        "VALIDATION_RESULT": to_json(validation_result),
     }
 
-    # Format the prompt using the template
-    prompt = AUDIT_VALIDATION_PROMPT.format(**prompt_load)
+
+async def validate_invoice_with_po(
+    invoice: InvoiceExtractionResults,
+    matched_po_number: str,
+    context: MatchingContext | None = None,
+) -> ValidationAgentOutput:
+    context = context or MatchingContext(invoice)
+
+    po = find_po_by_number(matched_po_number)
+    with span("validation.validator", po_number=matched_po_number):
+        validation_result = validate_invoice_wrt_po(invoice, matched_po_number, context=context)
+
+    starttime = time.perf_counter()
+
+    ## Reports the rules can classify don't need the audit agent
+    if VALIDATION_RULES_ENABLED and po is not None:
+        with span("validation.rules"):
+            pairs = context.pair_with_po(po, ITEM_DESCRIPTION_SIMILARITY_THRESHOLD)["pairs"]
+            result = build_validation_output(invoice, po, validation_result, pairs)
+        if result is not None:
+            context.validation_decision = "rules"
+            context.validation_decision_sec = round(time.perf_counter() - starttime, 3)
+            return result
+
+    with span("prompt.build"):
+        # Prepare the input for the prompt
+        prompt_load = validation_prompt_load(invoice, po, validation_result)
+        print(
+            "[Validation Prompt]: ~tokens",
+            prompt_size_report(AUDIT_VALIDATION_PROMPT, prompt_load),
+        )
+
+        # Format the prompt using the template
+        prompt = AUDIT_VALIDATION_PROMPT.format(**prompt_load)
 
     # Invoke the LLM with the formatted prompt
     llm = LLMProviderFactory.groq()
+    result = await llm.invoke(prompt, ValidationAgentOutput)
 
-    return await llm.invoke(prompt, ValidationAgentOutput)
+    context.validation_decision = "llm"
+    context.validation_decision_sec = round(time.perf_counter() - starttime, 3)
+    return result
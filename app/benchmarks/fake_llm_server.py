@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  ## Default backlog of 5 stalls bursts of concurrent connects
+
+
+class FakeChatCompletionServer:
+    """
+    Minimal OpenAI/Groq compatible `chat/completions` endpoint served on localhost.
+
+    Every request sleeps for `latency_sec` and answers with `content` as the
+    assistant message, which lets benchmarks measure client-side concurrency
+    without touching the network or burning API quota.
+    """
+
+    def __init__(self, content: str, latency_sec: float = 0.5):
+        self.content = content
+        self.latency_sec = latency_sec
+        self.request_count = 0
+        self.connection_count = 0
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._build_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _build_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  ## Keep-alive, so connection reuse is observable
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connection_count += 1
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+
+                with server._lock:
+                    server.request_count += 1
+
+                time.sleep(server.latency_sec)
+
+                body = json.dumps(
+                    {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": "fake-model",
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {"role": "assistant", "content": server.content},
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": {
+                            "prompt_tokens": length // 4,
+                            "completion_tokens": len(server.content) // 4,
+                            "total_tokens": (length + len(server.content)) // 4,
+                        },
+                    }
+                ).encode("utf-8")
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                ## Silence per-request logging
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeChatCompletionServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
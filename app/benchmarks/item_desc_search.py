@@ -0,0 +1,172 @@
+"""
+Micro-benchmark for tertiary candidate search: full line scan vs. the description index.
+
+    uv run -m app.benchmarks.item_desc_search --lines 500000 --descriptions 5000 --catalogue 800
+"""
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+from app.benchmarks.supplier_search import legacy_similarity
+from app.benchmarks.synthetic import (
+    NOISE_LEVELS,
+    generate_catalogue,
+    generate_invoices,
+    generate_item_descriptions,
+    generate_purchase_orders,
+    noisy_variant,
+)
+from app.utils.db import DB_PATH, set_db
+from app.utils.db_helpers import find_pos_by_item_desc
+
+OUTPUT_DIR = Path(__file__).resolve().parent.parent.parent / "output"
+
+
+def linear_find_pos_by_item_desc(
+    purchase_orders: list, invoice_items: list, confidence_threshold: float = 0.6
+):
+    ## The previous implementation of find_pos_by_item_desc
+    all_candidate_matches = []
+
+    for po in purchase_orders:
+        matched_scores = []
+        available_po_items = po.get("line_items", []).copy()
+
+        for inv_item in invoice_items:
+            best_score_for_this_inv_line = 0
+            best_po_line_idx = -1
+
+            for i, po_item in enumerate(available_po_items):
+                score = legacy_similarity(
+                    inv_item.get("description"), po_item.get("description")
+                )
+                if score > best_score_for_this_inv_line:
+                    best_score_for_this_inv_line = score
+                    best_po_line_idx = i
+
+            if best_score_for_this_inv_line > confidence_threshold:
+                matched_scores.append(best_score_for_this_inv_line)
+                available_po_items.pop(best_po_line_idx)
+
+        if matched_scores:
+            all_candidate_matches.append(
+                {
+                    "total_score": sum(matched_scores) / len(invoice_items),
+                    "original_po": po,
+                }
+            )
+
+    all_candidate_matches.sort(key=lambda x: x["total_score"], reverse=True)
+    return [candidate["original_po"] for candidate in all_candidate_matches]
+
+
+def compare(purchase_orders: list, invoices: list) -> dict:
+    set_db(purchase_orders)
+
+    starttime = time.perf_counter()
+    expected = [linear_find_pos_by_item_desc(purchase_orders, items) for items in invoices]
+    scan_sec = (time.perf_counter() - starttime) / len(invoices)
+
+    starttime = time.perf_counter()
+    actual = [find_pos_by_item_desc(items) for items in invoices]
+    index_sec = (time.perf_counter() - starttime) / len(invoices)
+
+    mismatches = sum(
+        [id(po) for po in e] != [id(po) for po in a] for e, a in zip(expected, actual)
+    )
+    return {"scan_sec": scan_sec, "index_sec": index_sec, "mismatches": mismatches}
+
+
+def sample_invoices() -> list:
+    """Line items of the extracted invoices in output/."""
+    invoices = []
+    for path in sorted(OUTPUT_DIR.glob("*.json")):
+        with path.open("r", encoding="utf-8") as f:
+            output = json.load(f)
+        extracted = output["processing_results"]["document_intelligence"]["extracted_data"]
+        invoices.append(extracted.get("line_items", []))
+    return invoices
+
+
+def synthetic_invoices(purchase_orders: list, count: int, rng: random.Random) -> list:
+    """Invoices copied from random POs with noisy descriptions, plus some unknown lines."""
+    invoices = []
+    for _ in range(count):
+        po = rng.choice(purchase_orders)
+        items = [
+            {"item_id": "", "description": noisy_variant(line["description"], rng)}
+            for line in po["line_items"]
+        ]
+        items.append({"item_id": "", "description": "Carriage and Packaging"})
+        invoices.append(items)
+    return invoices
+
+
+def print_row(label: str, build_sec: float, result: dict):
+    print(
+        f"{label:>14} | {build_sec * 1e3:>10.1f}ms | {result['scan_sec'] * 1e3:>11.1f}ms | "
+        f"{result['index_sec'] * 1e3:>12.2f}ms | {result['mismatches']:>10} | "
+        f"{result['scan_sec'] / result['index_sec']:,.0f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, default=500_000)
+    parser.add_argument("--descriptions", type=int, default=5_000)
+    parser.add_argument("--invoices", type=int, default=5)
+    parser.add_argument(
+        "--catalogue", type=int, default=800, help="POs of the noisy product-only catalogue"
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'catalogue':>14} | {'build index':>12} | {'scan / inv':>13} | "
+        f"{'index / inv':>14} | {'mismatches':>10} | speed-up"
+    )
+
+    ## Accuracy and speed on the shipped catalogue and extracted invoices
+    with open(DB_PATH, "r", encoding="utf-8") as f:
+        purchase_orders = json.load(f)["purchase_orders"]
+    invoices = sample_invoices()
+    if invoices:
+        starttime = time.perf_counter()
+        set_db(purchase_orders)
+        print_row("sample", time.perf_counter() - starttime, compare(purchase_orders, invoices))
+
+    ## Synthetic catalogue, ~3 lines per PO
+    rng = random.Random(7)
+    purchase_orders = generate_purchase_orders(
+        args.lines // 3, descriptions=generate_item_descriptions(args.descriptions)
+    )
+    line_count = sum(len(po["line_items"]) for po in purchase_orders)
+
+    starttime = time.perf_counter()
+    set_db(purchase_orders)
+    build_sec = time.perf_counter() - starttime
+
+    invoices = synthetic_invoices(purchase_orders, args.invoices, rng)
+    print_row(f"{line_count} lines", build_sec, compare(purchase_orders, invoices))
+
+    ## Product-only invoices (the tertiary tier's case) at every noise level, over
+    ## description families whose near-duplicates stress the candidate bound
+    purchase_orders = generate_catalogue(args.catalogue)
+    starttime = time.perf_counter()
+    set_db(purchase_orders)
+    build_sec = time.perf_counter() - starttime
+
+    for level, noise in NOISE_LEVELS.items():
+        invoices = [
+            [line.model_dump() for line in invoice.line_items]
+            for invoice, _ in generate_invoices(
+                purchase_orders, args.invoices * 3, "product_only", noise=noise
+            )
+        ]
+        print_row(f"{level} noise", build_sec, compare(purchase_orders, invoices))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Micro-benchmark for invoice-to-PO line pairing: pair-by-pair loop vs. batched score matrix.
+
+    uv run -m app.benchmarks.line_pairing --lines 10 50 300 600
+"""
+
+import argparse
+import random
+import time
+
+from app.benchmarks.synthetic import generate_item_descriptions, noisy_variant
+from app.utils.helpers import pair_invoice_items_to_po_items, reset_similarity_stats
+
+
+def delivery_lines(count: int, rng: random.Random) -> tuple:
+    """A PO with `count` lines and an invoice for most of it: shuffled, noisy, some ids missing."""
+    descriptions = generate_item_descriptions(max(count, 8), seed=rng.randint(0, 10**6))
+    po_items = [
+        {
+            "item_id": f"ITM-{i:04d}",
+            "description": rng.choice(descriptions),
+            "quantity": rng.randint(1, 200),
+            "unit_price": round(rng.uniform(1, 250), 2),
+        }
+        for i in range(count)
+    ]
+
+    invoice_items = []
+    for po_item in rng.sample(po_items, int(count * 0.9)):
+        invoice_items.append(
+            {
+                "item_id": po_item["item_id"] if rng.random() < 0.3 else "",
+                "description": noisy_variant(po_item["description"], rng),
+                "quantity": po_item["quantity"],
+                "unit_price": po_item["unit_price"],
+            }
+        )
+    invoice_items.append({"item_id": "", "description": "Carriage and Packaging"})
+    return invoice_items, po_items
+
+
+def time_engine(engine: str, invoice_items: list, po_items: list, repeats: int) -> tuple:
+    results = []
+    starttime = time.perf_counter()
+    for _ in range(repeats):
+        ## Cold memo each run, so the loop does not win on repeated pairs
+        reset_similarity_stats()
+        results.append(pair_invoice_items_to_po_items(invoice_items, po_items, engine=engine))
+    return (time.perf_counter() - starttime) / repeats, results[-1]
+
+
+def same_result(a: dict, b: dict) -> bool:
+    def signature(result):
+        return (
+            [(id(p["invoice_item"]), id(p["po_item"]), p["match_score"], p["matched_by"]) for p in result["pairs"]],
+            [id(item) for item in result["unmatched_invoice_items"]],
+            [id(item) for item in result["unmatched_database_queried_po_items"]],
+            result["match_ratio"],
+        )
+
+    return signature(a) == signature(b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, nargs="+", default=[10, 50, 300, 600])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    print(f"{'PO lines':>9} | {'invoice lines':>13} | {'loop':>10} | {'matrix':>10} | {'same':>5} | speed-up")
+
+    for count in args.lines:
+        invoice_items, po_items = delivery_lines(count, rng)
+        loop_sec, loop_result = time_engine("loop", invoice_items, po_items, args.repeats)
+        matrix_sec, matrix_result = time_engine("matrix", invoice_items, po_items, args.repeats)
+
+        print(
+            f"{len(po_items):>9} | {len(invoice_items):>13} | {loop_sec * 1e3:>8.1f}ms | "
+            f"{matrix_sec * 1e3:>8.1f}ms | {str(same_result(loop_result, matrix_result)):>5} | "
+            f"{loop_sec / matrix_sec:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measures how well concurrent invoices overlap their LLM network waits.
+
+Runs N concurrent structured LLM calls against a local fake Groq endpoint
+with a fixed per-request latency, once through the async provider and once
+through a blocking client call (the previous behaviour), and prints the
+wall time of each.
+
+    uv run -m app.benchmarks.llm_concurrency --invoices 50 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import time
+
+from groq import Groq
+from pydantic import BaseModel
+from app.benchmarks.fake_llm_server import FakeChatCompletionServer
+from app.llm.builder import GroqStructuredLLM, parse_structured_output
+
+
+class BenchmarkOutput(BaseModel):
+    invoice_number: str
+
+
+async def run_async_provider(base_url: str, invoices: int) -> float:
+    llm = GroqStructuredLLM(api_key="fake-key", model="fake-model", base_url=base_url)
+
+    starttime = time.perf_counter()
+    await asyncio.gather(
+        *(llm.invoke(f"Invoice {i}", BenchmarkOutput) for i in range(invoices))
+    )
+    return time.perf_counter() - starttime
+
+
+async def run_blocking_provider(base_url: str, invoices: int) -> float:
+    ## Reproduces the old provider: `async def` wrapping a synchronous client call
+    client = Groq(api_key="fake-key", base_url=base_url)
+
+    async def blocking_invoke(prompt: str) -> BenchmarkOutput:
+        completion = client.chat.completions.create(
+            model="fake-model",
+            messages=[{"role": "user", "content": prompt}],
+        )
+        return parse_structured_output(
+            completion.choices[0].message.content, BenchmarkOutput
+        )
+
+    starttime = time.perf_counter()
+    await asyncio.gather(*(blocking_invoke(f"Invoice {i}") for i in range(invoices)))
+    return time.perf_counter() - starttime
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--invoices", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument(
+        "--skip-blocking",
+        action="store_true",
+        help="Only run the async provider (the blocking run takes invoices x latency).",
+    )
+    args = parser.parse_args()
+
+    content = BenchmarkOutput(invoice_number="INV-0001").model_dump_json()
+
+    with FakeChatCompletionServer(content, latency_sec=args.latency) as server:
+        async_wall = await run_async_provider(server.base_url, args.invoices)
+        blocking_wall = (
+            None
+            if args.skip_blocking
+            else await run_blocking_provider(server.base_url, args.invoices)
+        )
+
+    print(f"Concurrent invoices: {args.invoices} | Per-call latency: {args.latency}s")
+    print(f"  Async provider:    {async_wall:.2f}s wall")
+    if blocking_wall is not None:
+        print(f"  Blocking provider: {blocking_wall:.2f}s wall")
+        print(f"  Speed-up:          {blocking_wall / async_wall:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""
+Counts TCP connection setups per invoice for the LLM provider layer.
+
+Replays the per-invoice call pattern of the workflow (one OCR call plus the
+four structured agent calls) against a local fake Groq endpoint, first with
+a fresh client per call (the previous factory behaviour) and then with the
+pooled clients from `LLMProviderFactory`.
+
+    uv run -m app.benchmarks.llm_connections --invoices 20 --concurrency 5
+"""
+
+import argparse
+import asyncio
+import os
+
+from pydantic import BaseModel
+from app.benchmarks.fake_llm_server import FakeChatCompletionServer
+
+STRUCTURED_CALLS_PER_INVOICE = 4  ## extraction, matching, validation, resolution
+OCR_CALLS_PER_INVOICE = 1
+
+
+class BenchmarkOutput(BaseModel):
+    invoice_number: str
+
+
+async def run_invoices(invoices: int, concurrency: int, get_structured, get_image):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_invoice(i: int):
+        async with semaphore:
+            for _ in range(OCR_CALLS_PER_INVOICE):
+                await get_image().invoke(request=f"Invoice {i}", base64_image="AAAA")
+            for _ in range(STRUCTURED_CALLS_PER_INVOICE):
+                ## Repeated prompts must reach the server, not the response cache
+                await get_structured().invoke(f"Invoice {i}", BenchmarkOutput, use_cache=False)
+
+    await asyncio.gather(*(one_invoice(i) for i in range(invoices)))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--invoices", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    content = BenchmarkOutput(invoice_number="INV-0001").model_dump_json()
+
+    with FakeChatCompletionServer(content, latency_sec=args.latency) as server:
+        ## The factory reads its endpoint from config at import time
+        os.environ["GROQ_BASE_URL"] = server.base_url
+        from app.llm.builder import GroqImageLLM, GroqStructuredLLM, LLMProviderFactory
+
+        ## Before: a brand-new client (and connection pool) for every call
+        unpooled_clients = []
+
+        def fresh_structured():
+            client = GroqStructuredLLM("fake-key", "fake-model", base_url=server.base_url)
+            unpooled_clients.append(client)
+            return client
+
+        def fresh_image():
+            client = GroqImageLLM("fake-key", "fake-model", base_url=server.base_url)
+            unpooled_clients.append(client)
+            return client
+
+        await run_invoices(args.invoices, args.concurrency, fresh_structured, fresh_image)
+        for client in unpooled_clients:
+            await client.aclose()
+        unpooled_connections = server.connection_count
+
+        ## After: pooled, long-lived clients from the factory
+        server.connection_count = 0
+        LLMProviderFactory.startup()
+        try:
+            await run_invoices(
+                args.invoices,
+                args.concurrency,
+                LLMProviderFactory.groq,
+                LLMProviderFactory.groqImage,
+            )
+        finally:
+            await LLMProviderFactory.shutdown()
+        pooled_connections = server.connection_count
+
+    print(
+        f"Invoices: {args.invoices} | Concurrency: {args.concurrency} | "
+        f"Calls per invoice: {STRUCTURED_CALLS_PER_INVOICE + OCR_CALLS_PER_INVOICE}"
+    )
+    print(
+        f"  Fresh client per call: {unpooled_connections} connections "
+        f"({unpooled_connections / args.invoices:.2f} per invoice)"
+    )
+    print(
+        f"  Pooled factory:        {pooled_connections} connections "
+        f"({pooled_connections / args.invoices:.2f} per invoice)"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
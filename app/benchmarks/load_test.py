@@ -0,0 +1,381 @@
+"""
+Load test of the whole graph: a mix of the docs/ invoices arriving at a target rate against a stubbed LLM backend.
+
+Each agent's LLM answer is the matching section of the invoice's recorded
+output/<invoice>.json, served after a synthetic latency (with optional
+injected errors, see app/llm/replay.ReplayFaults); scanned pages are
+"OCR'd" the same way. Everything else (PDF parsing, matching, validation,
+rules, state handling) runs for real. Every scanned page is rendered and
+"OCR'd" unless --ocr-cache is given, which serves repeats from a throwaway
+cache; the persistent OCR cache is never touched.
+
+    uv run -m app.benchmarks.load_test --invoices 200 --rate 0 --concurrency 50
+    uv run -m app.benchmarks.load_test --invoices 200 --rate 5 --mix digital=4 scanned=1 price_trap=1 missing_po=1
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from app.benchmarks.matching_suite import RESULTS_DIR, git_revision
+from app.llm.builder import LLMProviderFactory
+from app.llm.replay import ReplayFaults, ReplayImageLLM, ReplayStructuredLLM
+from app.matching.tiers import shutdown_tier_executors
+from app.models.document_extraction_model import DocumentIntelligenceAgentOutput
+from app.models.graph import GraphState
+from app.models.matching_model import MatchingAgentOutput
+from app.models.resolution_model import ResolutionAgentOutput
+from app.models.validation_model import ValidationAgentOutput
+from app.pdf_data_extraction.ocr_cache import get_ocr_cache, set_ocr_cache
+from app.utils.disk_cache import DiskCache
+from app.utils.helpers import workflow_output_record
+from app.utils.metrics import latency_histogram, latency_summary, llm_call_summary
+from app.utils.tracing import shutdown_tracing, span
+from app.workflow.graph import compiled_graph
+
+OUTPUT_DIR = Path(__file__).resolve().parent.parent.parent / "output"
+
+INVOICE_TYPES = {
+    "digital": ["Invoice_1_Baseline.pdf", "Invoice_3_Different_Format.pdf"],
+    "scanned": ["Invoice_2_Scanned.pdf"],
+    "price_trap": ["Invoice_4_Price_Trap.pdf"],
+    "missing_po": ["Invoice_5_Missing_PO.pdf"],
+}
+
+## Output model -> section of the recorded output JSON that answers it
+RECORDED_SECTIONS = {
+    DocumentIntelligenceAgentOutput: "document_intelligence",
+    MatchingAgentOutput: "matching_results",
+    ValidationAgentOutput: "validation_results",
+    ResolutionAgentOutput: "resolution_action",
+}
+
+## The invoice (file stem) the running task is processing, for the stub to answer about
+_current_invoice: ContextVar[Optional[str]] = ContextVar("load_test_invoice", default=None)
+
+
+def load_recorded_outputs() -> dict:
+    outputs = {}
+    for path in sorted(OUTPUT_DIR.glob("*.json")):
+        with path.open("r", encoding="utf-8") as f:
+            outputs[path.stem] = json.load(f)["processing_results"]
+    return outputs
+
+
+def recorded_answer(outputs: dict, section: str) -> dict:
+    invoice = _current_invoice.get()
+    answer = outputs.get(invoice, {}).get(section)
+    if answer is None:
+        raise LookupError(f"output/{invoice}.json has no recorded {section}")
+    return {"provider": "stub", "response": json.dumps(answer)}
+
+
+class RecordedOutputLLM(ReplayStructuredLLM):
+    """Answers each agent with its section of the current invoice's recorded output."""
+
+    def __init__(self, outputs: dict, faults: ReplayFaults):
+        super().__init__("stub", "recorded-output", cassette=None, faults=faults)
+        self.outputs = outputs
+
+    async def complete(self, prompt: str, output_model) -> str:
+        answer = recorded_answer(self.outputs, RECORDED_SECTIONS[output_model])
+        return await self.faults.play(answer)
+
+
+class RecordedOcrLLM(ReplayImageLLM):
+    """'Reads' a scanned page as the current invoice's recorded extracted data."""
+
+    def __init__(self, outputs: dict, faults: ReplayFaults):
+        super().__init__("stub", "recorded-output", cassette=None, faults=faults)
+        self.outputs = outputs
+
+    async def complete(self, request: str, base64_image: str, mime_type: str = "image/png") -> str:
+        answer = recorded_answer(self.outputs, "document_intelligence")
+        extracted = json.loads(answer["response"])["extracted_data"]
+        answer["response"] = json.dumps(extracted, indent=1)
+        return await self.faults.play(answer, structured=False)
+
+
+def rss_mb() -> float:
+    """Current resident set size; the peak so far where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError):
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+async def sample_loop(interval: float, load: dict, samples: list, stop: asyncio.Event):
+    """
+    Every `interval`, records how late the event loop woke this task up (lag),
+    the process RSS and how many invoices are in flight / waiting for a slot.
+    """
+    starttime = time.perf_counter()
+    while not stop.is_set():
+        before = time.perf_counter()
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        samples.append(
+            {
+                "t_sec": round(now - starttime, 3),
+                "loop_lag_ms": round(max(0.0, now - before - interval) * 1e3, 3),
+                "rss_mb": rss_mb(),
+                "in_flight": load["in_flight"],
+                "waiting": load["waiting"],
+            }
+        )
+
+
+def parse_mix(entries: list) -> dict:
+    mix = {}
+    for entry in entries:
+        name, _, weight = entry.partition("=")
+        if name not in INVOICE_TYPES:
+            raise ValueError(f"Unknown invoice type: {name} (expected one of {', '.join(INVOICE_TYPES)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def arrival_schedule(args, rng: random.Random) -> list:
+    """(arrival offset in seconds, invoice type, file) per invoice; Poisson arrivals at `rate`/s."""
+    types, weights = zip(*parse_mix(args.mix).items())
+    schedule, offset = [], 0.0
+    for _ in range(args.invoices):
+        invoice_type = rng.choices(types, weights)[0]
+        schedule.append((offset, invoice_type, rng.choice(INVOICE_TYPES[invoice_type])))
+        if args.rate > 0:
+            offset += rng.expovariate(args.rate)
+    return schedule
+
+
+async def drive_invoice(
+    arrival_sec: float,
+    invoice_type: str,
+    file_name: str,
+    starttime: float,
+    semaphore: asyncio.Semaphore,
+    load: dict,
+) -> dict:
+    await asyncio.sleep(max(0.0, starttime + arrival_sec - time.perf_counter()))
+    arrived = time.perf_counter()
+    record = {
+        "file_name": file_name,
+        "type": invoice_type,
+        "arrival_sec": round(arrived - starttime, 3),
+        "status": "error",
+        "error": None,
+        "execution_times": {},
+        "llm_calls": {},
+    }
+
+    load["waiting"] += 1
+    async with semaphore:
+        load["waiting"] -= 1
+        load["in_flight"] += 1
+        started = time.perf_counter()
+        _current_invoice.set(Path(file_name).stem)
+        try:
+            with span("invoice", invoice=Path(file_name).stem, file=file_name):
+                result = await compiled_graph.ainvoke(GraphState(file_name=file_name))
+                with span("output.format"):
+                    workflow_output_record(result)
+            record["status"] = "ok"
+            record["execution_times"] = dict(result.get("execution_times", {}))
+            record["llm_calls"] = dict(result.get("llm_calls", {}))
+        except Exception as e:
+            record["error"] = f"{type(e).__name__} - {e}"
+        finally:
+            load["in_flight"] -= 1
+
+    finished = time.perf_counter()
+    record["queue_sec"] = round(started - arrived, 3)
+    record["service_sec"] = round(finished - started, 3)
+    record["latency_sec"] = round(finished - arrived, 3)
+    return record
+
+
+def summarize(records: list, samples: list, wall_time_sec: float) -> dict:
+    succeeded = [r for r in records if r["status"] == "ok"]
+    per_node = {}
+    for record in succeeded:
+        for node, duration in record["execution_times"].items():
+            per_node.setdefault(node, []).append(duration)
+
+    errors = {}
+    for record in records:
+        if record["error"]:
+            kind = record["error"].split(" - ")[0]
+            errors[kind] = errors.get(kind, 0) + 1
+
+    return {
+        "invoices": len(records),
+        "succeeded": len(succeeded),
+        "failed": len(records) - len(succeeded),
+        "errors": errors,
+        "wall_time_sec": round(wall_time_sec, 3),
+        "throughput_invoices_per_min": round(len(succeeded) / wall_time_sec * 60, 2),
+        "latency_sec": latency_summary([r["latency_sec"] for r in succeeded]),
+        "queue_sec": latency_summary([r["queue_sec"] for r in records]),
+        "service_sec": latency_summary([r["service_sec"] for r in succeeded]),
+        "latency_by_type_sec": {
+            invoice_type: latency_summary(
+                [r["latency_sec"] for r in succeeded if r["type"] == invoice_type]
+            )
+            for invoice_type in sorted({r["type"] for r in records})
+        },
+        "node_latency_sec": {
+            node: {**latency_summary(values), "histogram": latency_histogram(values)}
+            for node, values in sorted(per_node.items())
+        },
+        "llm_calls": llm_call_summary([r["llm_calls"] for r in succeeded]),
+        "loop_lag_ms": latency_summary([s["loop_lag_ms"] for s in samples]),
+        "rss_mb": {
+            "start": samples[0]["rss_mb"] if samples else None,
+            "peak": max((s["rss_mb"] for s in samples), default=None),
+            "end": samples[-1]["rss_mb"] if samples else None,
+        },
+        "max_waiting": max((s["waiting"] for s in samples), default=0),
+    }
+
+
+def print_summary(summary: dict):
+    print("\n--- LOAD TEST SUMMARY ---")
+    print(
+        f"INVOICES:   {summary['invoices']} ({summary['succeeded']} ok / {summary['failed']} failed)"
+        + (f" {summary['errors']}" if summary["errors"] else "")
+    )
+    print(f"WALL TIME:  {summary['wall_time_sec']}s")
+    print(f"THROUGHPUT: {summary['throughput_invoices_per_min']} invoices/min")
+    for name in ("latency_sec", "queue_sec", "service_sec"):
+        stats = summary[name]
+        print(
+            f"{name.upper():<12} p50={stats['p50']} p90={stats['p90']} "
+            f"p99={stats['p99']} max={stats['max']}"
+        )
+
+    print("\n[PER-NODE LATENCY (s)]")
+    for node, stats in summary["node_latency_sec"].items():
+        print(f"  {node}: n={stats['count']} p50={stats['p50']} p99={stats['p99']} max={stats['max']}")
+
+    lag, rss = summary["loop_lag_ms"], summary["rss_mb"]
+    print(
+        f"\nEVENT LOOP LAG (ms): p50={lag['p50']} p99={lag['p99']} max={lag['max']} "
+        f"over {lag['count']} samples"
+    )
+    print(f"RSS (MB): start={rss['start']} peak={rss['peak']} end={rss['end']}")
+    print(f"MAX WAITING FOR A SLOT: {summary['max_waiting']}")
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    faults = ReplayFaults(
+        latency=str(args.llm_latency),
+        jitter=args.llm_jitter,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    outputs = load_recorded_outputs()
+    LLMProviderFactory.use("groq", RecordedOutputLLM(outputs, faults))
+    LLMProviderFactory.use("groqImage", RecordedOcrLLM(outputs, faults))
+    ## Keep the stub's answers out of the real OCR cache
+    ocr_cache_dir = tempfile.TemporaryDirectory(prefix="load-test-ocr-") if args.ocr_cache else None
+    set_ocr_cache(
+        DiskCache(ocr_cache_dir.name, max_bytes=2**30, suffix=".txt") if ocr_cache_dir else None
+    )
+
+    schedule = arrival_schedule(args, rng)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    load, samples, stop = {"in_flight": 0, "waiting": 0}, [], asyncio.Event()
+    sampler = asyncio.create_task(sample_loop(args.sample_interval, load, samples, stop))
+
+    ## Node progress prints are still formatted, just not shown
+    quiet = open(os.devnull, "w") if not args.verbose else None
+    starttime = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+            records = await asyncio.gather(
+                *(
+                    drive_invoice(arrival, invoice_type, file_name, starttime, semaphore, load)
+                    for arrival, invoice_type, file_name in schedule
+                )
+            )
+    finally:
+        wall_time_sec = time.perf_counter() - starttime
+        stop.set()
+        await sampler
+        if quiet:
+            quiet.close()
+        await LLMProviderFactory.shutdown()
+        shutdown_tier_executors()
+        shutdown_tracing()
+
+    summary = summarize(records, samples, wall_time_sec)
+    ocr_cache = get_ocr_cache()
+    summary["ocr_cache"] = ocr_cache.stats() if ocr_cache is not None else None
+    if ocr_cache_dir is not None:
+        ocr_cache_dir.cleanup()
+    return {
+        "summary": summary,
+        "samples": samples,
+        "invoices": [
+            {key: value for key, value in record.items() if key != "llm_calls"}
+            for record in records
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--invoices", type=int, default=200)
+    parser.add_argument(
+        "--rate", type=float, default=0.0, help="Arrivals per second (Poisson); 0 = all at once"
+    )
+    parser.add_argument("--concurrency", type=int, default=50, help="Invoices in flight at most")
+    parser.add_argument(
+        "--mix",
+        nargs="+",
+        default=[f"{name}=1" for name in INVOICE_TYPES],
+        help=f"TYPE=WEIGHT entries; types: {', '.join(INVOICE_TYPES)}",
+    )
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Stub LLM seconds per call")
+    parser.add_argument("--llm-jitter", type=float, default=0.3, help="+/- fraction of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of failing LLM attempts")
+    parser.add_argument("--sample-interval", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument(
+        "--ocr-cache",
+        action="store_true",
+        help="Serve repeated scanned pages from a temporary OCR cache (default: OCR every page)",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own prints")
+    parser.add_argument("--out", type=Path, default=None, help="Result file (default: benchmark-results/)")
+    args = parser.parse_args()
+
+    result = {
+        **git_revision(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("out", "verbose")},
+        **asyncio.run(run(args)),
+    }
+    print_summary(result["summary"])
+
+    out = args.out or RESULTS_DIR / f"load-{result['commit']}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with out.open("w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, default=str)
+    print(f"\nResults written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Benchmark suite for deterministic matching and validation on synthetic catalogues, comparable across commits.
+
+    uv run -m app.benchmarks.matching_suite --pos 10000 100000 --invoices 200 --noise medium
+    uv run -m app.benchmarks.matching_suite --compare benchmark-results/<old>.json <new>.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from app.benchmarks.synthetic import NOISE_LEVELS, generate_catalogue, generate_invoices
+from app.matching.context import MatchingContext
+from app.matching.primary import primary_matching
+from app.matching.secondary import secondary_matching
+from app.matching.tertiary import tertiary_matching
+from app.utils.db import set_db
+from app.utils.helpers import reset_similarity_stats
+from app.utils.metrics import percentile
+from app.validation.validator import validate_invoice_wrt_po
+
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+RESULTS_DIR = ROOT_DIR / "benchmark-results"
+
+## Fewest calls an operation is timed over, however long they take
+MIN_CALLS = 5
+
+
+## Operation -> (invoice scenario it is timed on, fn(invoice, context, source po_number))
+OPERATIONS = {
+    "primary": ("po_reference", lambda invoice, context, _: primary_matching(invoice, context=context)),
+    "secondary": ("supplier", lambda invoice, context, _: secondary_matching(invoice, context=context)),
+    "tertiary": ("product_only", lambda invoice, context, _: tertiary_matching(invoice, context=context)),
+    "validator": (
+        "po_reference",
+        lambda invoice, context, po_number: validate_invoice_wrt_po(invoice, po_number, context=context),
+    ),
+}
+
+
+def git_revision() -> dict:
+    """Commit the suite ran against, and whether the working tree had changes."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": None}
+    return {"commit": commit, "dirty": bool(status)}
+
+
+def _found(result: dict, po_number: str) -> bool:
+    ## Primary matches the referenced PO; the fallbacks must rank the source PO first
+    if not result.get("matched"):
+        return False
+    candidates = result.get("candidates")
+    if candidates is None:
+        return True
+    return candidates[0]["matched_po"]["po_number"] == po_number
+
+
+def time_operation(operation: str, pairs: list, budget_sec: float) -> dict:
+    """
+    Times `operation` over the invoices, stopping early once `budget_sec` is
+    spent (after at least MIN_CALLS calls) so slow tiers stay runnable on
+    large catalogues.
+    """
+    _, fn = OPERATIONS[operation]
+    latencies, found = [], 0
+
+    ## Every operation starts from a cold similarity memo
+    reset_similarity_stats()
+    for invoice, po in pairs:
+        starttime = time.perf_counter()
+        result = fn(invoice, MatchingContext(invoice), po["po_number"])
+        latencies.append(time.perf_counter() - starttime)
+        found += operation != "validator" and _found(result, po["po_number"])
+        if len(latencies) >= MIN_CALLS and sum(latencies) > budget_sec:
+            break
+    pairs = pairs[: len(latencies)]
+
+    ## Separate pass: tracemalloc slows allocation-heavy code several times over
+    reset_similarity_stats()
+    tracemalloc.start()
+    for invoice, po in pairs:
+        fn(invoice, MatchingContext(invoice), po["po_number"])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "calls": len(pairs),
+        "ops_per_sec": round(len(pairs) / sum(latencies), 2),
+        "p50_ms": round(percentile(latencies, 50) * 1e3, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1e3, 3),
+        "peak_mb": round(peak / 2**20, 2),
+        "found_rate": round(found / len(pairs), 3) if operation != "validator" else None,
+    }
+
+
+def run_catalogue(args, size: int) -> dict:
+    starttime = time.perf_counter()
+    purchase_orders = generate_catalogue(
+        size, supplier_skew=args.skew, max_lines=args.max_lines
+    )
+    generate_sec = time.perf_counter() - starttime
+
+    tracemalloc.start()
+    starttime = time.perf_counter()
+    set_db(purchase_orders)
+    index_sec = time.perf_counter() - starttime
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    results = {
+        "catalogue": {
+            "generate_sec": round(generate_sec, 3),
+            "index_sec": round(index_sec, 3),
+            "index_peak_mb": round(peak / 2**20, 2),
+        }
+    }
+    invoices = {}
+    for operation in args.operations:
+        scenario, _ = OPERATIONS[operation]
+        if scenario not in invoices:
+            invoices[scenario] = generate_invoices(
+                purchase_orders, args.invoices, scenario, noise=NOISE_LEVELS[args.noise]
+            )
+        results[operation] = time_operation(operation, invoices[scenario], args.budget)
+    return results
+
+
+def print_run(run: dict):
+    for size, results in run["results"].items():
+        catalogue = results["catalogue"]
+        print(
+            f"\n{int(size):,} POs: generated in {catalogue['generate_sec']:.1f}s, "
+            f"indexed in {catalogue['index_sec']:.1f}s (peak {catalogue['index_peak_mb']:.0f} MB)"
+        )
+        print(
+            f"{'operation':>10} | {'ops / sec':>10} | {'p50 ms':>8} | {'p95 ms':>8} | "
+            f"{'peak MB':>8} | found"
+        )
+        for operation, stats in results.items():
+            if operation == "catalogue":
+                continue
+            found = f"{stats['found_rate']:.0%}" if stats["found_rate"] is not None else "-"
+            print(
+                f"{operation:>10} | {stats['ops_per_sec']:>10.1f} | {stats['p50_ms']:>8.2f} | "
+                f"{stats['p95_ms']:>8.2f} | {stats['peak_mb']:>8.2f} | {found}"
+            )
+
+
+def compare(baseline: dict, current: dict):
+    """Prints throughput and tail latency of `current` relative to `baseline`."""
+    print(
+        f"{baseline['commit']}{'+' if baseline['dirty'] else ''} -> "
+        f"{current['commit']}{'+' if current['dirty'] else ''}"
+    )
+    if baseline["settings"] != current["settings"]:
+        print(f"Warning: settings differ\n  {baseline['settings']}\n  {current['settings']}")
+
+    print(
+        f"{'POs':>9} | {'operation':>10} | {'ops / sec':>21} | {'p95 ms':>19} | {'peak MB':>17}"
+    )
+    for size, results in current["results"].items():
+        for operation, stats in results.items():
+            before = baseline["results"].get(size, {}).get(operation)
+            if operation == "catalogue" or before is None:
+                continue
+            change = stats["ops_per_sec"] / before["ops_per_sec"] - 1
+            print(
+                f"{int(size):>9,} | {operation:>10} | "
+                f"{before['ops_per_sec']:>8.1f} -> {stats['ops_per_sec']:>8.1f} {change:>+5.0%} | "
+                f"{before['p95_ms']:>7.2f} -> {stats['p95_ms']:>7.2f} | "
+                f"{before['peak_mb']:>6.1f} -> {stats['peak_mb']:>6.1f}"
+            )
+
+
+def load(path: Path) -> dict:
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pos", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--invoices", type=int, default=200, help="Invoices per scenario")
+    parser.add_argument(
+        "--budget", type=float, default=60.0, help="Seconds of timed calls per operation and catalogue"
+    )
+    parser.add_argument("--noise", choices=list(NOISE_LEVELS), default="medium")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of PO counts per supplier")
+    parser.add_argument("--max-lines", type=int, default=40)
+    parser.add_argument("--operations", nargs="+", choices=list(OPERATIONS), default=list(OPERATIONS))
+    parser.add_argument("--out", type=Path, default=None, help="Result file (default: benchmark-results/)")
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        nargs="+",
+        metavar="RESULT",
+        help="Compare this run against RESULT, or compare two saved results without running",
+    )
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) == 2:
+        compare(load(args.compare[0]), load(args.compare[1]))
+        return
+
+    run = {
+        **git_revision(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "settings": {
+            "invoices": args.invoices,
+            "budget_sec": args.budget,
+            "noise": args.noise,
+            "skew": args.skew,
+            "max_lines": args.max_lines,
+        },
+        "results": {},
+    }
+    for size in args.pos:
+        run["results"][str(size)] = run_catalogue(args, size)
+    print_run(run)
+
+    out = args.out or RESULTS_DIR / f"matching-{run['commit']}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with out.open("w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2)
+    print(f"\nResults written to {out}")
+
+    if args.compare:
+        print()
+        compare(load(args.compare[0]), run)
+
+
+if __name__ == "__main__":
+    main()
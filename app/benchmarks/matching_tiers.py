@@ -0,0 +1,94 @@
+"""
+Benchmark for the deterministic matching tiers: sequential fallback vs. concurrent tiers with cancellation.
+
+    uv run -m app.benchmarks.matching_tiers --pos 20000 --invoices 10
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import time
+
+from app.benchmarks.synthetic import (
+    SCENARIOS,
+    generate_item_descriptions,
+    generate_purchase_orders,
+    generate_supplier_names,
+    invoice_for,
+)
+from app.matching.context import MatchingContext
+from app.matching.tiers import run_matching_tiers, shutdown_tier_executors
+from app.utils.db import set_db
+from app.utils.helpers import reset_similarity_stats
+
+PAIRING_MODES = {"primary": "greedy", "secondary": "greedy", "tertiary": "greedy"}
+
+
+async def run_mode(mode: str, invoices: list) -> dict:
+    tier_results, tiers_finished = [], 0
+    ## Every mode starts from a cold similarity memo (worker processes keep their own)
+    reset_similarity_stats()
+
+    starttime = time.perf_counter()
+    for invoice in invoices:
+        context = MatchingContext(invoice)
+        tier_results.append(
+            await run_matching_tiers(invoice, context, PAIRING_MODES, mode=mode)
+        )
+        tiers_finished += len(context.tier_times)
+    elapsed = time.perf_counter() - starttime
+
+    return {
+        "ms_per_invoice": elapsed / len(invoices) * 1e3,
+        "tiers_finished": tiers_finished / len(invoices),
+        "results": json.dumps(tier_results, sort_keys=True, default=str),
+    }
+
+
+async def run(args):
+    rng = random.Random(7)
+    purchase_orders = generate_purchase_orders(
+        args.pos,
+        suppliers=generate_supplier_names(args.pos // 10),
+        descriptions=generate_item_descriptions(args.pos // 4),
+    )
+    set_db(purchase_orders)
+
+    modes = ["sequential", "thread"]
+    ## Worker processes only see the synthetic catalogue if they are forked from this one
+    if multiprocessing.get_start_method() == "fork":
+        modes.append("process")
+
+    print(
+        f"{'invoices':>12} | {'mode':>10} | {'ms / invoice':>12} | "
+        f"{'tiers finished':>14} | {'same result':>11}"
+    )
+    for scenario in SCENARIOS:
+        invoices = [
+            invoice_for(rng.choice(purchase_orders), scenario, rng)
+            for _ in range(args.invoices)
+        ]
+        baseline = None
+        for mode in modes:
+            stats = await run_mode(mode, invoices)
+            baseline = baseline or stats["results"]
+            print(
+                f"{scenario:>12} | {mode:>10} | {stats['ms_per_invoice']:>12.1f} | "
+                f"{stats['tiers_finished']:>14.1f} | {str(stats['results'] == baseline):>11}"
+            )
+
+    shutdown_tier_executors()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pos", type=int, default=20_000)
+    parser.add_argument("--invoices", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark for line item pairing modes: greedy first-come pairing vs. optimal assignment.
+
+    uv run -m app.benchmarks.pairing_modes --lines 5 20 100 300 --invoices 20
+"""
+
+import argparse
+import random
+import time
+
+from app.benchmarks.synthetic import (
+    DESCRIPTION_FORMS,
+    DESCRIPTION_GRADES,
+    NAME_SYLLABLES,
+    noisy_variant,
+)
+from app.utils.helpers import pair_invoice_items_to_po_items
+
+
+def confusable_delivery(count: int, rng: random.Random) -> tuple:
+    """
+    A PO whose lines come in families of near-identical descriptions
+    (same compound, grade and form, different strength) and a noisy,
+    shuffled invoice for 80% of it. `item_id`s are only kept on a few
+    invoice lines.
+
+    Returns:
+        (invoice_items, po_items, source) where source[i] is the PO line invoice line i was copied from.
+    """
+    po_items = []
+    while len(po_items) < count:
+        stem = "".join(rng.choice(NAME_SYLLABLES) for _ in range(3)).capitalize()
+        grade, form = rng.choice(DESCRIPTION_GRADES), rng.choice(DESCRIPTION_FORMS)
+        for strength in rng.sample([5, 10, 25, 50, 100, 250, 500], rng.randint(1, 5)):
+            po_items.append(
+                {
+                    "item_id": f"ITM-{len(po_items):04d}",
+                    "description": f"{stem} {grade} {form} {strength}mg",
+                    "quantity": rng.randint(1, 200),
+                    "unit_price": round(rng.uniform(1, 250), 2),
+                }
+            )
+    po_items = po_items[:count]
+
+    source = rng.sample(range(count), max(1, int(count * 0.8)))
+    invoice_items = [
+        {
+            "item_id": po_items[j]["item_id"] if rng.random() < 0.1 else "",
+            "description": noisy_variant(po_items[j]["description"], rng),
+        }
+        for j in source
+    ]
+    return invoice_items, po_items, source
+
+
+def run_mode(mode: str, deliveries: list) -> dict:
+    match_ratios, correct, total_lines = [], 0, 0
+
+    starttime = time.perf_counter()
+    results = [
+        pair_invoice_items_to_po_items(invoice_items, po_items, pairing_mode=mode)
+        for invoice_items, po_items, _ in deliveries
+    ]
+    elapsed = time.perf_counter() - starttime
+
+    for (invoice_items, po_items, source), result in zip(deliveries, results):
+        match_ratios.append(result["match_ratio"])
+        total_lines += len(invoice_items)
+        row_of = {id(item): i for i, item in enumerate(invoice_items)}
+        for pair in result["pairs"]:
+            if po_items[source[row_of[id(pair["invoice_item"])]]] is pair["po_item"]:
+                correct += 1
+
+    return {
+        "ms_per_invoice": elapsed / len(deliveries) * 1e3,
+        "match_ratio": sum(match_ratios) / len(match_ratios),
+        "correct": correct / total_lines,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, nargs="+", default=[5, 20, 100, 300])
+    parser.add_argument("--invoices", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    print(
+        f"{'lines':>6} | {'mode':>8} | {'ms / invoice':>12} | {'match ratio':>11} | {'correct pairs':>13}"
+    )
+
+    for count in args.lines:
+        deliveries = [confusable_delivery(count, rng) for _ in range(args.invoices)]
+        for mode in ("greedy", "optimal"):
+            stats = run_mode(mode, deliveries)
+            print(
+                f"{count:>6} | {mode:>8} | {stats['ms_per_invoice']:>12.1f} | "
+                f"{stats['match_ratio']:>11.1%} | {stats['correct']:>13.1%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Micro-benchmark for PO lookups by po_number: linear scan vs. dictionary index.
+
+    uv run -m app.benchmarks.po_lookup --sizes 10000 100000 1000000
+"""
+
+import argparse
+import random
+import time
+
+from app.benchmarks.synthetic import generate_purchase_orders
+from app.utils.db import set_db
+from app.utils.db_helpers import find_po_by_number
+
+
+def linear_find_po_by_number(purchase_orders: list, po_number: str):
+    ## The previous implementation of find_po_by_number
+    for po in purchase_orders:
+        if po.get("po_number") == po_number:
+            return po
+    return None
+
+
+def time_per_lookup(fn, lookups: list) -> float:
+    starttime = time.perf_counter()
+    for po_number in lookups:
+        fn(po_number)
+    return (time.perf_counter() - starttime) / len(lookups)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    print(f"{'POs':>10} | {'build index':>12} | {'linear / lookup':>16} | {'index / lookup':>15} | speed-up")
+
+    for size in args.sizes:
+        purchase_orders = generate_purchase_orders(size, with_line_items=False)
+        lookups = [rng.choice(purchase_orders)["po_number"] for _ in range(args.lookups)]
+
+        starttime = time.perf_counter()
+        set_db(purchase_orders)
+        build_sec = time.perf_counter() - starttime
+
+        linear_sec = time_per_lookup(
+            lambda n: linear_find_po_by_number(purchase_orders, n), lookups
+        )
+        index_sec = time_per_lookup(find_po_by_number, lookups)
+
+        print(
+            f"{size:>10} | {build_sec * 1e3:>10.1f}ms | {linear_sec * 1e6:>14.1f}us | "
+            f"{index_sec * 1e6:>13.2f}us | {linear_sec / index_sec:,.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Prompt size of the three decision agents on the sample invoices: Python repr payloads vs. compact JSON.
+
+    uv run -m app.benchmarks.prompt_size
+"""
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+
+from app.ai.matching import MATCHING_DECISION_AGENT_PROMPT, matching_prompt_load
+from app.ai.payload import prompt_size_report
+from app.ai.resolution import (
+    RESOLUTION_AGENT_PROMPT,
+    evidence_bundle,
+    gather_findings,
+    resolution_prompt_load,
+)
+from app.ai.validation import AUDIT_VALIDATION_PROMPT, validation_prompt_load
+from app.matching.context import MatchingContext
+from app.matching.tiers import run_matching_tiers
+from app.models.document_extraction_model import DocumentIntelligenceAgentOutput
+from app.models.matching_model import MatchingAgentOutput
+from app.models.validation_model import ValidationAgentOutput
+from app.utils.db_helpers import find_po_by_number
+from app.validation.validator import validate_invoice_wrt_po
+
+OUTPUT_DIR = Path(__file__).resolve().parent.parent.parent / "output"
+
+PAIRING_MODES = {"primary": "greedy", "secondary": "greedy", "tertiary": "greedy"}
+
+
+def legacy_report(template: str, sections: dict) -> dict:
+    ## The previous payloads: the raw models and dicts formatted with str()
+    return prompt_size_report(template, {name: str(value) for name, value in sections.items()})
+
+
+async def prompt_reports(output: dict) -> dict:
+    """{ agent: (legacy report, compact report) } for one recorded pipeline run."""
+    results = output["processing_results"]
+    extraction = DocumentIntelligenceAgentOutput(**results["document_intelligence"])
+    matching = results.get("matching_results")
+    matching = MatchingAgentOutput(**matching) if matching else None
+    validation = results.get("validation_results")
+    validation = ValidationAgentOutput(**validation) if validation else None
+    invoice = extraction.extracted_data
+
+    context = MatchingContext(invoice)
+    tier_results = await run_matching_tiers(invoice, context, PAIRING_MODES)
+    reports = {
+        "matching": (
+            legacy_report(
+                MATCHING_DECISION_AGENT_PROMPT,
+                {
+                    "EXTRACTED_INVOICE": invoice,
+                    "PRIMARY_MATCH": tier_results["primary"],
+                    "SECONDARY_MATCH": tier_results["secondary"],
+                    "TERTIARY_MATCH": tier_results["tertiary"],
+                    "PURCHASE_ORDERS": "",
+                },
+            ),
+            prompt_size_report(
+                MATCHING_DECISION_AGENT_PROMPT, matching_prompt_load(invoice, tier_results)
+            ),
+        )
+    }
+
+    if matching and matching.matched_po:
+        po = find_po_by_number(matching.matched_po)
+        report = validate_invoice_wrt_po(invoice, matching.matched_po, context=context)
+        reports["validation"] = (
+            legacy_report(
+                AUDIT_VALIDATION_PROMPT,
+                {"INVOICE_DETAILS": invoice.model_dump(), "PO_RECORD": po, "VALIDATION_RESULT": report},
+            ),
+            prompt_size_report(
+                AUDIT_VALIDATION_PROMPT, validation_prompt_load(invoice, po, report)
+            ),
+        )
+
+    findings = gather_findings(extraction, matching, validation)
+    reports["resolution"] = (
+        legacy_report(
+            RESOLUTION_AGENT_PROMPT,
+            {section.upper(): evidence for section, evidence in evidence_bundle(findings).items()},
+        ),
+        prompt_size_report(RESOLUTION_AGENT_PROMPT, resolution_prompt_load(findings)),
+    )
+    return reports
+
+
+async def run(args):
+    print(
+        f"{'invoice':>28} | {'agent':>10} | {'section':>18} | {'repr tokens':>11} | "
+        f"{'json tokens':>11} | saved"
+    )
+    totals = {"legacy": 0, "compact": 0}
+
+    for path in sorted(OUTPUT_DIR.glob("*.json")):
+        with path.open("r", encoding="utf-8") as f:
+            output = json.load(f)
+
+        for agent, (legacy, compact) in (await prompt_reports(output)).items():
+            sections = compact if args.sections else {"total": compact["total"]}
+            for section in sections:
+                before, after = legacy[section], compact[section]
+                saved = f"{1 - after / before:.0%}" if before else "-"
+                print(
+                    f"{path.stem:>28} | {agent:>10} | {section:>18} | {before:>11} | "
+                    f"{after:>11} | {saved}"
+                )
+            totals["legacy"] += legacy["total"]
+            totals["compact"] += compact["total"]
+
+    print(
+        f"\nAll prompts: ~{totals['legacy']} -> ~{totals['compact']} tokens "
+        f"({1 - totals['compact'] / totals['legacy']:.0%} smaller)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sections", action="store_true", help="Break each prompt down by section"
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Micro-benchmark for memoized, bound-pruned similarity: line pairing of a batch of invoices against a catalogue.
+
+    uv run -m app.benchmarks.similarity --pos 2000 --repeats 3
+"""
+
+import argparse
+import random
+import time
+
+from app.benchmarks.item_desc_search import sample_invoices, synthetic_invoices
+from app.benchmarks.supplier_search import legacy_similarity
+from app.benchmarks.synthetic import generate_purchase_orders, generate_item_descriptions
+from app.utils.helpers import (
+    pair_invoice_items_to_po_items,
+    reset_similarity_stats,
+    similarity_stats,
+)
+
+
+def legacy_pair_invoice_items_to_po_items(
+    invoice_items, po_items, desc_similarity_threshold=0.7
+):
+    ## The previous pairing loop: one fresh SequenceMatcher per pair
+    used_po_keys = set()
+    pairs = []
+    ratio_calls = 0
+
+    for inv_item in invoice_items:
+        inv_item_id = inv_item.get("item_id", "")
+        inv_desc = inv_item.get("description", "")
+        best_po_item, best_score, best_key = None, 0.0, None
+
+        for po_item in po_items:
+            key = (
+                po_item.get("item_id"),
+                po_item.get("description"),
+                po_item.get("quantity"),
+                po_item.get("unit_price"),
+            )
+            if key in used_po_keys:
+                continue
+            if inv_item_id and po_item.get("item_id") == inv_item_id:
+                best_po_item, best_score, best_key = po_item, 1.0, key
+                break
+
+            ratio_calls += 1
+            score = legacy_similarity(inv_desc, po_item.get("description", ""))
+            if score > best_score:
+                best_po_item, best_score, best_key = po_item, score, key
+
+        if best_po_item and best_score >= desc_similarity_threshold:
+            pairs.append((inv_item, best_po_item, round(best_score, 3)))
+            used_po_keys.add(best_key)
+
+    return pairs, ratio_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pos", type=int, default=2_000)
+    parser.add_argument("--descriptions", type=int, default=500)
+    parser.add_argument("--invoices", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=3, help="Times the batch is re-run (e.g. retries, re-processing)")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    purchase_orders = generate_purchase_orders(
+        args.pos, descriptions=generate_item_descriptions(args.descriptions)
+    )
+    invoices = sample_invoices() + synthetic_invoices(purchase_orders, args.invoices, rng)
+    batch = invoices * args.repeats
+
+    starttime = time.perf_counter()
+    legacy_pairs, legacy_calls = [], 0
+    for items in batch:
+        for po in purchase_orders:
+            pairs, calls = legacy_pair_invoice_items_to_po_items(items, po["line_items"])
+            legacy_pairs.append(pairs)
+            legacy_calls += calls
+    legacy_sec = time.perf_counter() - starttime
+
+    reset_similarity_stats()
+    starttime = time.perf_counter()
+    new_pairs = []
+    for items in batch:
+        for po in purchase_orders:
+            result = pair_invoice_items_to_po_items(items, po["line_items"])
+            new_pairs.append(
+                [(p["invoice_item"], p["po_item"], p["match_score"]) for p in result["pairs"]]
+            )
+    new_sec = time.perf_counter() - starttime
+
+    stats = similarity_stats()
+    mismatches = sum(
+        [(id(i), id(p), s) for i, p, s in a] != [(id(i), id(p), s) for i, p, s in b]
+        for a, b in zip(legacy_pairs, new_pairs)
+    )
+    avoided = stats["length_pruned"] + stats["quick_pruned"] + stats["cache_hits"]
+
+    print(f"Pairings:           {len(batch)} invoices x {len(purchase_orders)} POs")
+    print(f"Legacy:             {legacy_sec:.2f}s, {legacy_calls} full ratios")
+    print(f"Memoized + pruned:  {new_sec:.2f}s ({legacy_sec / new_sec:.1f}x)")
+    print(f"  pruned by length: {stats['length_pruned']}")
+    print(f"  pruned by chars:  {stats['quick_pruned']}")
+    print(f"  memo hits:        {stats['cache_hits']}")
+    print(f"  full ratios run:  {stats['computed']}")
+    print(f"Calls avoided:      {avoided / max(stats['calls'], 1):.1%} of {stats['calls']} comparisons")
+    print(f"Pairing mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Micro-benchmark for fuzzy supplier search: full scan vs. the supplier index.
+
+    uv run -m app.benchmarks.supplier_search --sizes 10000 100000 --suppliers 2000 --fuzz 3000
+"""
+
+import argparse
+import random
+import time
+from difflib import SequenceMatcher
+
+from app.benchmarks.synthetic import (
+    generate_purchase_orders,
+    generate_supplier_names,
+    noisy_variant,
+)
+from app.utils.db import set_db
+from app.utils.db_helpers import find_pos_by_supplier
+
+
+def legacy_similarity(str1: str, str2: str) -> float:
+    ## string_similarity before memoization: a fresh SequenceMatcher per call
+    return SequenceMatcher(None, str1.lower(), str2.lower()).ratio()
+
+
+def linear_find_pos_by_supplier(
+    purchase_orders: list, invoice_supplier: str, min_similarity: float = 0.7
+):
+    ## The previous implementation of find_pos_by_supplier
+    if invoice_supplier == "":
+        return []
+
+    exact_matches = []
+    fuzzy_matches = []
+
+    for po in purchase_orders:
+        supplier = po.get("supplier", "")
+        if supplier.strip().lower() == invoice_supplier.strip().lower():
+            exact_matches.append({"po": po, "confidence": 0.99})
+        else:
+            sim = legacy_similarity(invoice_supplier, supplier)
+            if sim >= min_similarity:
+                fuzzy_matches.append({"po": po, "confidence": sim})
+
+    final = exact_matches + fuzzy_matches
+    final.sort(key=lambda x: x["confidence"], reverse=True)
+    return [entry["po"] for entry in final]
+
+
+def build_queries(suppliers: list, count: int, rng: random.Random) -> list:
+    queries = []
+    for _ in range(count):
+        name = rng.choice(suppliers)
+        kind = rng.random()
+        if kind < 0.3:
+            queries.append(f"  {name.upper()} ")  ## Exact after canonicalisation
+        elif kind < 0.9:
+            queries.append(noisy_variant(name, rng))
+        else:
+            queries.append("Unknown Trading Company Ltd")
+    return queries
+
+
+def fuzz_mismatches(count: int, min_similarity: float, rng: random.Random) -> int:
+    """
+    Queries the index and a full scan with short random names over a small
+    alphabet (e.g. 'ddec' vs 'Xddc'), where pairs sharing few character runs
+    still reach the threshold; returns how many rankings differ.
+    """
+    alphabet = "abcdeX "
+    names = ["".join(rng.choices(alphabet, k=rng.randint(1, 8))) for _ in range(count)]
+    purchase_orders = [{"po_number": f"PO-{i}", "supplier": name} for i, name in enumerate(names)]
+    set_db(purchase_orders)
+
+    mismatches = 0
+    for _ in range(count):
+        query = "".join(rng.choices(alphabet, k=rng.randint(1, 8)))
+        expected = linear_find_pos_by_supplier(purchase_orders, query, min_similarity)
+        actual = find_pos_by_supplier(query, min_similarity)
+        mismatches += [id(po) for po in expected] != [id(po) for po in actual]
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--suppliers", type=int, default=2_000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--fuzz", type=int, default=3_000, help="Random short names and queries per threshold")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    suppliers = generate_supplier_names(args.suppliers)
+    queries = build_queries(suppliers, args.queries, rng)
+
+    print(
+        f"{'POs':>10} | {'build index':>12} | {'scan / query':>13} | "
+        f"{'index / query':>14} | {'mismatches':>10} | speed-up"
+    )
+
+    for size in args.sizes:
+        purchase_orders = generate_purchase_orders(
+            size, with_line_items=False, suppliers=suppliers
+        )
+
+        starttime = time.perf_counter()
+        set_db(purchase_orders)
+        build_sec = time.perf_counter() - starttime
+
+        starttime = time.perf_counter()
+        expected = [linear_find_pos_by_supplier(purchase_orders, q) for q in queries]
+        scan_sec = (time.perf_counter() - starttime) / len(queries)
+
+        starttime = time.perf_counter()
+        actual = [find_pos_by_supplier(q) for q in queries]
+        index_sec = (time.perf_counter() - starttime) / len(queries)
+
+        mismatches = sum(
+            [id(po) for po in e] != [id(po) for po in a] for e, a in zip(expected, actual)
+        )
+
+        print(
+            f"{size:>10} | {build_sec * 1e3:>10.1f}ms | {scan_sec * 1e3:>11.1f}ms | "
+            f"{index_sec * 1e3:>12.2f}ms | {mismatches:>10} | {scan_sec / index_sec:,.0f}x"
+        )
+
+    ## Exactness on adversarial short names, at the default and a looser threshold
+    for min_similarity in (0.7, 0.5):
+        mismatches = fuzz_mismatches(args.fuzz, min_similarity, rng)
+        print(f"fuzz {args.fuzz} queries @ {min_similarity}: {mismatches} mismatches (expected 0)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import random
+from datetime import date, timedelta
+from itertools import accumulate
+from typing import NamedTuple
+
+from app.models.invoice_extraction_model import InvoiceExtractionResults
+
+SUPPLIER_PREFIXES = ["Pharma", "Bio", "Chem", "Medi", "Lab", "Gen", "Nova", "Apex"]
+SUPPLIER_SUFFIXES = ["Supplies Ltd", "Materials UK", "Solutions Ltd", "Group plc", "Labs Ltd"]
+NAME_SYLLABLES = ["ar", "bel", "cor", "dan", "el", "fen", "gra", "hol", "is", "jor", "kel", "lum", "mor", "nor", "ost", "pel", "quin", "ros", "sal", "tor", "ul", "ver", "wen", "xan", "yor", "zel"]
+PRODUCTS = [
+    "Paracetamol BP 500mg",
+    "Microcrystalline Cellulose",
+    "Magnesium Stearate Ph Eur",
+    "Titanium Dioxide E171",
+    "Ibuprofen BP 200mg",
+    "Lactose Monohydrate",
+    "Croscarmellose Sodium",
+    "Povidone K30",
+]
+
+
+def generate_supplier_names(count: int, seed: int = 42) -> list:
+    """Generates `count` distinct, pronounceable supplier names, e.g. 'Korvelan Labs Ltd'."""
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        stem = "".join(rng.choice(NAME_SYLLABLES) for _ in range(rng.randint(2, 4)))
+        names.add(f"{stem.capitalize()} {rng.choice(SUPPLIER_SUFFIXES)}")
+    return sorted(names)
+
+
+DESCRIPTION_GRADES = ["BP", "Ph Eur", "USP", "EP", "JP", "Food Grade", "Technical"]
+DESCRIPTION_FORMS = ["Powder", "Granules", "Micronised", "Solution", "Crystals", "Pellets"]
+
+
+def generate_item_descriptions(count: int, seed: int = 42) -> list:
+    """Generates `count` distinct line item descriptions, e.g. 'Korvelan Ph Eur Granules 250mg'."""
+    rng = random.Random(seed)
+    descriptions = set(PRODUCTS[:count])
+    while len(descriptions) < count:
+        stem = "".join(rng.choice(NAME_SYLLABLES) for _ in range(rng.randint(2, 4)))
+        descriptions.add(
+            f"{stem.capitalize()} {rng.choice(DESCRIPTION_GRADES)} "
+            f"{rng.choice(DESCRIPTION_FORMS)} {rng.choice([5, 10, 25, 50, 100, 250, 500])}mg"
+        )
+    return sorted(descriptions)
+
+
+def generate_description_families(count: int, seed: int = 42, family_size: int = 5) -> list:
+    """
+    Generates `count` line item descriptions in families of up to `family_size`
+    near-duplicates: same compound, grade and form, different strength, e.g.
+    'Korvelan BP Powder 25mg' / 'Korvelan BP Powder 250mg'.
+    """
+    rng = random.Random(seed)
+    strengths = [5, 10, 25, 50, 100, 250, 500]
+    stems, descriptions = set(), []
+    while len(descriptions) < count:
+        stem = "".join(rng.choice(NAME_SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if stem in stems:
+            continue
+        stems.add(stem)
+        grade, form = rng.choice(DESCRIPTION_GRADES), rng.choice(DESCRIPTION_FORMS)
+        for strength in rng.sample(strengths, rng.randint(1, min(family_size, len(strengths)))):
+            descriptions.append(f"{stem.capitalize()} {grade} {form} {strength}mg")
+    return sorted(descriptions[:count])
+
+
+def zipf_cum_weights(count: int, skew: float) -> list:
+    """Cumulative Zipf weights: the item at rank r is drawn in proportion to 1 / r**skew."""
+    return list(accumulate(1 / rank**skew for rank in range(1, count + 1)))
+
+
+def _line_count(rng: random.Random, max_lines: int) -> int:
+    ## Mostly short orders with the odd bulk one; max_lines=5 keeps the original 1-5 draw
+    if max_lines <= 5 or rng.random() < 0.9:
+        return rng.randint(1, min(max_lines, 5))
+    return rng.randint(6, max_lines)
+
+
+def generate_purchase_orders(
+    count: int,
+    seed: int = 42,
+    with_line_items: bool = True,
+    suppliers: list | None = None,
+    descriptions: list | None = None,
+    supplier_skew: float = 0.0,
+    max_lines: int = 5,
+) -> list:
+    """
+    Generates `count` synthetic POs shaped like `purchase_orders.json`.
+    `with_line_items=False` keeps header-only records for cheap, very large catalogues.
+    `suppliers` / `descriptions` draw supplier names / line descriptions from the given
+    pools instead of the small default sets.
+    `supplier_skew` > 0 draws suppliers from a Zipf distribution (a few suppliers
+    hold most POs); `max_lines` > 5 adds occasional bulk orders of up to that many lines.
+    """
+    rng = random.Random(seed)
+    start_date = date(2024, 1, 1)
+    purchase_orders = []
+    cum_weights = (
+        zipf_cum_weights(len(suppliers), supplier_skew) if suppliers and supplier_skew else None
+    )
+
+    for i in range(count):
+        line_items = []
+        if with_line_items:
+            for _ in range(_line_count(rng, max_lines)):
+                quantity = rng.randint(1, 200)
+                unit_price = round(rng.uniform(1, 250), 2)
+                line_items.append(
+                    {
+                        "item_id": f"ITM-{rng.randint(0, 9999):04d}",
+                        "description": rng.choice(descriptions or PRODUCTS),
+                        "quantity": quantity,
+                        "unit": "kg",
+                        "unit_price": unit_price,
+                        "line_total": round(quantity * unit_price, 2),
+                    }
+                )
+
+        subtotal = sum(item["line_total"] for item in line_items)
+        purchase_orders.append(
+            {
+                "po_number": f"PO-{2024 + i // 1_000_000}-{i:07d}",
+                "supplier": (
+                    rng.choices(suppliers, cum_weights=cum_weights)[0]
+                    if cum_weights
+                    else rng.choice(suppliers)
+                    if suppliers
+                    else f"{rng.choice(SUPPLIER_PREFIXES)}{rng.choice(SUPPLIER_SUFFIXES)}"
+                ),
+                "date": (start_date + timedelta(days=rng.randint(0, 365))).isoformat(),
+                "total": round(subtotal * 1.2, 2),
+                "currency": "GBP",
+                "line_items": line_items,
+            }
+        )
+
+    return purchase_orders
+
+
+def generate_catalogue(
+    count: int,
+    seed: int = 42,
+    suppliers: int | None = None,
+    descriptions: int | None = None,
+    supplier_skew: float = 1.1,
+    max_lines: int = 40,
+) -> list:
+    """
+    A realistic synthetic PO catalogue: Zipf-skewed suppliers (`count // 20` by
+    default), near-duplicate description families (`count // 4` descriptions)
+    and varied line counts.
+    """
+    return generate_purchase_orders(
+        count,
+        seed=seed,
+        suppliers=generate_supplier_names(suppliers or max(1, count // 20), seed),
+        descriptions=generate_description_families(descriptions or max(1, count // 4), seed),
+        supplier_skew=supplier_skew,
+        max_lines=max_lines,
+    )
+
+
+def noisy_variant(name: str, rng: random.Random) -> str:
+    """Mimics OCR / typing noise: case changes, dropped or swapped characters, stray spaces."""
+    chars = list(name)
+    for _ in range(rng.randint(0, 3)):
+        i = rng.randrange(len(chars))
+        op = rng.choice(["drop", "swap", "upper", "space"])
+        if op == "drop" and len(chars) > 4:
+            chars.pop(i)
+        elif op == "swap" and i + 1 < len(chars):
+            chars[i], chars[i + 1] = chars[i + 1], chars[i]
+        elif op == "upper":
+            chars[i] = chars[i].upper()
+        elif op == "space":
+            chars.insert(i, " ")
+    return "".join(chars)
+
+
+class InvoiceNoise(NamedTuple):
+    """How often each kind of noise is applied when invoicing a PO (probabilities)."""
+
+    description: float = 1.0  ## per line: OCR noise in the description
+    supplier: float = 0.0  ## OCR noise in the supplier name
+    price: float = 0.0  ## per line: unit price drifts by up to 5%
+    quantity: float = 0.0  ## per line: short delivery
+    missing_line: float = 0.0  ## per line: left off the invoice
+
+
+NOISE_LEVELS = {
+    "none": InvoiceNoise(description=0.0),
+    "low": InvoiceNoise(),
+    "medium": InvoiceNoise(supplier=0.3, price=0.05, quantity=0.05, missing_line=0.05),
+    "high": InvoiceNoise(supplier=0.6, price=0.15, quantity=0.15, missing_line=0.15),
+}
+
+## Which matching tier each kind of invoice is built to be resolved by
+SCENARIOS = ("po_reference", "supplier", "product_only")
+
+
+def _chance(rng: random.Random, probability: float) -> bool:
+    ## Certain and impossible outcomes draw nothing, so the default noise keeps old seeds' output
+    if probability >= 1:
+        return True
+    return probability > 0 and rng.random() < probability
+
+
+def invoice_for(
+    po: dict,
+    scenario: str,
+    rng: random.Random,
+    noise: InvoiceNoise = InvoiceNoise(),
+) -> InvoiceExtractionResults:
+    """An invoice billing `po` with `noise`, stripped of the fields the higher tiers rely on."""
+    line_items = []
+    for line in po["line_items"]:
+        if line_items and _chance(rng, noise.missing_line):
+            continue
+        quantity, unit_price = line["quantity"], line["unit_price"]
+        if _chance(rng, noise.quantity):
+            quantity = max(1, round(quantity * rng.uniform(0.5, 0.95)))
+        if _chance(rng, noise.price):
+            unit_price = round(unit_price * rng.uniform(0.95, 1.05), 2)
+        line_items.append(
+            {
+                "item_id": line["item_id"],
+                "description": (
+                    noisy_variant(line["description"], rng)
+                    if _chance(rng, noise.description)
+                    else line["description"]
+                ),
+                "quantity": quantity,
+                "unit": line["unit"],
+                "unit_price": unit_price,
+                "line_total": round(quantity * unit_price, 2),
+                "extraction_confidence": 0.95,
+            }
+        )
+    subtotal = round(sum(line["line_total"] for line in line_items), 2)
+    invoice_number = f"INV-{rng.randint(0, 99999):05d}"
+    supplier_name = po["supplier"]
+    if _chance(rng, noise.supplier):
+        supplier_name = noisy_variant(supplier_name, rng)
+
+    return InvoiceExtractionResults(
+        invoice_number=invoice_number,
+        invoice_date=date.fromisoformat(po["date"]),
+        supplier_name=supplier_name if scenario != "product_only" else "Unknown Trader",
+        supplier_address="",
+        supplier_vat="",
+        po_number=po["po_number"] if scenario == "po_reference" else "",
+        payment_terms="30 days",
+        currency=po["currency"],
+        bill_to={"company_name": "Benchmark Ltd", "address": ""},
+        line_items=line_items,
+        totals={
+            "subtotal": subtotal,
+            "vat_rate": 0.2,
+            "vat_amount": round(subtotal * 0.2, 2),
+            "total_due": round(subtotal * 1.2, 2),
+        },
+    )
+
+
+def generate_invoices(
+    purchase_orders: list,
+    count: int,
+    scenario: str,
+    seed: int = 7,
+    noise: InvoiceNoise = InvoiceNoise(),
+) -> list:
+    """`count` noisy invoices for randomly chosen POs, as (invoice, source PO) pairs."""
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(count):
+        po = rng.choice(purchase_orders)
+        pairs.append((invoice_for(po, scenario, rng, noise), po))
+    return pairs
@@ -1,4 +1,5 @@
 from dotenv import load_dotenv
+from pathlib import Path
 import os
 
 load_dotenv()
@@ -10,6 +11,13 @@ def require_env(name: str) -> str:
         raise RuntimeError(f"Missing required environment variable: {name}")
     return value
 
+
+def optional_env(name: str, default: str | None = None) -> str | None:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value
+
 ### LOAD THE NECESSARY ENV VARS 
 GOOGLE_API_KEY = require_env("GOOGLE_API_KEY")
 GROQ_API_KEY = require_env("GROQ_API_KEY")
@@ -18,3 +26,77 @@ GOOGLE_MODEL = require_env("GOOGLE_MODEL")
 GROQ_MODEL = require_env("GROQ_MODEL")
 GROQ_OCR_MODEL = require_env("GROQ_OCR_MODEL")
 
+### OPTIONAL TUNING VARS
+GROQ_BASE_URL = optional_env("GROQ_BASE_URL")
+LLM_MAX_CONNECTIONS = int(optional_env("LLM_MAX_CONNECTIONS", "32"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(optional_env("LLM_MAX_KEEPALIVE_CONNECTIONS", "32"))
+## In-flight LLM requests per process (0 = unlimited); waits show up as queue_wait_sec
+LLM_MAX_CONCURRENCY = int(optional_env("LLM_MAX_CONCURRENCY", str(LLM_MAX_CONNECTIONS)))
+
+## Relative to ROOT
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+
+LLM_CACHE_ENABLED = optional_env("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_DIR = Path(optional_env("LLM_CACHE_DIR", str(ROOT_DIR / ".cache" / "llm")))
+LLM_CACHE_MAX_MB = float(optional_env("LLM_CACHE_MAX_MB", "256"))
+
+OCR_CACHE_ENABLED = optional_env("OCR_CACHE_ENABLED", "true").lower() == "true"
+OCR_CACHE_DIR = Path(optional_env("OCR_CACHE_DIR", str(ROOT_DIR / ".cache" / "ocr")))
+OCR_CACHE_MAX_MB = float(optional_env("OCR_CACHE_MAX_MB", "128"))
+
+OCR_PAGE_CONCURRENCY = int(optional_env("OCR_PAGE_CONCURRENCY", "4"))
+OCR_GLOBAL_CONCURRENCY = int(optional_env("OCR_GLOBAL_CONCURRENCY", "8"))
+
+OCR_IMAGE_FORMAT = optional_env("OCR_IMAGE_FORMAT", "png").lower()
+OCR_IMAGE_QUALITY = int(optional_env("OCR_IMAGE_QUALITY", "85"))
+OCR_GRAYSCALE = optional_env("OCR_GRAYSCALE", "false").lower() == "true"
+OCR_DPI = optional_env("OCR_DPI", "300")
+OCR_DPI = OCR_DPI if OCR_DPI == "auto" else int(OCR_DPI)
+OCR_MAX_PIXELS = int(optional_env("OCR_MAX_PIXELS", "0"))
+
+## Line item pairing per matching tier: "greedy" | "optimal"
+PAIRING_MODE_PRIMARY = optional_env("PAIRING_MODE_PRIMARY", "greedy").lower()
+PAIRING_MODE_SECONDARY = optional_env("PAIRING_MODE_SECONDARY", "greedy").lower()
+PAIRING_MODE_TERTIARY = optional_env("PAIRING_MODE_TERTIARY", "greedy").lower()
+
+## How the matching tiers run: "sequential" | "thread" | "process"
+MATCHING_TIER_MODE = optional_env("MATCHING_TIER_MODE", "sequential").lower()
+MATCHING_TIER_WORKERS = int(optional_env("MATCHING_TIER_WORKERS", "3"))
+
+## Build the matching decision without the LLM when the tier results are unambiguous
+MATCHING_FAST_PATH_ENABLED = (
+    optional_env("MATCHING_FAST_PATH_ENABLED", "true").lower() == "true"
+)
+
+## Build the audit verdict from the validator report when the rules can classify it
+VALIDATION_RULES_ENABLED = (
+    optional_env("VALIDATION_RULES_ENABLED", "true").lower() == "true"
+)
+
+## Resolve forced escalations and fully clean runs from the rules table, without the LLM
+RESOLUTION_RULES_ENABLED = (
+    optional_env("RESOLUTION_RULES_ENABLED", "true").lower() == "true"
+)
+
+## Nested timing spans exported as JSONL (plus a Chrome trace file if TRACE_CHROME)
+TRACE_ENABLED = optional_env("TRACE_ENABLED", "false").lower() == "true"
+TRACE_DIR = Path(optional_env("TRACE_DIR", str(ROOT_DIR / "traces")))
+TRACE_CHROME = optional_env("TRACE_CHROME", "false").lower() == "true"
+
+## Record real LLM responses to cassettes, or replay them offline: "off" | "record" | "replay"
+LLM_REPLAY_MODE = optional_env("LLM_REPLAY_MODE", "off").lower()
+LLM_CASSETTE_DIR = Path(optional_env("LLM_CASSETTE_DIR", str(ROOT_DIR / "cassettes")))
+## Replayed response time: seconds, or "recorded" for each response's original time
+LLM_REPLAY_LATENCY = optional_env("LLM_REPLAY_LATENCY", "0").lower()
+LLM_REPLAY_JITTER = float(optional_env("LLM_REPLAY_JITTER", "0"))
+## Share of replayed calls that fail, drawn from LLM_REPLAY_ERRORS
+LLM_REPLAY_ERROR_RATE = float(optional_env("LLM_REPLAY_ERROR_RATE", "0"))
+LLM_REPLAY_ERRORS = optional_env("LLM_REPLAY_ERRORS", "timeout,rate_limit,malformed")
+LLM_REPLAY_SEED = optional_env("LLM_REPLAY_SEED")
+
+## Finished invoices are streamed as compact JSON lines; the per-invoice pretty files are opt-in
+RESULT_JSONL_ENABLED = optional_env("RESULT_JSONL_ENABLED", "true").lower() == "true"
+RESULT_DIR = Path(optional_env("RESULT_DIR", str(ROOT_DIR / "results")))
+RESULT_ROTATE_MB = float(optional_env("RESULT_ROTATE_MB", "64"))
+RESULT_GZIP = optional_env("RESULT_GZIP", "false").lower() == "true"
+RESULT_PRETTY_ENABLED = optional_env("RESULT_PRETTY_ENABLED", "false").lower() == "true"
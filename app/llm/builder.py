@@ -1,8 +1,9 @@
-from typing import Protocol, Type, TypeVar
+from typing import Dict, Optional, Protocol, Type, TypeVar
+import httpx
 from pydantic import BaseModel
-from ollama import chat
+from ollama import AsyncClient
 from langchain_google_genai import ChatGoogleGenerativeAI
-from groq import Groq
+from groq import AsyncGroq, DefaultAsyncHttpxClient
 from app.core.config import (
     GOOGLE_API_KEY,
     GROQ_API_KEY,
@@ -10,7 +11,27 @@ from app.core.config import (
     GOOGLE_MODEL,
     GROQ_MODEL,
     GROQ_OCR_MODEL,
+    GROQ_BASE_URL,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_DIR,
+    LLM_CACHE_MAX_MB,
+    LLM_REPLAY_MODE,
+    LLM_CASSETTE_DIR,
 )
+from app.llm.cache import CachedStructuredLLM
+from app.llm.replay import (
+    REPLAY_MODES,
+    Cassette,
+    RecordingImageLLM,
+    RecordingStructuredLLM,
+    ReplayFaults,
+    ReplayImageLLM,
+    ReplayStructuredLLM,
+)
+from app.llm.telemetry import llm_call, note_usage, phase, queued
+from app.utils.disk_cache import DiskCache
 
 T = TypeVar("T", bound=BaseModel)
 
@@ -23,37 +44,68 @@ def parse_structured_output(raw: object, output_model: Type[T]) -> T:
     return output_model.model_validate_json(raw)
 
 
+def note_groq_usage(raw_response, completion) -> None:
+    """Token usage, server queue time and SDK retries of a Groq raw response."""
+    usage = completion.usage
+    note_usage(
+        prompt_tokens=usage.prompt_tokens if usage else None,
+        completion_tokens=usage.completion_tokens if usage else None,
+        server_queue_sec=usage.queue_time if usage else None,
+        ## The SDK stamps each attempt with how many retries preceded it
+        retries=int(raw_response.http_request.headers.get("x-stainless-retry-count", 0)),
+    )
+
+
 ### Pythonic Protocol for a common invoke method for all llms ###
 class StructuredLLM(Protocol):
     async def invoke(
         self,
         prompt: str,
         output_model: Type[T],
+        use_cache: bool = True,  ## Per-call opt-out of the response cache, if any
     ) -> T: ...
 
 
 ### Ollama Implementation
 class OllamaStructuredLLM:
-    def __init__(self, model: str):
+    def __init__(
+        self, model: str, host: str | None = None, limits: httpx.Limits | None = None
+    ):
+        self.client = AsyncClient(host=host, limits=limits)
         self.model = model
 
-    async def invoke(
-        self,
-        prompt: str,
-        output_model: Type[T],
-    ) -> T:
-        response = chat(
+    async def aclose(self) -> None:
+        await self.client.close()
+
+    async def complete(self, prompt: str, output_model: Type[BaseModel]) -> object:
+        response = await self.client.chat(
             model=self.model,
             messages=[{"role": "user", "content": prompt}],
             format=output_model.model_json_schema(),
         )
+        note_usage(
+            prompt_tokens=response.prompt_eval_count,
+            completion_tokens=response.eval_count,
+        )
+
+        return response.message.content
 
-        return parse_structured_output(response.message.content, output_model)
+    async def invoke(
+        self,
+        prompt: str,
+        output_model: Type[T],
+        use_cache: bool = True,  ## No cache at this level
+    ) -> T:
+        with llm_call("ollama", self.model) as call:
+            raw = await queued(call, self.complete(prompt, output_model))
+            with phase(call, "parse"):
+                return parse_structured_output(raw, output_model)
 
 
 ### Google Implementation
 class GoogleStructuredLLM:
     def __init__(self, api_key: str, model: str):
+        self.model = model
         self.llm = ChatGoogleGenerativeAI(
             model=model,
             api_key=api_key,
@@ -61,28 +113,51 @@ class GoogleStructuredLLM:
             response_mime_type="application/json",
         )
 
+    async def aclose(self) -> None:
+        ## The Gemini client manages its own transport; nothing to release here.
+        return None
+
+    async def complete(self, prompt: str, output_model: Type[BaseModel]) -> object:
+        response = await self.llm.ainvoke(prompt)
+        usage = response.usage_metadata or {}
+        note_usage(
+            prompt_tokens=usage.get("input_tokens"),
+            completion_tokens=usage.get("output_tokens"),
+        )
+
+        return response.content
+
     async def invoke(
         self,
         prompt: str,
         output_model: Type[T],
+        use_cache: bool = True,  ## No cache at this level
     ) -> T:
-        response = self.llm.invoke(prompt)
-
-        return parse_structured_output(response.content, output_model)
+        with llm_call("google", self.model) as call:
+            raw = await queued(call, self.complete(prompt, output_model))
+            with phase(call, "parse"):
+                return parse_structured_output(raw, output_model)
 
 
 ### Groq Implementation
 class GroqStructuredLLM:
-    def __init__(self, api_key: str, model: str) -> None:
-        self.client = Groq(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: str | None = None,
+        http_client: httpx.AsyncClient | None = None,
+    ) -> None:
+        self.client = AsyncGroq(
+            api_key=api_key, base_url=base_url, http_client=http_client
+        )
         self.model = model
 
-    async def invoke(
-        self,
-        prompt: str,
-        output_model: Type[T],
-    ) -> T:
-        completion = self.client.chat.completions.create(
+    async def aclose(self) -> None:
+        await self.client.close()
+
+    async def complete(self, prompt: str, output_model: Type[BaseModel]) -> object:
+        raw_response = await self.client.chat.completions.with_raw_response.create(
             model=self.model,
             messages=[{"role": "user", "content": prompt}],
             response_format={
@@ -93,23 +168,47 @@ class GroqStructuredLLM:
                 },
             },
         )
+        completion = await raw_response.parse()
+        note_groq_usage(raw_response, completion)
 
-        content = completion.choices[0].message.content
-        return parse_structured_output(content, output_model)
+        return completion.choices[0].message.content
+
+    async def invoke(
+        self,
+        prompt: str,
+        output_model: Type[T],
+        use_cache: bool = True,  ## No cache at this level
+    ) -> T:
+        with llm_call("groq", self.model) as call:
+            raw = await queued(call, self.complete(prompt, output_model))
+            with phase(call, "parse"):
+                return parse_structured_output(raw, output_model)
 
 
 ### Groq Implementation
 class GroqImageLLM:
-    def __init__(self, api_key: str, model: str) -> None:
-        self.client = Groq(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: str | None = None,
+        http_client: httpx.AsyncClient | None = None,
+    ) -> None:
+        self.client = AsyncGroq(
+            api_key=api_key, base_url=base_url, http_client=http_client
+        )
         self.model = model
 
-    async def invoke(
+    async def aclose(self) -> None:
+        await self.client.close()
+
+    async def complete(
         self,
         request: str,
         base64_image: str,
+        mime_type: str = "image/png",
     ) -> str | None:
-        completion = self.client.chat.completions.create(
+        raw_response = await self.client.chat.completions.with_raw_response.create(
             model=self.model,
             messages=[
                 {
@@ -119,34 +218,189 @@ class GroqImageLLM:
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}",
+                                "url": f"data:{mime_type};base64,{base64_image}",
                             },
                         },
                     ],
                 }
             ],
         )
+        completion = await raw_response.parse()
+        note_groq_usage(raw_response, completion)
 
-        content = completion.choices[0].message.content
-        return content
+        return completion.choices[0].message.content
+
+    async def invoke(
+        self,
+        request: str,
+        base64_image: str,
+        mime_type: str = "image/png",
+    ) -> str | None:
+        with llm_call("groq", self.model) as call:
+            return await queued(call, self.complete(request, base64_image, mime_type))
 
 
 class LLMProviderFactory:
-    @staticmethod
-    def ollama() -> StructuredLLM:
-        return OllamaStructuredLLM(model=OLLAMA_MODEL)
+    """
+    Hands out long-lived, per-provider LLM clients.
+
+    Each provider is built once and reused by every node and every OCR'd page,
+    so HTTP keep-alive connections and TLS sessions survive across calls.
+    Both Groq providers share a single bounded connection pool.
+
+    Runners should call `startup()` before processing and `await shutdown()`
+    when done; `shutdown()` closes every pooled connection, after which the
+    next call builds fresh clients (e.g. inside a new event loop).
+
+    Structured providers are wrapped in an on-disk response cache unless
+    LLM_CACHE_ENABLED is false.
+
+    LLM_REPLAY_MODE=record saves every real response to a cassette (bypassing
+    the response cache); LLM_REPLAY_MODE=replay serves every provider from the
+    cassette instead, with synthetic latency and errors (see app/llm/replay.py),
+    and never builds a real client.
+    """
+
+    _instances: Dict[str, object] = {}
+    _groq_http_client: Optional[httpx.AsyncClient] = None
+    _response_cache: Optional[DiskCache] = None
+    _cassette: Optional[Cassette] = None
+    _replay_faults: Optional[ReplayFaults] = None
 
     @staticmethod
-    def google() -> StructuredLLM:
-        return GoogleStructuredLLM(
-            model=GOOGLE_MODEL,
-            api_key=GOOGLE_API_KEY,
+    def _pool_limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
         )
 
-    @staticmethod
-    def groq() -> StructuredLLM:
-        return GroqStructuredLLM(api_key=GROQ_API_KEY, model=GROQ_MODEL)
+    @classmethod
+    def _shared_groq_http_client(cls) -> httpx.AsyncClient:
+        if cls._groq_http_client is None or cls._groq_http_client.is_closed:
+            cls._groq_http_client = DefaultAsyncHttpxClient(limits=cls._pool_limits())
+        return cls._groq_http_client
+
+    @classmethod
+    def response_cache(cls) -> DiskCache:
+        if cls._response_cache is None:
+            cls._response_cache = DiskCache(
+                LLM_CACHE_DIR, max_bytes=int(LLM_CACHE_MAX_MB * 1024 * 1024)
+            )
+        return cls._response_cache
+
+    @classmethod
+    def _with_cache(cls, llm, provider: str):
+        if not LLM_CACHE_ENABLED:
+            return llm
+        return CachedStructuredLLM(llm, provider=provider, cache=cls.response_cache())
+
+    @classmethod
+    def cassette(cls) -> Cassette:
+        if cls._cassette is None:
+            cls._cassette = Cassette(LLM_CASSETTE_DIR)
+        return cls._cassette
+
+    @classmethod
+    def replay_faults(cls) -> ReplayFaults:
+        ## One fault generator for every provider, so a seeded run is repeatable
+        if cls._replay_faults is None:
+            cls._replay_faults = ReplayFaults.from_config()
+        return cls._replay_faults
 
     @staticmethod
-    def groqImage():
-        return GroqImageLLM(api_key=GROQ_API_KEY, model=GROQ_OCR_MODEL)
+    def _replay_mode() -> str:
+        if LLM_REPLAY_MODE not in REPLAY_MODES:
+            raise ValueError(f"Unknown LLM replay mode: {LLM_REPLAY_MODE}")
+        return LLM_REPLAY_MODE
+
+    @classmethod
+    def _structured(cls, provider: str, model: str, build) -> StructuredLLM:
+        """The provider built by `build()`, recorded / replayed / cached as configured."""
+        mode = cls._replay_mode()
+        if mode == "replay":
+            return ReplayStructuredLLM(provider, model, cls.cassette(), cls.replay_faults())
+        if mode == "record":
+            return RecordingStructuredLLM(build(), provider, cls.cassette())
+        return cls._with_cache(build(), provider)
+
+    @classmethod
+    def startup(cls) -> None:
+        """Eagerly builds the Groq clients used by the workflow (no network calls)."""
+        cls.groq()
+        cls.groqImage()
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        """Closes every pooled client and forgets them."""
+        instances = list(cls._instances.values())
+        cls._instances.clear()
+
+        for instance in instances:
+            await instance.aclose()
+
+        if cls._groq_http_client is not None:
+            await cls._groq_http_client.aclose()
+            cls._groq_http_client = None
+
+    @classmethod
+    def use(cls, name: str, llm) -> None:
+        """Installs `llm` as the named provider (e.g. a load-test stub) until shutdown()."""
+        cls._instances[name] = llm
+
+    @classmethod
+    def ollama(cls) -> StructuredLLM:
+        if "ollama" not in cls._instances:
+            cls._instances["ollama"] = cls._structured(
+                "ollama",
+                OLLAMA_MODEL,
+                lambda: OllamaStructuredLLM(model=OLLAMA_MODEL, limits=cls._pool_limits()),
+            )
+        return cls._instances["ollama"]
+
+    @classmethod
+    def google(cls) -> StructuredLLM:
+        if "google" not in cls._instances:
+            cls._instances["google"] = cls._structured(
+                "google",
+                GOOGLE_MODEL,
+                lambda: GoogleStructuredLLM(
+                    model=GOOGLE_MODEL,
+                    api_key=GOOGLE_API_KEY,
+                ),
+            )
+        return cls._instances["google"]
+
+    @classmethod
+    def groq(cls) -> StructuredLLM:
+        if "groq" not in cls._instances:
+            cls._instances["groq"] = cls._structured(
+                "groq",
+                GROQ_MODEL,
+                lambda: GroqStructuredLLM(
+                    api_key=GROQ_API_KEY,
+                    model=GROQ_MODEL,
+                    base_url=GROQ_BASE_URL,
+                    http_client=cls._shared_groq_http_client(),
+                ),
+            )
+        return cls._instances["groq"]
+
+    @classmethod
+    def groqImage(cls) -> GroqImageLLM:
+        if "groqImage" not in cls._instances:
+            mode = cls._replay_mode()
+            if mode == "replay":
+                llm = ReplayImageLLM(
+                    "groq", GROQ_OCR_MODEL, cls.cassette(), cls.replay_faults()
+                )
+            else:
+                llm = GroqImageLLM(
+                    api_key=GROQ_API_KEY,
+                    model=GROQ_OCR_MODEL,
+                    base_url=GROQ_BASE_URL,
+                    http_client=cls._shared_groq_http_client(),
+                )
+                if mode == "record":
+                    llm = RecordingImageLLM(llm, "groq", cls.cassette())
+            cls._instances["groqImage"] = llm
+        return cls._instances["groqImage"]
@@ -0,0 +1,89 @@
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Type, TypeVar
+from pydantic import BaseModel
+from app.llm.telemetry import llm_call, phase, queued
+from app.utils.disk_cache import DiskCache, content_hash
+
+T = TypeVar("T", bound=BaseModel)
+
+## Collects cache hits for whichever graph node is currently running
+_cache_hits: ContextVar[Optional[List[str]]] = ContextVar("llm_cache_hits", default=None)
+
+
+@contextmanager
+def track_cache_hits():
+    """
+    Records every LLM cache hit made inside the block.
+
+    Yields the list of cache keys that were served from disk, so a graph
+    node can report how many of its LLM calls were skipped.
+    """
+    hits: List[str] = []
+    token = _cache_hits.set(hits)
+    try:
+        yield hits
+    finally:
+        _cache_hits.reset(token)
+
+
+def schema_hash(output_model: Type[BaseModel]) -> str:
+    """Hash of the pydantic JSON schema, so schema changes invalidate old entries."""
+    return content_hash(json.dumps(output_model.model_json_schema(), sort_keys=True))
+
+
+def response_cache_key(
+    provider: str, model: str, prompt: str, output_model: Type[BaseModel]
+) -> str:
+    return content_hash(provider, model, content_hash(prompt), schema_hash(output_model))
+
+
+class CachedStructuredLLM:
+    """
+    StructuredLLM wrapper that serves byte-identical requests from disk.
+
+    The key covers provider, model, prompt hash and output schema hash.
+    Only responses that validated against `output_model` are stored, so a
+    malformed completion is never replayed.
+    """
+
+    def __init__(self, llm, provider: str, cache: DiskCache):
+        self.llm = llm
+        self.provider = provider
+        self.model = llm.model
+        self.cache = cache
+
+    async def aclose(self) -> None:
+        await self.llm.aclose()
+
+    async def invoke(
+        self,
+        prompt: str,
+        output_model: Type[T],
+        use_cache: bool = True,
+    ) -> T:
+        if not use_cache:
+            return await self.llm.invoke(prompt, output_model)
+
+        key = response_cache_key(self.provider, self.model, prompt, output_model)
+
+        with llm_call(self.provider, self.model) as call:
+            cached = self.cache.get(key)
+            if cached is not None:
+                hits = _cache_hits.get()
+                if hits is not None:
+                    hits.append(key)
+                call["cache_hit"] = True
+                with phase(call, "parse"):
+                    return output_model.model_validate_json(cached)
+
+            raw = await queued(call, self.llm.complete(prompt, output_model))
+            if not isinstance(raw, str):
+                raise TypeError(f"Expected JSON string, got {type(raw)}")
+
+            with phase(call, "parse"):
+                result = output_model.model_validate_json(raw)
+            self.cache.set(key, raw)
+
+        return result
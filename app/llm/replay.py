@@ -0,0 +1,273 @@
+import asyncio
+import json
+import random
+import sys
+from typing import List, Optional, Type, TypeVar
+
+import httpx
+from groq import APITimeoutError, RateLimitError
+from pydantic import BaseModel
+
+from app.core.config import (
+    LLM_REPLAY_ERROR_RATE,
+    LLM_REPLAY_ERRORS,
+    LLM_REPLAY_JITTER,
+    LLM_REPLAY_LATENCY,
+    LLM_REPLAY_SEED,
+)
+from app.llm.cache import response_cache_key
+from app.llm.telemetry import llm_call, note_usage, phase, queued
+from app.utils.disk_cache import DiskCache, content_hash
+
+T = TypeVar("T", bound=BaseModel)
+
+REPLAY_MODES = ("off", "record", "replay")
+FAULTS = ("timeout", "rate_limit", "malformed")
+
+## Same retry policy as the Groq SDK: timeouts and 429s are retried twice with backoff
+MAX_RETRIES = 2
+INITIAL_RETRY_DELAY_SEC = 0.5
+
+
+class CassetteMissError(RuntimeError):
+    """Replay was asked for a request that was never recorded."""
+
+
+def image_request_key(
+    provider: str, model: str, request: str, base64_image: str, mime_type: str
+) -> str:
+    return content_hash(provider, model, request, content_hash(base64_image), mime_type)
+
+
+class Cassette:
+    """
+    Recorded LLM responses, one JSON file per request under `directory`
+    (see DiskCache), keyed like the response cache: provider, model, prompt
+    hash and output schema hash (image hash for OCR). Never evicted.
+
+    Each recording holds the raw response text, its original response time
+    and the token usage the provider reported.
+    """
+
+    def __init__(self, directory):
+        self.store = DiskCache(directory, max_bytes=sys.maxsize)
+
+    def record(self, key: str, provider: str, model: str, response: str, call: dict) -> None:
+        self.store.set(
+            key,
+            json.dumps(
+                {
+                    "provider": provider,
+                    "model": model,
+                    "response": response,
+                    "response_sec": call["response_sec"],
+                    "prompt_tokens": call["prompt_tokens"],
+                    "completion_tokens": call["completion_tokens"],
+                }
+            ),
+        )
+
+    def load(self, key: str, provider: str) -> dict:
+        recording = self.store.get(key)
+        if recording is None:
+            raise CassetteMissError(
+                f"No {provider} recording for request {key[:12]} in {self.store.directory}; "
+                "record it first with LLM_REPLAY_MODE=record"
+            )
+        return json.loads(recording)
+
+
+class ReplayFaults:
+    """
+    Synthetic latency and error injection for replayed calls.
+
+    `latency` is seconds per response, or "recorded" for the original
+    response time, scaled by a random factor within +/- `jitter`. A share
+    `error_rate` of attempts fails with one of `errors`:
+      - "timeout":    waits out the latency, then raises groq.APITimeoutError
+      - "rate_limit": raises groq.RateLimitError (HTTP 429) straight away
+      - "malformed":  returns the response cut in half, so parsing fails
+                      (structured calls only; OCR text has no format to break)
+    Timeouts and 429s are retried like the SDK would; `seed` makes a run repeatable.
+    """
+
+    def __init__(
+        self,
+        latency: str = "0",
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        errors: List[str] = FAULTS,
+        seed: Optional[int] = None,
+    ):
+        unknown = set(errors) - set(FAULTS)
+        if unknown:
+            raise ValueError(f"Unknown replay faults: {', '.join(sorted(unknown))}")
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.errors = list(errors)
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def from_config(cls) -> "ReplayFaults":
+        return cls(
+            latency=LLM_REPLAY_LATENCY,
+            jitter=LLM_REPLAY_JITTER,
+            error_rate=LLM_REPLAY_ERROR_RATE,
+            errors=[e.strip() for e in LLM_REPLAY_ERRORS.split(",") if e.strip()],
+            seed=int(LLM_REPLAY_SEED) if LLM_REPLAY_SEED is not None else None,
+        )
+
+    def latency_for(self, recording: dict) -> float:
+        if self.latency == "recorded":
+            latency = recording.get("response_sec") or 0.0
+        else:
+            latency = float(self.latency)
+        return max(0.0, latency * self.rng.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def fault(self, structured: bool) -> Optional[str]:
+        errors = self.errors if structured else [e for e in self.errors if e != "malformed"]
+        if errors and self.rng.random() < self.error_rate:
+            return self.rng.choice(errors)
+        return None
+
+    async def play(self, recording: dict, structured: bool = True) -> str:
+        """The recorded response after the simulated latency, unless a fault is drawn."""
+        request = httpx.Request("POST", f"https://replay.invalid/{recording['provider']}")
+        attempt, fault = 0, self.fault(structured)
+        while fault in ("timeout", "rate_limit") and attempt < MAX_RETRIES:
+            if fault == "timeout":
+                await asyncio.sleep(self.latency_for(recording))
+            await asyncio.sleep(INITIAL_RETRY_DELAY_SEC * 2**attempt)
+            attempt, fault = attempt + 1, self.fault(structured)
+        note_usage(retries=attempt)
+
+        if fault == "rate_limit":
+            raise RateLimitError(
+                "Rate limit reached (injected by replay)",
+                response=httpx.Response(429, request=request, headers={"retry-after": "1"}),
+                body=None,
+            )
+        await asyncio.sleep(self.latency_for(recording))
+        if fault == "timeout":
+            raise APITimeoutError(request=request)
+
+        note_usage(
+            prompt_tokens=recording.get("prompt_tokens"),
+            completion_tokens=recording.get("completion_tokens"),
+            retries=attempt,
+        )
+        response = recording["response"]
+        if fault == "malformed":
+            return response[: len(response) // 2]
+        return response
+
+
+### Structured providers
+class RecordingStructuredLLM:
+    """Calls the real provider and saves every response that parses to the cassette."""
+
+    def __init__(self, llm, provider: str, cassette: Cassette):
+        self.llm = llm
+        self.provider = provider
+        self.model = llm.model
+        self.cassette = cassette
+
+    async def aclose(self) -> None:
+        await self.llm.aclose()
+
+    async def invoke(self, prompt: str, output_model: Type[T], use_cache: bool = True) -> T:
+        ## Recording always reaches the provider; use_cache has nothing to skip
+        key = response_cache_key(self.provider, self.model, prompt, output_model)
+
+        with llm_call(self.provider, self.model) as call:
+            raw = await queued(call, self.llm.complete(prompt, output_model))
+            if not isinstance(raw, str):
+                raise TypeError(f"Expected JSON string, got {type(raw)}")
+
+            with phase(call, "parse"):
+                result = output_model.model_validate_json(raw)
+            self.cassette.record(key, self.provider, self.model, raw, call)
+
+        return result
+
+
+class ReplayStructuredLLM:
+    """
+    Serves a provider's recorded responses, with ReplayFaults latency and errors.
+    Calls are recorded under the provider, flagged `replay`, with the token
+    usage stored in the cassette.
+    """
+
+    def __init__(self, provider: str, model: str, cassette: Cassette, faults: ReplayFaults):
+        self.provider = provider
+        self.model = model
+        self.cassette = cassette
+        self.faults = faults
+
+    async def aclose(self) -> None:
+        return None
+
+    async def complete(self, prompt: str, output_model: Type[BaseModel]) -> str:
+        key = response_cache_key(self.provider, self.model, prompt, output_model)
+        return await self.faults.play(self.cassette.load(key, self.provider))
+
+    async def invoke(self, prompt: str, output_model: Type[T], use_cache: bool = True) -> T:
+        ## Every replayed call is served from the cassette; use_cache has nothing to skip
+        with llm_call(self.provider, self.model) as call:
+            call["replay"] = True
+            raw = await queued(call, self.complete(prompt, output_model))
+            with phase(call, "parse"):
+                return output_model.model_validate_json(raw)
+
+
+### OCR
+class RecordingImageLLM:
+    """Calls the real vision model and saves every non-empty answer to the cassette."""
+
+    def __init__(self, llm, provider: str, cassette: Cassette):
+        self.llm = llm
+        self.provider = provider
+        self.model = llm.model
+        self.cassette = cassette
+
+    async def aclose(self) -> None:
+        await self.llm.aclose()
+
+    async def invoke(
+        self, request: str, base64_image: str, mime_type: str = "image/png"
+    ) -> str | None:
+        key = image_request_key(self.provider, self.model, request, base64_image, mime_type)
+
+        with llm_call(self.provider, self.model) as call:
+            content = await queued(call, self.llm.complete(request, base64_image, mime_type))
+            if content:
+                self.cassette.record(key, self.provider, self.model, content, call)
+
+        return content
+
+
+class ReplayImageLLM:
+    """Serves recorded OCR answers, with ReplayFaults latency and errors."""
+
+    def __init__(self, provider: str, model: str, cassette: Cassette, faults: ReplayFaults):
+        self.provider = provider
+        self.model = model
+        self.cassette = cassette
+        self.faults = faults
+
+    async def aclose(self) -> None:
+        return None
+
+    async def complete(
+        self, request: str, base64_image: str, mime_type: str = "image/png"
+    ) -> str:
+        key = image_request_key(self.provider, self.model, request, base64_image, mime_type)
+        return await self.faults.play(self.cassette.load(key, self.provider), structured=False)
+
+    async def invoke(
+        self, request: str, base64_image: str, mime_type: str = "image/png"
+    ) -> str | None:
+        with llm_call(self.provider, self.model) as call:
+            call["replay"] = True
+            return await queued(call, self.complete(request, base64_image, mime_type))
@@ -0,0 +1,159 @@
+import asyncio
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Coroutine, List, Optional
+
+from app.core.config import LLM_MAX_CONCURRENCY
+from app.utils.tracing import span
+
+## Collects the LLM calls of whichever graph node is currently running
+_llm_calls: ContextVar[Optional[List[dict]]] = ContextVar("llm_calls", default=None)
+## The record of the LLM call in progress, for providers to add usage to
+_current_call: ContextVar[Optional[dict]] = ContextVar("current_llm_call", default=None)
+
+## Event loop -> asyncio.Semaphore (a semaphore cannot be shared across loops)
+_llm_semaphores = weakref.WeakKeyDictionary()
+
+
+@contextmanager
+def track_llm_calls():
+    """
+    Records every LLM call made inside the block.
+
+    Yields the list of call records (see `llm_call`), so a graph node can
+    report where its LLM time went.
+    """
+    calls: List[dict] = []
+    token = _llm_calls.set(calls)
+    try:
+        yield calls
+    finally:
+        _llm_calls.reset(token)
+
+
+@contextmanager
+def llm_call(provider: str, model: str):
+    """
+    Times one LLM call and records it with the tracking node, if any.
+
+    Yields the record; `queued` and `phase` fill in where the time went and
+    providers add token usage through `note_usage`:
+
+        {
+          "provider", "model", "cache_hit",
+          "replay",           # served from a recorded cassette (LLM_REPLAY_MODE=replay)
+          "queue_wait_sec",   # waiting for an LLM_MAX_CONCURRENCY slot
+          "response_sec",     # request sent -> response received (incl. SDK retries)
+          "parse_sec",        # validating the response into the output model
+          "total_sec",
+          "prompt_tokens", "completion_tokens",   # None when the provider doesn't say
+          "server_queue_sec",                     # provider-side queueing, if reported
+          "retries",
+          "error",                                # exception type, if the call failed
+        }
+    """
+    call = {
+        "provider": provider,
+        "model": model,
+        "cache_hit": False,
+        "replay": False,
+        "queue_wait_sec": 0.0,
+        "response_sec": 0.0,
+        "parse_sec": 0.0,
+        "total_sec": 0.0,
+        "prompt_tokens": None,
+        "completion_tokens": None,
+        "server_queue_sec": None,
+        "retries": 0,
+        "error": None,
+    }
+    with span("llm.call", provider=provider, model=model) as trace_span:
+        token = _current_call.set(call)
+        starttime = time.perf_counter()
+        try:
+            yield call
+        except Exception as e:
+            call["error"] = type(e).__name__
+            raise
+        finally:
+            _current_call.reset(token)
+            call["total_sec"] = round(time.perf_counter() - starttime, 3)
+            calls = _llm_calls.get()
+            if calls is not None:
+                calls.append(call)
+            if trace_span is not None:
+                trace_span["attributes"].update(
+                    cache_hit=call["cache_hit"],
+                    prompt_tokens=call["prompt_tokens"],
+                    completion_tokens=call["completion_tokens"],
+                    retries=call["retries"],
+                )
+
+
+@contextmanager
+def phase(call: dict, name: str):
+    """Adds the block's duration to `call[f"{name}_sec"]` (and traces it as `llm.<name>`)."""
+    starttime = time.perf_counter()
+    try:
+        with span(f"llm.{name}"):
+            yield
+    finally:
+        call[f"{name}_sec"] = round(
+            call.get(f"{name}_sec", 0.0) + time.perf_counter() - starttime, 3
+        )
+
+
+def get_llm_semaphore() -> Optional[asyncio.Semaphore]:
+    """One process-wide LLM request limit per event loop; None when unlimited."""
+    if LLM_MAX_CONCURRENCY <= 0:
+        return None
+    loop = asyncio.get_running_loop()
+    semaphore = _llm_semaphores.get(loop)
+    if semaphore is None:
+        ## A semaphore that ever made a task wait holds its loop, keeping the weak
+        ## key alive; drop the ones of loops that have closed since
+        for closed in [other for other in _llm_semaphores if other.is_closed()]:
+            del _llm_semaphores[closed]
+        semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        _llm_semaphores[loop] = semaphore
+    return semaphore
+
+
+async def queued(call: dict, request: Coroutine):
+    """Awaits `request` once an LLM slot is free, timing the wait and the response."""
+    semaphore = get_llm_semaphore()
+    if semaphore is None:
+        with phase(call, "response"):
+            return await request
+
+    with phase(call, "queue_wait"):
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            request.close()  ## Cancelled while queued; the request never started
+            raise
+    try:
+        with phase(call, "response"):
+            return await request
+    finally:
+        semaphore.release()
+
+
+def note_usage(
+    prompt_tokens: Optional[int] = None,
+    completion_tokens: Optional[int] = None,
+    server_queue_sec: Optional[float] = None,
+    retries: int = 0,
+):
+    """Adds provider-reported usage to the LLM call in progress."""
+    call = _current_call.get()
+    if call is None:
+        return
+    call["prompt_tokens"] = prompt_tokens
+    call["completion_tokens"] = completion_tokens
+    call["server_queue_sec"] = (
+        round(server_queue_sec, 3) if server_queue_sec is not None else None
+    )
+    call["retries"] = retries
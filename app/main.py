@@ -1,50 +1,64 @@
+import argparse
 import asyncio
 
-from pydantic import ValidationError
-from app.workflow.graph import compiled_graph
-from app.models.graph import GraphState
-from app.utils.helpers import format_workflow_output, save_json_output
+from app.llm.builder import LLMProviderFactory
+from app.matching.tiers import shutdown_tier_executors
+from app.utils.result_sink import shutdown_result_sink
+from app.utils.tracing import shutdown_tracing
+from app.workflow.batch import run_invoice, run_batch, collect_invoice_files
 
 
-async def main():
-    file_name = "Invoice_1_Baseline.pdf"
-    # file_name = "Invoice_2_Scanned.pdf"
-    # file_name = "Invoice_3_Different_Format.pdf"
-    # file_name = "Invoice_4_Price_Trap.pdf"
-    # file_name = "Invoice_5_Missing_PO.pdf"
-
-    try:
-        initial_state = GraphState(file_name=file_name)
-
-        print(f"--- Starting Workflow for: {file_name} ---")
-        result = await compiled_graph.ainvoke(initial_state)
-        print("--- Workflow Completed Successfully ---")
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Run invoices through the processing workflow."
+    )
+    parser.add_argument(
+        "--dir",
+        dest="directory",
+        help="Process every PDF in this directory as one batch.",
+    )
+    parser.add_argument(
+        "--manifest",
+        help="Process the PDFs listed in this file (one path per line) as one batch.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Maximum number of invoices processed at the same time in batch mode.",
+    )
+    return parser.parse_args()
 
-        formatted_json = format_workflow_output(result)
 
-        print("\n## FINAL SYSTEM OUTPUT")
-        print(formatted_json)
-        save_json_output(formatted_json, file_name)
-
-    except ValidationError as e:
-        print(f"[Schema Error]: State validation failed.")
-        for error in e.errors():
-            print(f"  - Field {error['loc']}: {error['msg']}")
+async def main():
+    args = parse_args()
 
-    except FileNotFoundError as e:
-        print(f"[File Error]: Could not locate the document. {e}")
+    ## Pooled LLM clients live for the whole run
+    LLMProviderFactory.startup()
+    try:
+        await run(args)
+    finally:
+        await LLMProviderFactory.shutdown()
+        shutdown_tier_executors()
+        shutdown_result_sink()
+        shutdown_tracing()
 
-    except TypeError as e:
-        print(f"[Type Error]: An operation was performed on an incompatible type. {e}")
 
-    except ValueError as e:
-        print(f"[Value Error]: Received an inappropriate value. {e}")
+async def run(args):
+    ## Batch Mode
+    if args.directory or args.manifest:
+        files = collect_invoice_files(args.directory, args.manifest)
+        await run_batch(files, concurrency=args.concurrency)
+        return
 
-    except RuntimeError as e:
-        print(f"[Runtime Error]: An error occurred during runtime execution. {e}")
+    ## Single File Mode
+    file_name = "Invoice_1_Baseline.pdf"
+    # file_name = "Invoice_2_Scanned.pdf"
+    # file_name = "Invoice_3_Different_Format.pdf"
+    # file_name = "Invoice_4_Price_Trap.pdf"
+    # file_name = "Invoice_5_Missing_PO.pdf"
 
-    except Exception as e:
-        print(f"[Unexpected Error]: {type(e).__name__} - {str(e)}")
+    await run_invoice(file_name)
 
 
 if __name__ == "__main__":
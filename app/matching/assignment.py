@@ -0,0 +1,121 @@
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+
+def connected_components(weights: Dict[Tuple[int, int], float]) -> List[list]:
+    """
+    Splits the allowed (row, col) cells into independent groups: two cells
+    belong together when they share a row or a column, directly or through
+    other cells. Each group can be assigned on its own.
+    """
+    parent = {}
+
+    def find(node):
+        while parent.setdefault(node, node) != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for row, col in weights:
+        parent[find(("r", row))] = find(("c", col))
+
+    groups = defaultdict(list)
+    for row, col in weights:
+        groups[find(("r", row))].append((row, col))
+
+    return [sorted(cells) for _, cells in sorted(groups.items(), key=lambda g: min(g[1]))]
+
+
+def min_cost_assignment(cost: List[List[float]]) -> Dict[int, int]:
+    """
+    Hungarian algorithm (O(n^2 m)) for a rectangular cost matrix with
+    n rows <= m columns. Every row is assigned to a distinct column so that
+    the total cost is minimal.
+
+    Returns:
+        { row: col }
+    """
+    n, m = len(cost), len(cost[0])
+    inf = float("inf")
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    owner = [0] * (m + 1)  ## owner[col] = row (1-based), 0 = free
+    way = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+        owner[0] = i
+        j0 = 0
+        min_v = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0, delta, j1 = owner[j0], inf, 0
+            row_cost = cost[i0 - 1]
+            for j in range(1, m + 1):
+                if not used[j]:
+                    reduced = row_cost[j - 1] - u[i0] - v[j]
+                    if reduced < min_v[j]:
+                        min_v[j], way[j] = reduced, j0
+                    if min_v[j] < delta:
+                        delta, j1 = min_v[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[owner[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_v[j] -= delta
+            j0 = j1
+            if owner[j0] == 0:
+                break
+        ## Flip the augmenting path
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+
+    return {owner[j] - 1: j - 1 for j in range(1, m + 1) if owner[j]}
+
+
+def max_weight_assignment(weights: Dict[Tuple[int, int], float]) -> List[Tuple[int, int]]:
+    """
+    Globally optimal one-to-one pairing of rows to columns.
+
+    `weights` holds only the allowed cells (e.g. similarities that passed a
+    threshold); any other row/column pair can never be matched. The sum of
+    the chosen weights is maximal. Independent groups of cells are solved
+    separately, so a sparse matrix stays cheap even for large invoices.
+
+    Returns:
+        [(row, col), ...] sorted by row.
+    """
+    assignment = []
+
+    for cells in connected_components(weights):
+        if len(cells) == 1:
+            assignment.append(cells[0])
+            continue
+
+        rows = sorted({row for row, _ in cells})
+        cols = sorted({col for _, col in cells})
+        transpose = len(rows) > len(cols)
+        if transpose:
+            rows, cols = cols, rows
+
+        ## Disallowed cells cost 0: taking one is the same as leaving the row unmatched
+        cost = [[0.0] * len(cols) for _ in rows]
+        row_pos = {row: i for i, row in enumerate(rows)}
+        col_pos = {col: j for j, col in enumerate(cols)}
+        for row, col in cells:
+            weight = weights[(row, col)]
+            if transpose:
+                row, col = col, row
+            cost[row_pos[row]][col_pos[col]] = -weight
+
+        for i, j in min_cost_assignment(cost).items():
+            row, col = rows[i], cols[j]
+            if transpose:
+                row, col = col, row
+            if (row, col) in weights:
+                assignment.append((row, col))
+
+    return sorted(assignment)
@@ -0,0 +1,109 @@
+import copy
+import threading
+import time
+from app.models.invoice_extraction_model import InvoiceExtractionResults
+from app.utils.helpers import pair_invoice_items_to_po_items, validate_item_price
+
+
+## Cancellation flags may live in another process, so don't poll them on every pairing
+CANCEL_CHECK_INTERVAL_SEC = 0.01
+
+
+class TierCancelled(Exception):
+    """Raised inside a matching tier whose result is no longer needed."""
+
+
+class MatchingContext:
+    """
+    Per-invoice cache shared by the primary, secondary and tertiary tiers
+    and the audit validator.
+
+    Holds the dumped line items, normalized strings, every (PO, threshold,
+    pairing mode) pairing result and every per-pair `validate_item_price`
+    result, so each is computed once per run. `counters` records how often
+    work was computed vs. reused, `tier_times` how long each tier took and
+    `decision` / `validation_decision` whether the match / audit was decided
+    without the LLM or by the agent.
+    """
+
+    def __init__(self, invoice: InvoiceExtractionResults):
+        self.invoice = invoice
+        self.line_items = [item.model_dump() for item in invoice.line_items]
+        self._normalized = {}
+        self._pairings = {}  ## (id(po), threshold, pairing_mode) -> (po, pairing result)
+        self._price_checks = {}  ## (id(invoice_item), id(po_item)) -> (items, result)
+        self.counters = {
+            "pairings_computed": 0,
+            "pairings_reused": 0,
+            "price_checks_computed": 0,
+            "price_checks_reused": 0,
+        }
+        self.tier_times = {}
+        self.decision = None  ## "fast_path" | "llm", set by match_invoice_with_db
+        self.decision_sec = None
+        self.validation_decision = None  ## "rules" | "llm", set by validate_invoice_with_po
+        self.validation_decision_sec = None
+        self.cancelled = threading.Event()
+        self._next_cancel_check = 0.0
+
+    def fork(self) -> "MatchingContext":
+        """
+        A view sharing every cache and counter of this context but with its
+        own cancellation flag, so one tier running on a thread can be
+        stopped without affecting the others.
+        """
+        forked = copy.copy(self)
+        forked.cancelled = threading.Event()
+        forked._next_cancel_check = 0.0
+        return forked
+
+    def raise_if_cancelled(self):
+        now = time.monotonic()
+        if now < self._next_cancel_check:
+            return
+        self._next_cancel_check = now + CANCEL_CHECK_INTERVAL_SEC
+        if self.cancelled.is_set():
+            raise TierCancelled()
+
+    def normalized(self, text: str) -> str:
+        """`text.strip().lower()`, computed once per distinct string."""
+        if text not in self._normalized:
+            self._normalized[text] = text.strip().lower()
+        return self._normalized[text]
+
+    def pair_with_po(
+        self, po: dict, desc_similarity_threshold: float, pairing_mode: str = "greedy"
+    ) -> dict:
+        """Cached `pair_invoice_items_to_po_items` of this invoice's lines against a PO."""
+        self.raise_if_cancelled()
+        key = (id(po), desc_similarity_threshold, pairing_mode)
+        if key in self._pairings:
+            self.counters["pairings_reused"] += 1
+            return self._pairings[key][1]
+
+        self.counters["pairings_computed"] += 1
+        pairing_result = pair_invoice_items_to_po_items(
+            invoice_items=self.line_items,
+            po_items=po.get("line_items", []),
+            desc_similarity_threshold=desc_similarity_threshold,
+            pairing_mode=pairing_mode,
+        )
+        ## Keep the PO alive so its id() can't be reused by another object
+        self._pairings[key] = (po, pairing_result)
+        return pairing_result
+
+    def validate_item_price(self, invoice_item: dict, po_item: dict) -> dict:
+        """Cached `validate_item_price`; returns a copy callers may annotate."""
+        key = (id(invoice_item), id(po_item))
+        if key in self._price_checks:
+            self.counters["price_checks_reused"] += 1
+        else:
+            self.counters["price_checks_computed"] += 1
+            self._price_checks[key] = (
+                (invoice_item, po_item),
+                validate_item_price(invoice_item, po_item),
+            )
+        return dict(self._price_checks[key][1])
+
+    def stats(self) -> dict:
+        return dict(self.counters)
@@ -0,0 +1,180 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.models.invoice_extraction_model import InvoiceExtractionResults
+from app.models.matching_model import AlternativeMatch, MatchingAgentOutput
+from app.models.discrepancies_models.MatchingDiscrepancies import (
+    POReferenceDiscrepancy,
+    PartialDeliveryDiscrepancy,
+)
+
+## Candidates closer than this (in confidence) are a MultiplePOCandidates case for the agent
+DOMINANCE_MARGIN = 0.10
+
+## Tier -> the match_method the matching agent reports for it
+TIER_METHODS = {
+    "primary": "exact_po_reference",
+    "secondary": "supplier_date_product",
+    "tertiary": "product_only",
+}
+
+PRIMARY_FAILURE_REASONS = {
+    "no_dirct_po_match": "does not reference a PO found in the PO records",
+    "supplier_score_fail": "references a PO raised for a different supplier",
+    "date_window_fail": "references a PO dated outside the exact-match date window",
+    "partial_line_item_match": "references a PO whose line items do not all pair with the invoice",
+    "item_level_variance": "references a PO whose quantities or unit prices differ from the invoice",
+    "total_variance_exceeded": "references a PO whose total differs from the invoice total",
+}
+
+
+def _date_variance_days(invoice: InvoiceExtractionResults, po: dict) -> Optional[int]:
+    if not po.get("date"):
+        return None
+    po_date = datetime.strptime(po["date"], "%Y-%m-%d").date()
+    return abs((invoice.invoice_date - po_date).days)
+
+
+def _partial_delivery(pairing_result: dict, po_number: str) -> list:
+    """A PartialDeliveryDiscrepancy when the pairing left invoice or PO lines unpaired."""
+    matched = len(pairing_result["pairs"])
+    unpaired_invoice = len(pairing_result["unmatched_invoice_items"])
+    unpaired_po = len(pairing_result["unmatched_database_queried_po_items"])
+    if not unpaired_invoice and not unpaired_po:
+        return []
+
+    return [
+        PartialDeliveryDiscrepancy(
+            details=(
+                f"{matched} invoice line(s) paired with {po_number}; "
+                f"{unpaired_invoice} invoice line(s) and {unpaired_po} PO line(s) unpaired."
+            ),
+            detected_by="matching",
+            matched_items=matched,
+            po_items_total=matched + unpaired_po,
+            is_invoice_definitive_subset_of_po=unpaired_invoice == 0,
+            reasoning="Upstream line item pairing indicates partial item alignment.",
+        )
+    ]
+
+
+def _from_primary(invoice: InvoiceExtractionResults, primary: dict) -> MatchingAgentOutput:
+    ## Only reached when every invoice and PO line paired (see build_matching_output)
+    matched = len(primary["pairing_result"]["pairs"])
+    po_number = primary["matched_po"]
+
+    return MatchingAgentOutput(
+        matched_po=po_number,
+        po_match_confidence=primary["confidence"],
+        match_method="exact_po_reference",
+        supplier_match=True,
+        date_variance_days=primary["date_variance_days"],
+        line_items_matched=matched,
+        line_items_total=matched,
+        alternative_matches=[],
+        agent_reasoning=(
+            f"Deterministic fast path: PRIMARY_MATCH succeeded via exact_po_reference for "
+            f"{po_number} with {primary['confidence']} confidence; all {matched} invoice and PO "
+            f"line(s) paired, supplier verified, {primary['date_variance_days']}-day date variance. "
+            f"Lower tiers not considered."
+        ),
+        discrepancies=[],
+    )
+
+
+def _from_fallback(
+    invoice: InvoiceExtractionResults, tier: str, tier_result: dict, primary: dict
+) -> MatchingAgentOutput:
+    best, *others = tier_result["candidates"]
+    po = best["matched_po"]
+    po_number = po.get("po_number")
+    pairing_result = best["pairing_result"]
+    matched = len(pairing_result["pairs"])
+    unpaired_po = len(pairing_result["unmatched_database_queried_po_items"])
+    method = TIER_METHODS[tier]
+
+    primary_failure = PRIMARY_FAILURE_REASONS.get(
+        primary.get("reason"), f"failed the exact-match checks ({primary.get('reason')})"
+    )
+
+    return MatchingAgentOutput(
+        matched_po=po_number,
+        po_match_confidence=best["confidence"],
+        match_method=method,
+        supplier_match=True if tier == "secondary" else None,
+        date_variance_days=_date_variance_days(invoice, po),
+        line_items_matched=matched,
+        line_items_total=matched + unpaired_po,
+        alternative_matches=[
+            AlternativeMatch(
+                po_number=other["matched_po"].get("po_number"),
+                confidence=other["confidence"],
+                match_method=method,
+            )
+            for other in others
+        ],
+        agent_reasoning=(
+            f"Deterministic fast path: PRIMARY_MATCH failed ({primary.get('reason')}); "
+            f"{tier.upper()}_MATCH selected {po_number} via {method} with {best['confidence']} "
+            f"confidence and {int(best['match_ratio'] * 100)}% of invoice lines paired, "
+            f"no other candidate within {int(DOMINANCE_MARGIN * 100)} points."
+        ),
+        discrepancies=[
+            POReferenceDiscrepancy(
+                details=(
+                    f"Invoice {invoice.invoice_number} (po_number='{invoice.po_number}') "
+                    f"{primary_failure}. {po_number} was identified via {method} fallback matching."
+                ),
+                detected_by="matching",
+                suggested_po_number=po_number,
+                suggested_po_match_confidence=best["confidence"],
+                reasoning=(
+                    f"PRIMARY_MATCH failed; fallback to {tier.upper()}_MATCH succeeded "
+                    f"with {best['confidence']} confidence."
+                ),
+            ),
+            *_partial_delivery(pairing_result, po_number),
+        ],
+    )
+
+
+def build_matching_output(
+    invoice: InvoiceExtractionResults,
+    tier_results: Dict[str, Optional[dict]],
+) -> Optional[MatchingAgentOutput]:
+    """
+    Rule-based stand-in for the matching decision agent on unambiguous cases:
+
+    - a successful primary match that pairs every PO line, or
+    - the first successful fallback tier whose best candidate leads every
+      other candidate by more than DOMINANCE_MARGIN confidence.
+
+    Follows the agent prompt's selection and discrepancy rules. Returns None
+    when the decision needs the agent (no tier matched, close candidates, or
+    a primary match leaving PO lines unbilled, which the prompt treats as a
+    partial delivery).
+    """
+    primary = tier_results.get("primary")
+    if primary is None:
+        return None
+    if primary.get("matched"):
+        if primary["pairing_result"]["unmatched_database_queried_po_items"]:
+            return None
+        return _from_primary(invoice, primary)
+
+    for tier in ("secondary", "tertiary"):
+        tier_result = tier_results.get(tier)
+        if not tier_result or not tier_result.get("matched"):
+            continue
+
+        ## Highest priority successful tier decides; close calls go to the agent
+        candidates = tier_result["candidates"]
+        if (
+            len(candidates) > 1
+            and round(candidates[0]["confidence"] - candidates[1]["confidence"], 2)
+            <= DOMINANCE_MARGIN
+        ):
+            return None
+        return _from_fallback(invoice, tier, tier_result, primary)
+
+    return None
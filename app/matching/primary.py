@@ -1,10 +1,9 @@
 from app.utils.db_helpers import find_po_by_number
 from app.models.invoice_extraction_model import InvoiceExtractionResults
+from app.matching.context import MatchingContext
 from app.utils.helpers import (
     within_date_window,
-    string_similarity,
-    pair_invoice_items_to_po_items,
-    validate_item_price,
+    similarity_at_least,
     validate_total_variance,
 )
 from datetime import datetime
@@ -15,7 +14,11 @@ def primary_matching(
     supplier_score_threshold=0.9,
     date_discrepencry_window_range=7,
     description_similarity_threshold=0.9,
+    pairing_mode="greedy",  # "greedy" | "optimal" line assignment
+    context: MatchingContext | None = None,  # Shared per-invoice cache
 ):
+    context = context or MatchingContext(invoice)
+
     # Strict Po Checking
     po = find_po_by_number(invoice.po_number)
     if po is None:
@@ -25,9 +28,10 @@ def primary_matching(
         }
 
     # Supplier sanity check (strict but normalized)
-    supplier_score = string_similarity(
-        invoice.supplier_name.strip().lower(),
-        po.get("supplier", "").strip().lower(),
+    supplier_score = similarity_at_least(
+        context.normalized(invoice.supplier_name),
+        context.normalized(po.get("supplier", "")),
+        supplier_score_threshold,
     )
     if supplier_score < supplier_score_threshold:
         return {
@@ -46,13 +50,11 @@ def primary_matching(
             "date_discrepencry_window_range": date_discrepencry_window_range,
         }
 
-    invoice_line_items = [item.model_dump() for item in invoice.line_items]
+    invoice_line_items = context.line_items
 
     ## Item Wise pairing check (Strict)
-    pairing_result = pair_invoice_items_to_po_items(
-        invoice_items=invoice_line_items,
-        po_items=po.get("line_items", []),
-        desc_similarity_threshold=description_similarity_threshold,
+    pairing_result = context.pair_with_po(
+        po, description_similarity_threshold, pairing_mode
     )
 
     total_invoice_items = len(invoice_line_items)
@@ -70,7 +72,7 @@ def primary_matching(
     item_validations = []
 
     for pair in pairing_result["pairs"]:
-        validation = validate_item_price(
+        validation = context.validate_item_price(
             pair["invoice_item"],
             pair["po_item"],
         )
@@ -101,8 +103,8 @@ def primary_matching(
         return {
             "matched": False,
             "reason": "total_variance_exceeded",
-            "total_variance": total_check["total_variance"],
-            "total_variance_percent": total_check["total_variance_percent"],
+            "total_variance": total_check["variance_amount"],
+            "total_variance_percent": total_check["variance_percent"],
         }
 
     # Successful Primary Match
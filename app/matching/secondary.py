@@ -1,9 +1,7 @@
 from app.utils.db_helpers import find_pos_by_supplier
 from app.models.invoice_extraction_model import InvoiceExtractionResults
-from app.utils.helpers import (
-    within_date_window,
-    pair_invoice_items_to_po_items,
-)
+from app.matching.context import MatchingContext
+from app.utils.helpers import within_date_window
 
 
 def secondary_matching(
@@ -11,11 +9,14 @@ def secondary_matching(
     supplier_score_threshold=0.7,  # Lowered from 0.9
     date_window_days=14,  # Expanded window
     min_item_match_ratio=0.7,  # 70% of items must match
+    pairing_mode="greedy",  # "greedy" | "optimal" line assignment
+    context: MatchingContext | None = None,  # Shared per-invoice cache
 ):
     """
     Identifies the top 3 potential PO matches based on supplier name,
     date proximity, and line-item overlap.
     """
+    context = context or MatchingContext(invoice)
 
     ## Sorted with most similar supplier match on top
     potential_pos = find_pos_by_supplier(
@@ -33,11 +34,7 @@ def secondary_matching(
             continue
 
         # Check Line Item Overlap
-        pairing_result = pair_invoice_items_to_po_items(
-            invoice_items=[item.model_dump() for item in invoice.line_items],
-            po_items=po.get("line_items", []),
-            desc_similarity_threshold=0.7,
-        )
+        pairing_result = context.pair_with_po(po, 0.7, pairing_mode)
 
         match_ratio = pairing_result["match_ratio"]
 
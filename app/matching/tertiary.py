@@ -1,14 +1,14 @@
 from app.utils.db_helpers import find_pos_by_item_desc
 from app.models.invoice_extraction_model import InvoiceExtractionResults
-from app.utils.helpers import (
-    pair_invoice_items_to_po_items,
-)
+from app.matching.context import MatchingContext
 
 
 def tertiary_matching(
     invoice: InvoiceExtractionResults,
     desc_confidence_threshold=0.6,  # Minimum similarity for line match
     min_item_match_ratio=0.8,  # Require >80% of items matched
+    pairing_mode="greedy",  # "greedy" | "optimal" line assignment
+    context: MatchingContext | None = None,  # Shared per-invoice cache
 ):
     """
     Tertiary / Product-Only Fallback Matching (Greedy):
@@ -16,22 +16,23 @@ def tertiary_matching(
     - Collects top candidates to allow for agentic comparison and reasoning.
     """
 
-    invoice_items_list = [item.model_dump() for item in invoice.line_items]
+    context = context or MatchingContext(invoice)
+    invoice_items_list = context.line_items
 
     # Step 1: Find candidate POs by item description (Board Search)
     candidate_pos = find_pos_by_item_desc(
         invoice_items=invoice_items_list,
         confidence_threshold=desc_confidence_threshold,
+        pairing_mode=pairing_mode,
+        checkpoint=context.raise_if_cancelled,
     )
 
     candidates = []
 
     for po in candidate_pos:
         # Step 2: Pair invoice items to PO items (exact ID first, then fuzzy description)
-        pairing_result = pair_invoice_items_to_po_items(
-            invoice_items=invoice_items_list,
-            po_items=po.get("line_items", []),
-            desc_similarity_threshold=desc_confidence_threshold,
+        pairing_result = context.pair_with_po(
+            po, desc_confidence_threshold, pairing_mode
         )
 
         match_ratio = pairing_result.get("match_ratio", 0)
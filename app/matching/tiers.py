@@ -0,0 +1,176 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from app.matching.context import MatchingContext, TierCancelled
+from app.matching.primary import primary_matching
+from app.matching.secondary import secondary_matching
+from app.matching.tertiary import tertiary_matching
+from app.models.invoice_extraction_model import InvoiceExtractionResults
+from app.utils.tracing import record_span
+
+## Highest priority first; a tier is only consulted when every tier above it failed
+TIERS = {
+    "primary": primary_matching,
+    "secondary": secondary_matching,
+    "tertiary": tertiary_matching,
+}
+
+TIER_MODES = ("sequential", "thread", "process")
+
+## Mode -> pool, created on first use and shared by all invoices in the process
+_executors: Dict[str, Executor] = {}
+## Serves the cancellation flags of tiers running in worker processes
+_manager = None
+
+
+def get_tier_executor(mode: str, max_workers: int) -> Executor:
+    executor = _executors.get(mode)
+    if executor is None:
+        if mode == "thread":
+            executor = ThreadPoolExecutor(max_workers, thread_name_prefix="matching-tier")
+        else:
+            executor = ProcessPoolExecutor(max_workers)
+        _executors[mode] = executor
+    return executor
+
+
+def get_tier_manager():
+    global _manager
+    if _manager is None:
+        _manager = multiprocessing.Manager()
+    return _manager
+
+
+def shutdown_tier_executors():
+    global _manager
+    for executor in _executors.values():
+        executor.shutdown(wait=False, cancel_futures=True)
+    _executors.clear()
+    if _manager is not None:
+        _manager.shutdown()
+        _manager = None
+
+
+def run_tier(
+    tier: str,
+    invoice: InvoiceExtractionResults,
+    pairing_mode: str,
+    context: Optional[MatchingContext] = None,
+    cancelled=None,
+) -> tuple:
+    """
+    Runs one matching tier and times it. Module level so a process pool can
+    pickle it; a worker process builds its own context around the
+    `cancelled` flag it was handed.
+
+    Returns:
+        (tier result dict, duration_sec)
+    """
+    starttime = time.perf_counter()
+    if context is None:
+        context = MatchingContext(invoice)
+        if cancelled is not None:
+            context.cancelled = cancelled
+    result = TIERS[tier](invoice, pairing_mode=pairing_mode, context=context)
+    return result, round(time.perf_counter() - starttime, 3)
+
+
+def trace_tier(tier: str, mode: str, result: dict, duration: float):
+    ## Recorded by the caller: pool threads and worker processes don't carry the trace context
+    record_span(
+        "matching.tier",
+        duration,
+        tier=tier,
+        mode=mode,
+        matched=bool(result.get("matched")),
+    )
+
+
+async def run_matching_tiers(
+    invoice: InvoiceExtractionResults,
+    context: MatchingContext,
+    pairing_modes: Dict[str, str],
+    mode: str = "sequential",
+    max_workers: int = 3,
+) -> Dict[str, Optional[dict]]:
+    """
+    Evaluates the deterministic matching tiers for one invoice.
+
+    - sequential: each tier only runs after the previous one failed.
+    - thread / process: all tiers start at once on a pool; as soon as a
+      tier succeeds every lower tier is cancelled and its result dropped.
+      A tier that already started stops at its next PO pairing.
+
+    Either way the returned { tier: result | None } is the same: a tier
+    below a successful one is always None. Each tier that ran to completion
+    records its latency in `context.tier_times`.
+    """
+    if mode not in TIER_MODES:
+        raise ValueError(f"Unknown matching tier mode: {mode}")
+
+    results: Dict[str, Optional[dict]] = {tier: None for tier in TIERS}
+
+    if mode == "sequential":
+        for tier in TIERS:
+            results[tier], context.tier_times[tier] = run_tier(
+                tier, invoice, pairing_modes[tier], context
+            )
+            trace_tier(tier, mode, results[tier], context.tier_times[tier])
+            if results[tier].get("matched"):
+                break
+        return results
+
+    loop = asyncio.get_running_loop()
+    executor = get_tier_executor(mode, max_workers)
+
+    ## Threads share the invoice's caches; each tier gets its own cancellation flag
+    if mode == "thread":
+        tier_contexts = {tier: context.fork() for tier in TIERS}
+        cancel_flags = {tier: tier_contexts[tier].cancelled for tier in TIERS}
+    else:
+        manager = get_tier_manager()
+        tier_contexts = {tier: None for tier in TIERS}
+        cancel_flags = {tier: manager.Event() for tier in TIERS}
+
+    futures = {
+        tier: loop.run_in_executor(
+            executor,
+            run_tier,
+            tier,
+            invoice,
+            pairing_modes[tier],
+            tier_contexts[tier],
+            cancel_flags[tier] if mode == "process" else None,
+        )
+        for tier in TIERS
+    }
+
+    try:
+        for tier in TIERS:
+            results[tier], context.tier_times[tier] = await futures[tier]
+            trace_tier(tier, mode, results[tier], context.tier_times[tier])
+            if results[tier].get("matched"):
+                break
+    finally:
+        ## Lower tiers (or all, on error) must not outlive this invoice
+        for tier in TIERS:
+            if not futures[tier].done():
+                futures[tier].cancel()
+                cancel_flags[tier].set()
+            elif not futures[tier].cancelled():
+                ## Mark a discarded tier's error as retrieved so asyncio doesn't log it
+                futures[tier].exception()
+
+    return results
+
+
+__all__ = [
+    "TIERS",
+    "TIER_MODES",
+    "TierCancelled",
+    "run_matching_tiers",
+    "shutdown_tier_executors",
+]
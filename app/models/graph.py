@@ -1,6 +1,6 @@
-from typing import Optional, List, Union, Literal, Dict
+from typing import Any, Optional, List, Union, Literal, Dict
 from typing_extensions import Annotated
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import operator
 from app.models.invoice_extraction_model import InvoiceExtractionResults
 from app.models.document_extraction_model import DocumentIntelligenceAgentOutput
@@ -66,4 +66,15 @@ class GraphState(BaseModel):
         operator.add,  ## Enables auto append
     ] = []
     
-    execution_times: Annotated[Dict[str,float], operator.ior] = {}
\ No newline at end of file
+    execution_times: Annotated[Dict[str,float], operator.ior] = {}
+    llm_cache_hits: Annotated[Dict[str, int], operator.ior] = {}
+    ## Per node, one app.llm.telemetry record per LLM call
+    llm_calls: Annotated[Dict[str, List[dict]], operator.ior] = {}
+    ## "fast_path" when the matching decision was built without the LLM, else "llm"
+    matching_decision: Optional[Literal["fast_path", "llm"]] = None
+    ## "rules" when the audit verdict was built without the LLM, else "llm"
+    validation_decision: Optional[Literal["rules", "llm"]] = None
+    ## "rules" when the resolution came from the rules table, else "llm"
+    resolution_decision: Optional[Literal["rules", "llm"]] = None
+    ## app.matching.context.MatchingContext, shared by matching and audit; never serialised
+    matching_context: Optional[Any] = Field(default=None, exclude=True)
\ No newline at end of file
@@ -0,0 +1,43 @@
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+from app.models.document_extraction_model import DocumentIntelligenceAgentOutput
+from app.models.matching_model import MatchingAgentOutput
+from app.models.validation_model import ValidationAgentOutput
+from app.models.resolution_model import ResolutionAgentOutput
+
+
+class DocumentInfo(BaseModel):
+    filename: Optional[str] = None
+    file_size_kb: Optional[float] = None
+    page_count: Optional[int] = None
+
+
+class InvoiceMetadata(BaseModel):
+    invoice_id: str
+    net_processing_time_sec: float
+    document_info: DocumentInfo
+
+
+class ProcessingResults(BaseModel):
+    document_intelligence: Optional[DocumentIntelligenceAgentOutput] = None
+    matching_results: Optional[MatchingAgentOutput] = None
+    validation_results: Optional[ValidationAgentOutput] = None
+    resolution_action: Optional[ResolutionAgentOutput] = None
+
+
+class WorkflowOutput(BaseModel):
+    """
+    One finished invoice, in the same layout as the output/<invoice>.json files.
+    Built from already validated graph state, so it is assembled with
+    `model_construct` and never re-validated.
+    """
+
+    invoice_metadata: InvoiceMetadata
+    processing_results: ProcessingResults
+    discrepancies_found: List[Any] = []  ## Typed discrepancy models, serialised as they are
+    agent_execution_trace: Dict[str, float] = {}
+    llm_cache_hits: Dict[str, int] = {}
+    llm_calls: Dict[str, List[dict]] = {}
+    matching_decision: Optional[str] = None
+    validation_decision: Optional[str] = None
+    resolution_decision: Optional[str] = None
@@ -1,7 +1,22 @@
+import asyncio
+import threading
+import time
+import weakref
 import pymupdf
 from pathlib import Path
+from app.core.config import (
+    OCR_PAGE_CONCURRENCY,
+    OCR_GLOBAL_CONCURRENCY,
+    OCR_IMAGE_FORMAT,
+    OCR_IMAGE_QUALITY,
+    OCR_GRAYSCALE,
+    OCR_DPI,
+    OCR_MAX_PIXELS,
+)
 from app.llm.builder import LLMProviderFactory
-from app.pdf_data_extraction.helper import get_page_as_base64
+from app.pdf_data_extraction.helper import render_page_for_ocr, get_page_content_hash
+from app.pdf_data_extraction.ocr_cache import get_ocr_cache, ocr_cache_key
+from app.utils.tracing import span
 from typing import Dict, Any, List, cast
 from collections import defaultdict
 
@@ -9,6 +24,22 @@ from collections import defaultdict
 ROOT_DIR = Path(__file__).resolve().parent.parent.parent  ## App level
 DOCS_DIR = ROOT_DIR / "docs"
 
+OCR_PROMPT = (
+    "Extract all text from this receipt. If it is rotated, read it correctly. "
+    "Return only the text, maintaining the logical structure."
+)
+
+OCR_RENDER_SETTINGS = {
+    "image_format": OCR_IMAGE_FORMAT,
+    "quality": OCR_IMAGE_QUALITY,
+    "grayscale": OCR_GRAYSCALE,
+    "dpi": OCR_DPI,
+    "max_pixels": OCR_MAX_PIXELS,
+}
+
+## Event loop -> asyncio.Semaphore (a semaphore cannot be shared across loops)
+_global_ocr_semaphores = weakref.WeakKeyDictionary()
+
 
 async def process_file(file_name) -> dict:
     pdf_path = DOCS_DIR / file_name
@@ -17,57 +48,202 @@ async def process_file(file_name) -> dict:
     if not pdf_path.exists():
         raise FileNotFoundError(f"PDF not found: {pdf_path}")
 
-    full_text_content = []
+    starttime = time.perf_counter()
     print("[Processing]:", pdf_path)
 
     # Calculate file size in KB
     file_size_kb = round(pdf_path.stat().st_size / 1024, 2)
 
-    doc = pymupdf.open(pdf_path)
+    with span("pdf.open", file_size_kb=file_size_kb):
+        doc = pymupdf.open(pdf_path)
     page_count = len(doc)
 
-    full_text_content = []
+    page_texts: Dict[int, str | None] = {}
+    scanned_pages: List[int] = []
 
-    # Iterate through all pages
-    for page_num in range(page_count):
-        page = doc.load_page(page_num)
-        text_dict = page.get_text("dict")
-        if not isinstance(text_dict, dict):
-            print(
-                f"Skipping Page Number: {page_num} as it failed to return a valid dict for processing."
-            )
-            continue
+    try:
+        # 1. Extract digital pages and detect all scanned pages up front
+        for page_num in range(page_count):
+            with span("pdf.page_text", page=page_num + 1) as page_span:
+                page = doc.load_page(page_num)
+                text_dict = page.get_text("dict")
+                if not isinstance(text_dict, dict):
+                    print(
+                        f"Skipping Page Number: {page_num} as it failed to return a valid dict for processing."
+                    )
+                    continue
+
+                has_text = any(b["type"] == 0 for b in text_dict["blocks"])
+                if page_span is not None:
+                    page_span["attributes"]["scanned"] = not has_text
+
+                if has_text:
+                    # Traditional extraction for digital PDFs
+                    page_texts[page_num] = extract_text_from_dict(text_dict)
+
+            if not has_text:
+                print(
+                    f"--- Page {page_num + 1}: Scanned content detected. Queued for OCR... ---"
+                )
+                scanned_pages.append(page_num)
 
-        has_text = any(b["type"] == 0 for b in text_dict["blocks"])
+        # 2. OCR every scanned page concurrently (bounded per document and globally)
+        ocr_results = await ocr_pages(doc, scanned_pages)
+    finally:
+        doc.close()
 
-        if has_text:
-            f"--- Page {page_num + 1}: Normal text content detected. Aggregating Text... ---"
-            # Traditional extraction for digital PDFs
-            page_text = extract_text_from_dict(text_dict)
+    ocr_cache_hits, ocr_cache_misses = 0, 0
+    ocr_page_latencies = {}
+    ocr_page_renders = {}
+    for page_num, result in ocr_results.items():
+        page_texts[page_num] = result["text"]
+        ocr_page_latencies[page_num + 1] = result["latency_sec"]
+        if result["cache_hit"]:
+            ocr_cache_hits += 1
         else:
-            # 2. Page is a scan. Render to image and run OCR
-            print(
-                f"--- Page {page_num + 1}: Scanned content detected. Running OCR... ---"
-            )
-            llm = LLMProviderFactory.groqImage()
-            page_text = await llm.invoke(
-                request="Extract all text from this receipt. If it is rotated, read it correctly. "
-                "Return only the text, maintaining the logical structure.",
-                base64_image=get_page_as_base64(pdf_path, page_num),
-            )
+            ocr_cache_misses += 1
+            ocr_page_renders[page_num + 1] = result["render"]
+
+    # 3. Reassemble in page order
+    full_text_content = [
+        f"--- Page {page_num + 1} ---\n{page_texts[page_num]}"
+        for page_num in sorted(page_texts)
+    ]
 
-        full_text_content.append(f"--- Page {page_num + 1} ---\n{page_text}")
+    processing_time_sec = round(time.perf_counter() - starttime, 3)
 
-    doc.close()
+    if scanned_pages:
+        print(
+            f"[OCR]: {len(scanned_pages)} scanned page(s) | "
+            f"document latency {processing_time_sec}s | "
+            f"sum of page latencies {round(sum(ocr_page_latencies.values()), 3)}s"
+        )
+        print(f"[OCR Cache]: {ocr_cache_hits} hit(s), {ocr_cache_misses} miss(es)")
 
     return {
         "filename": file_name,
         "file_size_kb": file_size_kb,
         "page_count": page_count,
         "content": "\n\n".join(full_text_content),
+        "processing_time_sec": processing_time_sec,
+        "ocr_page_latencies": ocr_page_latencies,
+        "ocr_page_renders": ocr_page_renders,
+        "ocr_cache_hits": ocr_cache_hits,
+        "ocr_cache_misses": ocr_cache_misses,
     }
 
 
+def get_global_ocr_semaphore() -> asyncio.Semaphore:
+    """One process-wide OCR limit per event loop, shared by all documents."""
+    loop = asyncio.get_running_loop()
+    semaphore = _global_ocr_semaphores.get(loop)
+    if semaphore is None:
+        ## A semaphore that ever made a task wait holds its loop, keeping the weak
+        ## key alive; drop the ones of loops that have closed since
+        for closed in [other for other in _global_ocr_semaphores if other.is_closed()]:
+            del _global_ocr_semaphores[closed]
+        semaphore = asyncio.Semaphore(OCR_GLOBAL_CONCURRENCY)
+        _global_ocr_semaphores[loop] = semaphore
+    return semaphore
+
+
+async def ocr_pages(
+    doc: pymupdf.Document, page_nums: List[int]
+) -> Dict[int, dict]:
+    """
+    OCRs the given scanned pages concurrently, at most OCR_PAGE_CONCURRENCY
+    per document and OCR_GLOBAL_CONCURRENCY across all documents.
+    Pages are rendered off the event loop, one at a time per document
+    (pymupdf documents are not thread-safe).
+
+    Returns:
+        { page_num: { "text", "cache_hit", "latency_sec", "render" } }
+    """
+    document_semaphore = asyncio.Semaphore(OCR_PAGE_CONCURRENCY)
+    global_semaphore = get_global_ocr_semaphore()
+    document_lock = threading.Lock()
+
+    async def bounded_ocr(page_num: int):
+        async with document_semaphore, global_semaphore:
+            starttime = time.perf_counter()
+            with span("ocr.page", page=page_num + 1) as page_span:
+                result = await ocr_page(doc, page_num, document_lock)
+                if page_span is not None:
+                    page_span["attributes"]["cache_hit"] = result["cache_hit"]
+            result["latency_sec"] = round(time.perf_counter() - starttime, 3)
+
+            render = result["render"]
+            render_info = (
+                " (cache hit)"
+                if result["cache_hit"]
+                else f" | rendered {render['width']}x{render['height']} @{render['dpi']}dpi "
+                f"{render['mime_type']} {render['payload_bytes'] / 1024:.0f}KB "
+                f"in {render['render_time_sec']}s"
+            )
+            print(
+                f"--- Page {page_num + 1}: OCR finished in {result['latency_sec']}s{render_info} ---"
+            )
+            return page_num, result
+
+    results = await asyncio.gather(*(bounded_ocr(page_num) for page_num in page_nums))
+    return dict(results)
+
+
+def _with_lock(lock: threading.Lock, fn, *args, **kwargs):
+    with lock:
+        return fn(*args, **kwargs)
+
+
+async def ocr_page(doc: pymupdf.Document, page_num: int, document_lock: threading.Lock) -> dict:
+    """
+    Renders a scanned page from the already-open document and runs the
+    vision LLM on it, serving repeats from the OCR cache. Every access to
+    `doc` runs in a worker thread holding `document_lock`.
+
+    Returns:
+        {
+          "text": str | None,
+          "cache_hit": bool,
+          "render": dict | None,   # render_page_for_ocr stats, None on a cache hit
+        }
+    """
+    llm = LLMProviderFactory.groqImage()
+    cache = get_ocr_cache()
+    page = await asyncio.to_thread(_with_lock, document_lock, doc.load_page, page_num)
+
+    cache_key = None
+    if cache is not None:
+        page_hash = await asyncio.to_thread(
+            _with_lock, document_lock, get_page_content_hash, doc, page
+        )
+        cache_key = ocr_cache_key(
+            page_hash,
+            llm.model,
+            OCR_PROMPT,
+            render_settings=OCR_RENDER_SETTINGS,
+        )
+        cached_text = cache.get(cache_key)
+        if cached_text is not None:
+            return {"text": cached_text, "cache_hit": True, "render": None}
+
+    with span("ocr.render"):
+        rendered = await asyncio.to_thread(
+            _with_lock, document_lock, render_page_for_ocr, page, **OCR_RENDER_SETTINGS
+        )
+
+    page_text = await llm.invoke(
+        request=OCR_PROMPT,
+        base64_image=rendered.pop("base64_image"),
+        mime_type=rendered["mime_type"],
+    )
+
+    ## Never cache an empty answer; a retry should get another chance
+    if cache is not None and page_text:
+        cache.set(cache_key, page_text)
+
+    return {"text": page_text, "cache_hit": False, "render": rendered}
+
+
 def extract_text_from_dict(text_dict: dict, y_tolerance=5) -> str:
     ## Extract Text from dict and format it
     spans = []
@@ -1,21 +1,117 @@
 import pymupdf
-from pathlib import Path
 import base64
+import hashlib
+import time
 
 
-def get_page_as_base64(pdf_path: Path, page_num: int, dpi: int = 300):
-    """Renders a PDF page to a base64 encoded PNG string."""
-    doc = pymupdf.open(pdf_path)
-    page = doc.load_page(page_num)
+IMAGE_MIME_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+}
 
-    # 300 DPI is the sweet spot for receipt text clarity
-    pix = page.get_pixmap(dpi=dpi)
 
-    # Get PNG bytes directly from memory 
-    image_bytes = pix.tobytes("png")
+def choose_render_dpi(
+    page: pymupdf.Page, dpi: int | str = 300, max_pixels: int = 0
+) -> int:
+    """
+    Picks the DPI to render a page at.
 
-    # Encode to base64
-    base64_string = base64.b64encode(image_bytes).decode("utf-8")
+    - dpi="auto": aim for a ~2000px long edge (small receipts get more DPI than
+      A4 sheets), clamped to 100-300 DPI.
+    - max_pixels > 0: lower the DPI until width x height fits the cap.
+    """
+    width_pt, height_pt = page.rect.width, page.rect.height
 
-    doc.close()
-    return base64_string
+    if dpi == "auto":
+        long_edge_pt = max(width_pt, height_pt) or 1
+        chosen_dpi = int(min(300, max(100, 2000 * 72 / long_edge_pt)))
+    else:
+        chosen_dpi = int(dpi)
+
+    if max_pixels > 0:
+        area_sq_inches = (width_pt / 72) * (height_pt / 72)
+        if area_sq_inches > 0:
+            max_dpi = int((max_pixels / area_sq_inches) ** 0.5)
+            chosen_dpi = max(1, min(chosen_dpi, max_dpi))
+
+    return chosen_dpi
+
+
+def render_page_for_ocr(
+    page: pymupdf.Page,
+    image_format: str = "png",
+    quality: int = 85,
+    grayscale: bool = False,
+    dpi: int | str = 300,
+    max_pixels: int = 0,
+) -> dict:
+    """
+    Renders an already-open PDF page to a base64 image for the vision LLM.
+
+    Returns:
+        {
+          "base64_image": str,
+          "mime_type": str,
+          "dpi": int,
+          "width": int,
+          "height": int,
+          "payload_bytes": int,   # size of the base64 payload sent to the LLM
+          "render_time_sec": float,
+        }
+    """
+    if image_format not in IMAGE_MIME_TYPES:
+        raise ValueError(
+            f"Unsupported OCR image format: {image_format}. Use one of {list(IMAGE_MIME_TYPES)}"
+        )
+
+    starttime = time.perf_counter()
+    render_dpi = choose_render_dpi(page, dpi, max_pixels)
+
+    pix = page.get_pixmap(
+        dpi=render_dpi,
+        colorspace=pymupdf.csGRAY if grayscale else pymupdf.csRGB,
+    )
+    width, height = pix.width, pix.height
+
+    # Encode straight from the pixmap's memory
+    if image_format == "png":
+        image_bytes = pix.tobytes("png")
+    elif image_format == "jpeg":
+        image_bytes = pix.tobytes("jpeg", jpg_quality=quality)
+    else:
+        try:
+            image_bytes = pix.pil_tobytes(format="WEBP", quality=quality)
+        except ImportError as e:
+            raise RuntimeError("WebP OCR images require Pillow to be installed.") from e
+
+    ## Release the raw pixels before building the payload
+    del pix
+
+    base64_image = base64.b64encode(image_bytes).decode("ascii")
+
+    return {
+        "base64_image": base64_image,
+        "mime_type": IMAGE_MIME_TYPES[image_format],
+        "dpi": render_dpi,
+        "width": width,
+        "height": height,
+        "payload_bytes": len(base64_image),
+        "render_time_sec": round(time.perf_counter() - starttime, 3),
+    }
+
+
+def get_page_content_hash(doc: pymupdf.Document, page: pymupdf.Page) -> str:
+    """
+    Hashes what a page actually shows: its content stream(s) plus the raw
+    streams of every image it draws. Identical scans hash identically even
+    across different files, without rendering the page.
+    """
+    digest = hashlib.sha256()
+    digest.update(page.read_contents())
+
+    for image in page.get_images(full=True):
+        xref = image[0]
+        digest.update(doc.xref_stream_raw(xref) or b"")
+
+    return digest.hexdigest()
@@ -0,0 +1,44 @@
+import json
+from typing import Optional
+from app.core.config import (
+    OCR_CACHE_ENABLED,
+    OCR_CACHE_DIR,
+    OCR_CACHE_MAX_MB,
+    LLM_REPLAY_MODE,
+)
+from app.utils.disk_cache import DiskCache, content_hash
+
+_ocr_cache: Optional[DiskCache] = None
+_ocr_cache_enabled = OCR_CACHE_ENABLED
+
+
+def get_ocr_cache() -> Optional[DiskCache]:
+    """
+    Returns the shared per-page OCR text cache, or None when disabled.
+    Hit / miss counters accumulate for the lifetime of the process.
+    """
+    global _ocr_cache
+    ## Recording LLM cassettes must reach the vision model for every page
+    if not _ocr_cache_enabled or LLM_REPLAY_MODE == "record":
+        return None
+
+    if _ocr_cache is None:
+        _ocr_cache = DiskCache(
+            OCR_CACHE_DIR, max_bytes=int(OCR_CACHE_MAX_MB * 1024 * 1024), suffix=".txt"
+        )
+    return _ocr_cache
+
+
+def set_ocr_cache(cache: Optional[DiskCache]) -> None:
+    """Swaps the shared OCR cache (e.g. for benchmarks); None turns OCR caching off."""
+    global _ocr_cache, _ocr_cache_enabled
+    _ocr_cache, _ocr_cache_enabled = cache, cache is not None
+
+
+def ocr_cache_key(
+    page_hash: str, model: str, prompt: str, render_settings: Optional[dict] = None
+) -> str:
+    """Same page content + same OCR model + same prompt + same rendering => same text."""
+    return content_hash(
+        page_hash, model, prompt, json.dumps(render_settings or {}, sort_keys=True)
+    )
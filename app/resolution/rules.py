@@ -0,0 +1,227 @@
+from typing import Callable, List, NamedTuple, Optional
+
+from app.models.document_extraction_model import DocumentIntelligenceAgentOutput
+from app.models.matching_model import MatchingAgentOutput
+from app.models.resolution_model import ResolutionAgentOutput
+from app.models.validation_model import ValidationAgentOutput
+from app.models.discrepancies_models.DocumentIntelligenceDiscrepancies import (
+    CurrencyMismatchDiscrepancy,
+    LowExtractionConfidenceDiscrepancy,
+)
+from app.models.discrepancies_models.ValidationDiscrepanices import (
+    FinancialArithmeticDiscrepancy,
+    UnexpectedItemDiscrepancy,
+)
+
+## Thresholds of the resolution prompt's business rules
+HIGH_EXTRACTION_CONFIDENCE = 0.9
+AUTO_APPROVE_MATCH_CONFIDENCE = 0.85
+COMPLEXITY_THRESHOLD = 3
+
+## Discrepancy types the prompt always escalates
+ALWAYS_ESCALATE = (
+    FinancialArithmeticDiscrepancy,
+    CurrencyMismatchDiscrepancy,
+    UnexpectedItemDiscrepancy,
+)
+
+SEVERITY_RISK = {None: "none", "low": "low", "medium": "medium", "high": "high"}
+SEVERITY_ORDER = ("low", "medium", "high")
+
+## How many resolutions the rules table decided vs. handed to the agent
+resolution_rule_counters = {"decided": 0, "deferred": 0}
+
+
+def resolution_rule_stats() -> dict:
+    decided = resolution_rule_counters["decided"]
+    deferred = resolution_rule_counters["deferred"]
+    return {
+        "llm_calls_skipped": decided,
+        "llm_calls_made": deferred,
+        "skip_rate": round(decided / (decided + deferred), 3) if decided + deferred else 0.0,
+    }
+
+
+class Findings(NamedTuple):
+    extraction: Optional[DocumentIntelligenceAgentOutput]
+    matching: Optional[MatchingAgentOutput]
+    validation: Optional[ValidationAgentOutput]
+    discrepancies: list
+    nodes_run: List[str]
+
+
+class ResolutionRule(NamedTuple):
+    name: str
+    applies: Callable[[Findings], bool]
+    recommended_action: str
+    reasoning: str  ## str.format template over `describe(findings)`
+
+
+def _most_severe(severities: list) -> Optional[str]:
+    severities = [s for s in severities if s in SEVERITY_ORDER]
+    return max(severities, key=SEVERITY_ORDER.index) if severities else None
+
+
+def severity_of(discrepancy) -> Optional[str]:
+    """A discrepancy's severity; low extraction confidence is as severe as its worst field."""
+    if isinstance(discrepancy, LowExtractionConfidenceDiscrepancy):
+        return _most_severe([field.severity for field in discrepancy.fields])
+    return getattr(discrepancy, "severity", None)
+
+
+def _highest_severity(findings: Findings) -> Optional[str]:
+    return _most_severe([severity_of(d) for d in findings.discrepancies])
+
+
+def _high_extraction_confidence(extraction: Optional[DocumentIntelligenceAgentOutput]) -> bool:
+    ## Overall and every critical field
+    return extraction is not None and (
+        min(extraction.extraction_confidence.model_dump().values())
+        >= HIGH_EXTRACTION_CONFIDENCE
+    )
+
+
+def _early_exit(findings: Findings) -> bool:
+    return "validation" not in findings.nodes_run
+
+
+def _mandatory_escalation(findings: Findings) -> bool:
+    return _highest_severity(findings) == "high" or any(
+        isinstance(d, ALWAYS_ESCALATE) for d in findings.discrepancies
+    )
+
+
+def _too_many_discrepancies(findings: Findings) -> bool:
+    return len(findings.discrepancies) >= COMPLEXITY_THRESHOLD
+
+
+def _fully_clean(findings: Findings) -> bool:
+    return (
+        not findings.discrepancies
+        and findings.matching.match_method == "exact_po_reference"
+        and findings.matching.po_match_confidence > AUTO_APPROVE_MATCH_CONFIDENCE
+        and _high_extraction_confidence(findings.extraction)
+        and findings.validation.status == "clean"
+    )
+
+
+## First matching row decides; no row matching means the agent decides
+RESOLUTION_RULES = [
+    ResolutionRule(
+        "early_exit",
+        _early_exit,
+        "escalate_to_human",
+        "Early exit triggered. Pipeline stopped at {last_node} node before validation, "
+        "so the invoice is escalated automatically. {discrepancy_summary}",
+    ),
+    ResolutionRule(
+        "mandatory_escalation",
+        _mandatory_escalation,
+        "escalate_to_human",
+        "Mandatory escalation: {escalation_causes}. {discrepancy_summary}",
+    ),
+    ResolutionRule(
+        "complexity_threshold",
+        _too_many_discrepancies,
+        "escalate_to_human",
+        "{discrepancy_summary} (Complexity threshold: 3+ discrepancies reached).",
+    ),
+    ResolutionRule(
+        "fully_clean",
+        _fully_clean,
+        "auto_approve",
+        "Invoice passed every automated check: extraction confidence {extraction_confidence:.0%}, "
+        "exact PO match {matched_po} with {match_confidence:.0%} confidence, validation status "
+        "clean, no discrepancies detected. Criteria met: {criteria}.",
+    ),
+]
+
+
+def approval_criteria(findings: Findings) -> List[str]:
+    """Which of the prompt's approval criteria the agents' outputs satisfy."""
+    extraction, matching, validation = findings.extraction, findings.matching, findings.validation
+    criteria = []
+    if matching and matching.match_method == "exact_po_reference":
+        criteria.append("exact_po_match")
+    if matching and matching.match_rate == 1.0:
+        criteria.append("all_items_match")
+    if _high_extraction_confidence(extraction):
+        criteria.append("high_extraction_confidence")
+    if matching and matching.supplier_match:
+        criteria.append("verified_supplier")
+    if (
+        validation
+        and validation.total_variance.variance_amount == 0
+        and validation.line_item_total_variance is None
+    ):
+        criteria.append("zero_variance")
+    return criteria
+
+
+def describe(findings: Findings, criteria: List[str]) -> dict:
+    """Values the reasoning templates are filled from."""
+    discrepancies = findings.discrepancies
+    causes = [
+        f"{d.type} ({severity_of(d)})"
+        for d in discrepancies
+        if severity_of(d) == "high" or isinstance(d, ALWAYS_ESCALATE)
+    ]
+    return {
+        "last_node": findings.nodes_run[-1] if findings.nodes_run else "extraction",
+        "discrepancy_summary": (
+            f"{len(discrepancies)} discrepancies raised: "
+            + ", ".join(f"{d.type} ({severity_of(d)})" for d in discrepancies)
+            + "."
+            if discrepancies
+            else "No discrepancies raised."
+        ),
+        "escalation_causes": ", ".join(causes),
+        "extraction_confidence": (
+            findings.extraction.extraction_confidence.overall if findings.extraction else 0.0
+        ),
+        "matched_po": findings.matching.matched_po if findings.matching else None,
+        "match_confidence": (
+            findings.matching.po_match_confidence if findings.matching else 0.0
+        ),
+        "criteria": ", ".join(criteria) or "none",
+    }
+
+
+def resolve_by_rules(findings: Findings) -> Optional[ResolutionAgentOutput]:
+    """
+    Runs the findings through RESOLUTION_RULES. Forced escalations (early
+    exit, high severity or always-escalate discrepancies, 3+ discrepancies)
+    and fully clean runs are decided here with a templated reasoning;
+    anything else returns None for the resolution agent.
+    """
+    for rule in RESOLUTION_RULES:
+        if not rule.applies(findings):
+            continue
+
+        criteria = approval_criteria(findings)
+        escalate = rule.recommended_action == "escalate_to_human"
+        if rule.name == "early_exit":
+            risk_level = "high"
+        else:
+            risk_level = SEVERITY_RISK[_highest_severity(findings)]
+
+        resolution_rule_counters["decided"] += 1
+        return ResolutionAgentOutput(
+            recommended_action=rule.recommended_action,
+            ## A mandated outcome is certain; a clean approval is as sure as its weakest input
+            confidence=(
+                1.0
+                if escalate
+                else min(
+                    findings.extraction.extraction_confidence.overall,
+                    findings.matching.po_match_confidence,
+                )
+            ),
+            risk_level=risk_level,
+            approval_criteria_met=criteria,
+            human_review_required=escalate,
+            reasoning=rule.reasoning.format(**describe(findings, criteria)).strip(),
+        )
+
+    resolution_rule_counters["deferred"] += 1
+    return None
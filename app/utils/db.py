@@ -1,15 +1,146 @@
+from collections import defaultdict
 from pathlib import Path
 import json
+from app.utils.similarity_matrix import char_count_table, matrix_engine_available
 
 ## Relative to ROOT
 DB_PATH = Path(__file__).parent.parent.parent / "purchase_orders.json"
 
 db = None
+po_index = None
+supplier_index = None
+item_desc_index = None
+
+
+def normalize_po_number(po_number) -> str:
+    """Canonical form used for PO lookups: no whitespace, upper case."""
+    return "".join(str(po_number).split()).upper()
+
+
+def build_po_index(purchase_orders: list) -> dict:
+    """
+    Builds a `normalized po_number -> PO` dictionary.
+    If a PO number appears twice, the first record wins (same as a linear scan).
+    """
+    index = {}
+    for po in purchase_orders:
+        po_number = po.get("po_number")
+        if not po_number:
+            continue
+        index.setdefault(normalize_po_number(po_number), po)
+    return index
+
+
+def char_count_fields(texts: list) -> dict:
+    """
+    Per-character counts of `texts` (compared lower-cased), for bounding the
+    similarity of a query to all of them at once; counts are None without numpy.
+    """
+    alphabet, char_counts, lengths = {}, None, None
+    if matrix_engine_available():
+        alphabet, char_counts, lengths = char_count_table([text.lower() for text in texts])
+    return {"texts": texts, "alphabet": alphabet, "char_counts": char_counts, "lengths": lengths}
+
+
+def build_supplier_index(purchase_orders: list) -> dict:
+    """
+    Groups POs by distinct supplier name, with per-character counts of
+    every name (see `char_count_fields`).
+
+    Returns:
+        {
+          "names": { supplier: { "canonical", "pos": [(db_position, po)] } },
+          "by_canonical": { stripped lower-cased name: [supplier, ...] },
+          "texts": [supplier, ...],                  # row order of char_counts
+          "alphabet", "char_counts", "lengths",
+        }
+    """
+    names = {}
+    by_canonical = defaultdict(list)
+
+    for position, po in enumerate(purchase_orders):
+        supplier = po.get("supplier", "")
+        entry = names.get(supplier)
+        if entry is None:
+            canonical = supplier.strip().lower()
+            entry = {"canonical": canonical, "pos": []}
+            names[supplier] = entry
+            by_canonical[canonical].append(supplier)
+        entry["pos"].append((position, po))
+
+    return {
+        "names": names,
+        "by_canonical": dict(by_canonical),
+        **char_count_fields(list(names)),
+    }
+
+
+def build_item_desc_index(purchase_orders: list) -> dict:
+    """
+    Index over PO line item descriptions.
+
+    Descriptions are grouped case-insensitively (the similarity score ignores
+    case), so each distinct description is scored once per invoice line.
+    Per-character counts of every distinct description are kept as well
+    (see `char_count_fields`).
+
+    Returns:
+        {
+          "descriptions": { lower-cased description: { "lines": [(db_position, line_idx)] } },
+          "texts": [lower-cased description, ...],   # row order of char_counts
+          "alphabet": { char: column },
+          "char_counts": np.ndarray | None,          # None without numpy
+          "lengths": np.ndarray | None,
+        }
+    """
+    descriptions = {}
+
+    for position, po in enumerate(purchase_orders):
+        for line_idx, po_item in enumerate(po.get("line_items", [])):
+            description = (po_item.get("description") or "").lower()
+            entry = descriptions.get(description)
+            if entry is None:
+                entry = {"lines": []}
+                descriptions[description] = entry
+            entry["lines"].append((position, line_idx))
+
+    return {"descriptions": descriptions, **char_count_fields(list(descriptions))}
+
+
+def _build_indexes(purchase_orders: list):
+    global po_index, supplier_index, item_desc_index
+    po_index = build_po_index(purchase_orders)
+    supplier_index = build_supplier_index(purchase_orders)
+    item_desc_index = build_item_desc_index(purchase_orders)
+
 
 def get_db():
     global db
     if db is None:
         with open(DB_PATH, "r", encoding="utf-8") as f:
             db = json.load(f)
+        _build_indexes(db.get("purchase_orders", []))
 
     return db.get("purchase_orders", [])
+
+
+def get_po_index() -> dict:
+    get_db()
+    return po_index
+
+
+def get_supplier_index() -> dict:
+    get_db()
+    return supplier_index
+
+
+def get_item_desc_index() -> dict:
+    get_db()
+    return item_desc_index
+
+
+def set_db(purchase_orders: list):
+    """Swaps the in-memory PO catalogue (e.g. for benchmarks) and rebuilds its indexes."""
+    global db
+    db = {"purchase_orders": purchase_orders}
+    _build_indexes(purchase_orders)
@@ -1,46 +1,133 @@
-from app.utils.db import get_db
-from app.utils.helpers import string_similarity
+from app.utils.db import (
+    get_db,
+    get_po_index,
+    get_supplier_index,
+    get_item_desc_index,
+    normalize_po_number,
+)
+from app.utils.helpers import similarity_at_least
+from app.utils.similarity_matrix import overlap_upper_bounds_for
+from app.matching.assignment import max_weight_assignment
 
 
 def find_po_by_number(po_number: str):
     """
-    Returns the PO with the exact number, or None if not found.
+    Returns the PO with the given number, or None if not found.
+    Lookup goes through the po_number index and ignores case / whitespace.
     """
-    db = get_db()
-    for po in db:
-        if po.get("po_number") == po_number:
-            return po
-    return None
+    if not po_number:
+        return None
+    return get_po_index().get(normalize_po_number(po_number))
+
+
+def bounded_candidates(text: str, index: dict, min_score: float) -> list:
+    """
+    Texts of an index built with `char_count_fields` (supplier names, PO
+    descriptions) that `text` could score at least min_score against. Uses
+    difflib's `quick_ratio` bound, which SequenceMatcher.ratio() never
+    exceeds, so no such text is left out. Without numpy every text is
+    returned (similarity_at_least applies the same bound pair by pair).
+    """
+    if index["char_counts"] is None:
+        return index["texts"]
+
+    bounds = overlap_upper_bounds_for(
+        text.lower(), index["char_counts"], index["lengths"], index["alphabet"]
+    )
+    texts = index["texts"]
+    return [texts[row] for row in (bounds >= min_score).nonzero()[0].tolist()]
 
 
-def find_pos_by_supplier(invoice_supplier: str, min_similarity: float = 0.7):
+def find_pos_by_supplier(
+    invoice_supplier: str,
+    min_similarity: float = 0.7,
+):
     """
     Returns a list of PO candidates for a supplier.
     Exact matches first, then fuzzy matches above min_similarity.
     Sorted descending wrt similarity score.
+
+    Only distinct supplier names whose character-overlap bound can reach
+    min_similarity (see `bounded_candidates`) are scored, via the supplier
+    index built at DB load. The bound is exact, so ranking is identical to a
+    full scan: ties keep exact matches first, then catalogue order.
     """
     if invoice_supplier == "":
         return []
 
-    db = get_db()
-    exact_matches = []
-    fuzzy_matches = []
-
-    for po in db:
-        supplier = po.get("supplier", "")
-        if supplier.strip().lower() == invoice_supplier.strip().lower():
-            exact_matches.append({"po": po, "confidence": 0.99})
-        else:
-            sim = string_similarity(invoice_supplier, supplier)
-            if sim >= min_similarity:
-                fuzzy_matches.append({"po": po, "confidence": sim})
-
-    final = exact_matches + fuzzy_matches
-    final.sort(key=lambda x: x["confidence"], reverse=True)
-    return [entry["po"] for entry in final]
+    index = get_supplier_index()
+    names = index["names"]
+    canonical = invoice_supplier.strip().lower()
 
+    ## 1. Candidate names: exact canonical hits + names within the similarity bound
+    exact_names = set(index["by_canonical"].get(canonical, []))
+    candidate_names = set(bounded_candidates(invoice_supplier, index, min_similarity))
 
-def find_pos_by_item_desc(invoice_items, confidence_threshold=0.6):
+    ## 2. Score each distinct name once and fan out to its POs
+    ranked = []
+    for name in candidate_names | exact_names:
+        if name in exact_names:
+            confidence, rank = 0.99, 0
+        else:
+            confidence = similarity_at_least(invoice_supplier, name, min_similarity)
+            rank = 1
+            if confidence < min_similarity:
+                continue
+        for position, po in names[name]["pos"]:
+            ranked.append((-confidence, rank, position, po))
+
+    ranked.sort(key=lambda x: x[:3])
+    return [entry[3] for entry in ranked]
+
+
+def _greedy_line_scores(
+    invoice_line_count: int, po_line_descriptions: list, scores: dict, confidence_threshold
+) -> list:
+    ## Greedy matching inside this specific PO
+    matched_scores = []
+    available_po_items = po_line_descriptions.copy()  ## To keep track of what's left
+
+    for inv_idx in range(invoice_line_count):
+        best_score_for_this_inv_line = 0
+        best_po_line_idx = -1
+
+        # Find the highest similarity match in current PO pool
+        for i, description in enumerate(available_po_items):
+            ## Pairs at or below the threshold can never be accepted
+            score = scores.get((inv_idx, description), 0)
+
+            # Greedy: consume the PO item if threshold met so next invoice item can't check against it.
+            if score > best_score_for_this_inv_line:
+                best_score_for_this_inv_line = score
+                best_po_line_idx = i
+
+        # If we found a valid match within this PO
+        if best_score_for_this_inv_line > confidence_threshold:
+            matched_scores.append(best_score_for_this_inv_line)
+            available_po_items.pop(best_po_line_idx)
+
+    return matched_scores
+
+
+def _optimal_line_scores(
+    invoice_line_count: int, po_line_descriptions: list, scores: dict
+) -> list:
+    ## Maximum-weight assignment of invoice lines to this PO's lines
+    weights = {
+        (inv_idx, line_idx): scores[(inv_idx, description)]
+        for inv_idx in range(invoice_line_count)
+        for line_idx, description in enumerate(po_line_descriptions)
+        if (inv_idx, description) in scores
+    }
+    return [weights[cell] for cell in max_weight_assignment(weights)]
+
+
+def find_pos_by_item_desc(
+    invoice_items,
+    confidence_threshold=0.6,
+    pairing_mode="greedy",
+    checkpoint=None,
+):
     """
     Identifies candidate POs by fuzzy-matching line item descriptions.
 
@@ -48,41 +135,65 @@ def find_pos_by_item_desc(invoice_items, confidence_threshold=0.6):
     with PO lines. PO items are removed from the candidate pool once matched
     to prevent duplicate assignments.
 
+    Only POs holding a line whose description scores above the threshold are
+    visited. Each distinct description whose character-overlap bound can reach
+    the threshold (see `bounded_candidates`) is scored once per invoice
+    line; the bound is exact, so rankings match a full scan.
+
+    With pairing_mode="optimal" each PO is scored by a maximum-weight
+    assignment of its lines instead of the greedy pass.
+
     Args:
         invoice_items (list): Extracted invoice items with 'description' keys.
         confidence_threshold (float): Minimum similarity to accept a pair match.
+        pairing_mode (str): "greedy" or "optimal".
+        checkpoint (callable): Called between invoice lines and candidate POs; may raise to abort the search.
 
     Returns:
         list: Candidate matches ranked by average similarity score.
     """
-    db = get_db()
-    all_candidate_matches = []
-
-    for po in db:
-        po_line_items = po.get("line_items", [])
-        ## Greedy matching inside this specific PO
-        matched_scores = []
-        available_po_items = po_line_items.copy()  ## To keep track of what's left
-
-        for inv_item in invoice_items:
-            best_score_for_this_inv_line = 0
-            best_po_line_idx = -1
+    if pairing_mode not in ("greedy", "optimal"):
+        raise ValueError(f"Unknown pairing mode: {pairing_mode}")
 
-            # Find the highest similarity match in current PO pool
-            for i, po_item in enumerate(available_po_items):
-                score = string_similarity(
-                    inv_item.get("description"), po_item.get("description")
+    db = get_db()
+    index = get_item_desc_index()
+    descriptions = index["descriptions"]
+
+    ## 1. Score distinct PO descriptions against each invoice line
+    scores = {}  ## (invoice line idx, lower-cased PO description) -> similarity
+    candidate_positions = set()
+
+    for inv_idx, inv_item in enumerate(invoice_items):
+        if checkpoint:
+            checkpoint()
+        inv_desc = inv_item.get("description")
+        for description in bounded_candidates(inv_desc, index, confidence_threshold):
+            score = similarity_at_least(inv_desc, description, confidence_threshold)
+            if score > confidence_threshold:
+                scores[(inv_idx, description)] = score
+                candidate_positions.update(
+                    position for position, _ in descriptions[description]["lines"]
                 )
 
-                # Greedy: consume the PO item if threshold met so next invoice item can't check against it.
-                if score > best_score_for_this_inv_line:
-                    best_score_for_this_inv_line = score
-                    best_po_line_idx = i
+    all_candidate_matches = []
 
-            # If we found a valid match within this PO
-            if best_score_for_this_inv_line > confidence_threshold:
-                matched_scores.append(best_score_for_this_inv_line)
-                available_po_items.pop(best_po_line_idx)
+    for position in sorted(candidate_positions):
+        if checkpoint:
+            checkpoint()
+        po = db[position]
+        po_line_descriptions = [
+            (po_item.get("description") or "").lower()
+            for po_item in po.get("line_items", [])
+        ]
+
+        if pairing_mode == "optimal":
+            matched_scores = _optimal_line_scores(
+                len(invoice_items), po_line_descriptions, scores
+            )
+        else:
+            matched_scores = _greedy_line_scores(
+                len(invoice_items), po_line_descriptions, scores, confidence_threshold
+            )
 
         ## Score the PO as a whole
         if matched_scores:
@@ -0,0 +1,105 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional
+
+
+def content_hash(*parts: str) -> str:
+    """Returns a stable sha256 hex digest over the given string parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")  ## Separator so ("ab", "c") != ("a", "bc")
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    Content-addressed on-disk text cache with size-based LRU eviction.
+
+    Entries live at `<directory>/<key[:2]>/<key>`. Reads bump the entry's
+    modification time, so eviction (oldest mtime first) approximates
+    least-recently-used once the total size exceeds `max_bytes`.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, suffix: str = ".json"):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes: Optional[int] = None
+
+    def _path_for(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}{self.suffix}"
+
+    def _entries(self):
+        if not self.directory.exists():
+            return []
+        return [p for p in self.directory.glob(f"*/*{self.suffix}") if p.is_file()]
+
+    def _current_size(self) -> int:
+        if self._total_bytes is None:
+            self._total_bytes = sum(p.stat().st_size for p in self._entries())
+        return self._total_bytes
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path_for(key)
+        try:
+            value = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        ## Mark as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        path = self._path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        previous_size = path.stat().st_size if path.exists() else 0
+
+        ## Write atomically so concurrent readers never see a partial entry
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(value, encoding="utf-8")
+        os.replace(tmp_path, path)
+
+        self._total_bytes = (
+            self._current_size() - previous_size + path.stat().st_size
+        )
+
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries(), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in entries)
+
+        for path in entries:
+            if total <= self.max_bytes:
+                break
+            size = path.stat().st_size
+            try:
+                path.unlink()
+                total -= size
+            except FileNotFoundError:
+                pass
+
+        self._total_bytes = total
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "size_bytes": self._current_size(),
+            "max_bytes": self.max_bytes,
+        }
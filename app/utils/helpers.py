@@ -1,14 +1,112 @@
 from datetime import date, datetime
+from collections import OrderedDict
 from difflib import SequenceMatcher
 import json
+import threading
 from app.models.graph import GraphState
+from app.models.output_model import (
+    DocumentInfo,
+    InvoiceMetadata,
+    ProcessingResults,
+    WorkflowOutput,
+)
+from app.utils.similarity_matrix import bound_matrix, best_column, matrix_engine_available
+from app.matching.assignment import max_weight_assignment
 from pathlib import Path
 
 
 
+## Distinct normalized pairs kept by the similarity memo (shared by all invoices in a process)
+SIMILARITY_CACHE_SIZE = 65_536
+
+## (str1, str2) -> (score, exact): the full ratio, or only the character-overlap
+## bound of a pair that was pruned. Tier workers may run in threads, so the memo
+## and the counters are only touched under _similarity_lock.
+_similarity_memo = OrderedDict()
+_similarity_lock = threading.Lock()
+
+## How similarity_at_least answered: from the memo, by a cheap bound or by the full ratio
+similarity_counters = {"calls": 0, "cache_hits": 0, "length_pruned": 0, "quick_pruned": 0, "computed": 0}
+
+
+def _count(outcome: str):
+    with _similarity_lock:
+        similarity_counters["calls"] += 1
+        similarity_counters[outcome] += 1
+
+
+def _cached_similarity(key: tuple):
+    with _similarity_lock:
+        entry = _similarity_memo.get(key)
+        if entry is not None:
+            _similarity_memo.move_to_end(key)
+        return entry
+
+
+def _remember_similarity(key: tuple, score: float, exact: bool):
+    with _similarity_lock:
+        _similarity_memo[key] = (score, exact)
+        _similarity_memo.move_to_end(key)
+        if len(_similarity_memo) > SIMILARITY_CACHE_SIZE:
+            _similarity_memo.popitem(last=False)
+
+
 def string_similarity(str1: str, str2: str) -> float:
     """Returns a similarity ratio (0.0 to 1.0) between two strings."""
-    return SequenceMatcher(None, str1.lower(), str2.lower()).ratio()
+    key = (str1.lower(), str2.lower())
+    entry = _cached_similarity(key)
+    if entry is not None and entry[1]:
+        return entry[0]
+
+    score = SequenceMatcher(None, *key).ratio()
+    _remember_similarity(key, score, True)
+    return score
+
+
+def similarity_at_least(str1: str, str2: str, min_score: float) -> float:
+    """
+    Same score as string_similarity when it reaches min_score, 0.0 otherwise.
+    The memo is consulted first; on a miss, a cheap upper bound (length
+    ratio, then character overlap) skips the full ratio for pairs that
+    cannot reach min_score.
+    """
+    key = str1, str2 = str1.lower(), str2.lower()
+
+    entry = _cached_similarity(key)
+    if entry is not None and (entry[1] or entry[0] < min_score):
+        _count("cache_hits")
+        return entry[0] if entry[0] >= min_score else 0.0
+
+    total = len(str1) + len(str2)
+    if total and 2.0 * min(len(str1), len(str2)) / total < min_score:
+        _count("length_pruned")
+        return 0.0
+
+    matcher = SequenceMatcher(None, str1, str2)
+    if entry is None and total:
+        bound = matcher.quick_ratio()
+        if bound < min_score:
+            _remember_similarity(key, bound, False)
+            _count("quick_pruned")
+            return 0.0
+
+    _count("computed")
+    score = matcher.ratio()
+    _remember_similarity(key, score, True)
+    return score if score >= min_score else 0.0
+
+
+def similarity_stats() -> dict:
+    """Counters of similarity_at_least plus the number of pairs in the memo."""
+    with _similarity_lock:
+        return {**similarity_counters, "cache_size": len(_similarity_memo)}
+
+
+def reset_similarity_stats():
+    with _similarity_lock:
+        for name in similarity_counters:
+            similarity_counters[name] = 0
+        _similarity_memo.clear()
 
 
 def within_date_window(invoice_date, po_date, window_range=14) -> bool:
@@ -109,16 +207,30 @@ def check_items_desc_match(
     }
 
 
+## Invoice lines x PO lines from which "auto" pairing switches to the score matrix
+PAIRING_MATRIX_MIN_CELLS = 200
+
+
 def pair_invoice_items_to_po_items(
     invoice_items,
     po_items,
     desc_similarity_threshold=0.7,
+    engine="auto",
+    pairing_mode="greedy",
 ):
     """
     Pairs invoice items to Po items:
     1. Exact item_id match (highest priority)
     2. Fuzzy description match (fallback)
 
+    pairing_mode: "greedy" takes invoice lines in order and gives each the
+    best PO line still free; "optimal" pairs item_id hits first, then
+    assigns the remaining lines so the total similarity is maximal.
+
+    engine (greedy mode): "loop" scores pair by pair, "matrix" scores all
+    lines in one batched pass (needs numpy), "auto" picks the matrix for
+    large invoices. Both return identical results.
+
     Returns:
         {
           "pairs": [ { invoice_item, po_item, match_score, matched_by } ],
@@ -126,6 +238,23 @@ def pair_invoice_items_to_po_items(
           "unmatched_po_items": [...]
         }
     """
+    if pairing_mode == "optimal":
+        return _pair_items_optimally(invoice_items, po_items, desc_similarity_threshold)
+    if pairing_mode != "greedy":
+        raise ValueError(f"Unknown pairing mode: {pairing_mode}")
+
+    if engine == "auto":
+        use_matrix = (
+            matrix_engine_available()
+            and len(invoice_items) * len(po_items) >= PAIRING_MATRIX_MIN_CELLS
+        )
+    elif engine in ("loop", "matrix"):
+        use_matrix = engine == "matrix"
+    else:
+        raise ValueError(f"Unknown pairing engine: {engine}")
+
+    if use_matrix:
+        return _pair_items_over_matrix(invoice_items, po_items, desc_similarity_threshold)
 
     used_po_keys = set()
     pairs = []
@@ -160,7 +289,12 @@ def pair_invoice_items_to_po_items(
                 break
 
             ## Fuzzy Fallback to Item description
-            score = string_similarity(inv_desc, po_item.get("description", ""))
+            ## (a pair that can't beat the current best or the threshold is never accepted)
+            score = similarity_at_least(
+                inv_desc,
+                po_item.get("description", ""),
+                max(desc_similarity_threshold, best_score),
+            )
 
             if score > best_score:
                 best_po_item = po_item
@@ -202,6 +336,175 @@ def pair_invoice_items_to_po_items(
     }
 
 
+def _pair_items_over_matrix(invoice_items, po_items, desc_similarity_threshold):
+    """
+    Matrix engine of pair_invoice_items_to_po_items. Reproduces the loop:
+    invoice lines are taken in order, an unused PO line with the same item_id
+    wins, otherwise the first unused PO line with the best score. Consuming a
+    PO line also consumes every line with the same (item_id, description,
+    quantity, unit_price) key.
+
+    Character-overlap bounds for all invoice x PO lines are computed in one
+    batched pass; exact ratios only run for the few cells a bound can't rule out.
+    """
+    if not matrix_engine_available():
+        raise RuntimeError("The matrix pairing engine requires numpy")
+
+    inv_descs = [inv_item.get("description", "") for inv_item in invoice_items]
+    po_descs = [po_item.get("description", "") for po_item in po_items]
+    bounds = bound_matrix(inv_descs, po_descs)
+
+    key_columns = {}
+    id_columns = {}
+    column_keys = []
+    for j, po_item in enumerate(po_items):
+        key = (
+            po_item.get("item_id"),
+            po_item.get("description"),
+            po_item.get("quantity"),
+            po_item.get("unit_price"),
+        )
+        column_keys.append(key)
+        key_columns.setdefault(key, []).append(j)
+        id_columns.setdefault(po_item.get("item_id"), []).append(j)
+
+    available = [True] * len(po_items)
+    pairs = []
+    unmatched_invoice_items = []
+
+    for i, inv_item in enumerate(invoice_items):
+        inv_item_id = inv_item.get("item_id", "")
+
+        best_col = None
+        best_score = 0.0
+        matched_by = None
+
+        ## Exact Id match
+        if inv_item_id:
+            best_col = next(
+                (j for j in id_columns.get(inv_item_id, []) if available[j]), None
+            )
+            if best_col is not None:
+                best_score, matched_by = 1.0, "item_id"
+
+        ## Fuzzy Fallback to Item description
+        if best_col is None:
+            best_col, best_score = best_column(
+                inv_descs[i],
+                po_descs,
+                bounds[i],
+                available,
+                desc_similarity_threshold,
+                string_similarity,
+            )
+            matched_by = "description"
+
+        if best_col is not None and best_score >= desc_similarity_threshold:
+            pairs.append(
+                {
+                    "invoice_item": inv_item,
+                    "po_item": po_items[best_col],
+                    "match_score": round(best_score, 3),
+                    "matched_by": matched_by,
+                }
+            )
+            for j in key_columns[column_keys[best_col]]:
+                available[j] = False
+
+        else:
+            unmatched_invoice_items.append(inv_item)
+
+    unmatched_po_items = [po_item for j, po_item in enumerate(po_items) if available[j]]
+
+    return {
+        "pairs": pairs,
+        "unmatched_invoice_items": unmatched_invoice_items,
+        "unmatched_database_queried_po_items": unmatched_po_items,
+        "match_ratio": len(pairs) / len(invoice_items),
+    }
+
+
+def description_weights(row_descs: list, col_descs: list, min_score: float) -> dict:
+    """
+    { (row, col): similarity } for every description pair scoring at least
+    min_score. Pairs ruled out by cheap bounds are never scored.
+    """
+    if matrix_engine_available():
+        bounds = bound_matrix(row_descs, col_descs)
+        cells = zip(*(bounds >= min_score).nonzero())
+    else:
+        cells = ((r, c) for r in range(len(row_descs)) for c in range(len(col_descs)))
+
+    weights = {}
+    for r, c in cells:
+        r, c = int(r), int(c)
+        score = similarity_at_least(row_descs[r], col_descs[c], min_score)
+        if score > 0.0 and score >= min_score:
+            weights[(r, c)] = score
+    return weights
+
+
+def _pair_items_optimally(invoice_items, po_items, desc_similarity_threshold):
+    """
+    Optimal mode of pair_invoice_items_to_po_items.
+
+    Exact item_id hits are paired first (invoice order, first free PO line),
+    which keeps the assignment problem small for large invoices. The rest
+    are matched by a maximum-weight assignment over description similarities
+    at or above the threshold. Each PO line is consumed on its own.
+    """
+    pairs_by_row = {}
+    available = [True] * len(po_items)
+
+    ## 1. Exact Id matches
+    for i, inv_item in enumerate(invoice_items):
+        inv_item_id = inv_item.get("item_id", "")
+        if not inv_item_id:
+            continue
+        for j, po_item in enumerate(po_items):
+            if available[j] and po_item.get("item_id") == inv_item_id:
+                pairs_by_row[i] = (j, 1.0, "item_id")
+                available[j] = False
+                break
+
+    ## 2. Optimal assignment of the remaining descriptions
+    rows = [i for i in range(len(invoice_items)) if i not in pairs_by_row]
+    cols = [j for j in range(len(po_items)) if available[j]]
+    weights = description_weights(
+        [invoice_items[i].get("description", "") for i in rows],
+        [po_items[j].get("description", "") for j in cols],
+        desc_similarity_threshold,
+    )
+    for r, c in max_weight_assignment(weights):
+        pairs_by_row[rows[r]] = (cols[c], weights[(r, c)], "description")
+        available[cols[c]] = False
+
+    pairs = []
+    unmatched_invoice_items = []
+    for i, inv_item in enumerate(invoice_items):
+        if i not in pairs_by_row:
+            unmatched_invoice_items.append(inv_item)
+            continue
+        j, score, matched_by = pairs_by_row[i]
+        pairs.append(
+            {
+                "invoice_item": inv_item,
+                "po_item": po_items[j],
+                "match_score": round(score, 3),
+                "matched_by": matched_by,
+            }
+        )
+
+    unmatched_po_items = [po_item for j, po_item in enumerate(po_items) if available[j]]
+
+    return {
+        "pairs": pairs,
+        "unmatched_invoice_items": unmatched_invoice_items,
+        "unmatched_database_queried_po_items": unmatched_po_items,
+        "match_ratio": len(pairs) / len(invoice_items),
+    }
+
+
 def validate_item_price(invoice_item, po_item, math_error_tolerance=0.01):
     """
     Validate quantity, pricing, and arithmetic consistency for a
@@ -394,7 +697,7 @@ def format_workflow_output(result_dict: dict) -> str:
 
     # Calculate Net Processing Time (Sum of all agent execution times)
     exec_map = data.get("execution_times", {})
-    net_processing_time_sec = round(sum(exec_map.values()), 3)
+    net_processing_time_sec = net_processing_time(exec_map)
 
     # Construct the final structure
     invoice_data = data.get("extracted_invoice_results") or {}
@@ -416,13 +719,62 @@ def format_workflow_output(result_dict: dict) -> str:
             "resolution_action": data.get("resolution_agent_state"),
         },
         "discrepancies_found": data.get("discrepancies", []),
-        "agent_execution_trace": exec_map
+        "agent_execution_trace": exec_map,
+        "llm_cache_hits": data.get("llm_cache_hits", {}),
+        "llm_calls": data.get("llm_calls", {}),
+        "matching_decision": data.get("matching_decision"),
+        "validation_decision": data.get("validation_decision"),
+        "resolution_decision": data.get("resolution_decision"),
     }
 
     # Serialize to JSON with formatting
     return json.dumps(final_output, indent=2, default=str)
 
 
+def net_processing_time(execution_times: dict) -> float:
+    ## "node.tier" entries break a node's time down and are already counted in it
+    return round(sum(t for node, t in execution_times.items() if "." not in node), 3)
+
+
+def build_workflow_output(result_dict: dict) -> WorkflowOutput:
+    """
+    The graph result as a WorkflowOutput, without rebuilding and re-validating
+    a GraphState: every value in it was validated when its node returned.
+    """
+    invoice = result_dict.get("extracted_invoice_results")
+    exec_map = result_dict.get("execution_times", {})
+
+    return WorkflowOutput.model_construct(
+        invoice_metadata=InvoiceMetadata.model_construct(
+            invoice_id=invoice.invoice_number if invoice else "UNKNOWN",
+            net_processing_time_sec=net_processing_time(exec_map),
+            document_info=DocumentInfo.model_construct(
+                filename=result_dict.get("file_name"),
+                file_size_kb=result_dict.get("file_size_kb"),
+                page_count=result_dict.get("page_count"),
+            ),
+        ),
+        processing_results=ProcessingResults.model_construct(
+            document_intelligence=result_dict.get("document_intelligence_agent_state"),
+            matching_results=result_dict.get("matching_agent_state"),
+            validation_results=result_dict.get("audit_validation_agent_state"),
+            resolution_action=result_dict.get("resolution_agent_state"),
+        ),
+        discrepancies_found=result_dict.get("discrepancies", []),
+        agent_execution_trace=exec_map,
+        llm_cache_hits=result_dict.get("llm_cache_hits", {}),
+        llm_calls=result_dict.get("llm_calls", {}),
+        matching_decision=result_dict.get("matching_decision"),
+        validation_decision=result_dict.get("validation_decision"),
+        resolution_decision=result_dict.get("resolution_decision"),
+    )
+
+
+def workflow_output_record(result_dict: dict) -> str:
+    """The graph result as one compact JSON line, serialised by pydantic."""
+    return build_workflow_output(result_dict).model_dump_json()
+
+
 def save_json_output(data: str, file_name: str):
     """
     Save formatted JSON string output to a file.
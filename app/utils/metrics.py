@@ -0,0 +1,130 @@
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+
+def percentile(values: Iterable[float], pct: float) -> float:
+    """
+    Returns the pct-th percentile (0-100) of the given values using
+    linear interpolation between closest ranks. Returns 0.0 for no values.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+
+    rank = (len(ordered) - 1) * (pct / 100)
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    weight = rank - lower
+
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * weight
+
+
+def latency_summary(values: List[float]) -> Dict[str, float]:
+    """Summarises a list of latencies (seconds) into count / mean / p50 / p90 / p99 / max."""
+    if not values:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3),
+        "p50": round(percentile(values, 50), 3),
+        "p90": round(percentile(values, 90), 3),
+        "p99": round(percentile(values, 99), 3),
+        "max": round(max(values), 3),
+    }
+
+
+## Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 60)
+
+
+def latency_histogram(values: List[float], buckets=LATENCY_BUCKETS) -> Dict[str, list]:
+    """
+    Counts latencies (seconds) per bucket: counts[i] is the number of values
+    <= buckets[i] and above the previous bound; counts[-1] is everything above
+    the last bound.
+    """
+    counts = [0] * (len(buckets) + 1)
+    for value in values:
+        counts[bisect_left(buckets, value)] += 1
+    return {"buckets": list(buckets), "counts": counts}
+
+
+def node_latency_summary(execution_times: List[Dict[str, float]]) -> Dict[str, Dict]:
+    """
+    Groups the per-invoice `execution_times` maps by node name and
+    summarises each node's latency distribution.
+    """
+    per_node = defaultdict(list)
+    for exec_map in execution_times:
+        for node_name, duration in exec_map.items():
+            per_node[node_name].append(duration)
+
+    return {node: latency_summary(values) for node, values in sorted(per_node.items())}
+
+
+def node_counter_totals(counters: List[Dict[str, int]]) -> Dict[str, int]:
+    """Sums per-node counters (e.g. `llm_cache_hits`) across invoices."""
+    totals = defaultdict(int)
+    for counter_map in counters:
+        for node_name, count in counter_map.items():
+            totals[node_name] += count
+
+    return dict(sorted(totals.items()))
+
+
+def fast_path_summary(decisions: List[Dict], fast_path: str = "fast_path") -> Dict:
+    """
+    Summarises how an agent's decisions were made across invoices.
+
+    Each entry is { "path": fast_path | "llm" | None, "sec": float | None }.
+    Latency saved is estimated as the mean LLM decision time minus the fast
+    path's own time, per fast-path invoice; it is None when no invoice in the
+    run went to the LLM to measure against.
+    """
+    fast = [d["sec"] or 0.0 for d in decisions if d["path"] == fast_path]
+    llm = [d["sec"] or 0.0 for d in decisions if d["path"] == "llm"]
+    decided = len(fast) + len(llm)
+
+    estimated_saved_sec = None
+    if llm:
+        mean_llm_sec = sum(llm) / len(llm)
+        estimated_saved_sec = round(sum(mean_llm_sec - sec for sec in fast), 3)
+
+    return {
+        "fast_path": len(fast),
+        "llm": len(llm),
+        "fast_path_rate": round(len(fast) / decided, 3) if decided else 0.0,
+        "estimated_saved_sec": estimated_saved_sec,
+    }
+
+
+def llm_call_summary(llm_calls: List[Dict[str, List[dict]]]) -> Dict[str, Dict]:
+    """
+    Groups the per-invoice `llm_calls` maps by agent (graph node) and
+    aggregates their app.llm.telemetry records: call counts, token totals,
+    retries, and where the time went (queue wait / response / parse).
+    """
+    per_agent = defaultdict(list)
+    for calls_map in llm_calls:
+        for node_name, calls in calls_map.items():
+            per_agent[node_name].extend(calls)
+
+    summary = {}
+    for node_name, calls in sorted(per_agent.items()):
+        if not calls:
+            continue
+        sent = [c for c in calls if not c["cache_hit"]]
+        summary[node_name] = {
+            "calls": len(calls),
+            "cache_hits": len(calls) - len(sent),
+            "errors": sum(1 for c in calls if c["error"]),
+            "retries": sum(c["retries"] for c in calls),
+            "prompt_tokens": sum(c["prompt_tokens"] or 0 for c in sent),
+            "completion_tokens": sum(c["completion_tokens"] or 0 for c in sent),
+            "queue_wait_sec": latency_summary([c["queue_wait_sec"] for c in sent]),
+            "response_sec": latency_summary([c["response_sec"] for c in sent]),
+            "parse_sec": latency_summary([c["parse_sec"] for c in calls]),
+        }
+    return summary
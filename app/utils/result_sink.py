@@ -0,0 +1,120 @@
+import gzip
+import os
+import queue
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from app.core.config import RESULT_DIR, RESULT_GZIP, RESULT_JSONL_ENABLED, RESULT_ROTATE_MB
+
+_sink: Optional["JsonlResultSink"] = None
+_sink_lock = threading.Lock()
+
+
+class JsonlResultSink:
+    """
+    Appends one JSON record per line to `<directory>/results-<time>-<pid>-<n>.jsonl[.gz]`
+    from a background thread, so callers never wait on disk or compression.
+
+    A new file is started once the current one holds `rotate_bytes` of
+    (uncompressed) records. `write` only blocks when `max_pending` records
+    are already waiting for the writer.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        rotate_bytes: int,
+        compress: bool = False,
+        max_pending: int = 10_000,
+    ):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.rotate_bytes = rotate_bytes
+        self.compress = compress
+        self.stem = f"results-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+        self.paths: List[Path] = []
+        self.records = 0
+        self.error: Optional[BaseException] = None
+
+        self._file = None
+        self._file_bytes = 0
+        self._pending: queue.Queue = queue.Queue(max_pending)
+        self._thread = threading.Thread(target=self._run, name="result-sink", daemon=True)
+        self._thread.start()
+
+    def write(self, record: str) -> None:
+        """Queues one compact JSON record (no trailing newline)."""
+        if self.error is not None:
+            raise RuntimeError(f"Result sink stopped: {self.error}") from self.error
+        self._pending.put(record)
+
+    def _open_next(self):
+        suffix = ".jsonl.gz" if self.compress else ".jsonl"
+        path = self.directory / f"{self.stem}-{len(self.paths):04d}{suffix}"
+        self.paths.append(path)
+        self._file_bytes = 0
+        if self.compress:
+            return gzip.open(path, "wt", encoding="utf-8")
+        return path.open("w", encoding="utf-8")
+
+    def _run(self) -> None:
+        try:
+            while True:
+                record = self._pending.get()
+                if record is None:
+                    break
+                if self._file is None or self._file_bytes >= self.rotate_bytes:
+                    if self._file is not None:
+                        self._file.close()
+                    self._file = self._open_next()
+                self._file.write(record + "\n")
+                self._file_bytes += len(record) + 1
+                self.records += 1
+                ## Hand finished records to the OS once the queue is drained
+                if self._pending.empty():
+                    self._file.flush()
+        except BaseException as e:
+            self.error = e
+        finally:
+            if self._file is not None:
+                self._file.close()
+
+    def close(self) -> None:
+        """Writes every queued record, then closes the current file."""
+        if self._thread.is_alive():
+            self._pending.put(None)
+        self._thread.join()
+
+
+def get_result_sink() -> Optional[JsonlResultSink]:
+    """The process's result sink, started on first use; None when JSONL output is off."""
+    global _sink
+    if not RESULT_JSONL_ENABLED:
+        return None
+    with _sink_lock:
+        if _sink is None:
+            _sink = JsonlResultSink(
+                RESULT_DIR,
+                rotate_bytes=int(RESULT_ROTATE_MB * 1024 * 1024),
+                compress=RESULT_GZIP,
+            )
+    return _sink
+
+
+def shutdown_result_sink() -> None:
+    """Drains and closes the result sink, if one was started."""
+    global _sink
+    with _sink_lock:
+        sink, _sink = _sink, None
+    if sink is None:
+        return
+
+    sink.close()
+    if sink.error is not None:
+        print(f"[Results]: writer failed after {sink.records} records: {sink.error}")
+    print(
+        f"[Results]: {sink.records} records written to "
+        + ", ".join(str(path) for path in sink.paths)
+    )
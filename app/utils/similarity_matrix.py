@@ -0,0 +1,128 @@
+try:
+    import numpy as np
+except ImportError:  ## Without numpy, line pairing falls back to the pure-Python loop
+    np = None
+
+## Upper bound on rows x columns x alphabet cells held in memory at once
+MAX_CHUNK_CELLS = 4_000_000
+
+
+def matrix_engine_available() -> bool:
+    return np is not None
+
+
+def char_count_vectors(texts: list, alphabet: dict) -> "np.ndarray":
+    """One row of per-character counts for each text, columns ordered by `alphabet`."""
+    counts = np.zeros((len(texts), len(alphabet)), dtype=np.int32)
+    for row, text in enumerate(texts):
+        for char in text:
+            counts[row, alphabet[char]] += 1
+    return counts
+
+
+def overlap_upper_bounds(row_texts: list, col_texts: list) -> "np.ndarray":
+    """
+    Matrix of difflib `quick_ratio` values (2 * shared characters / total
+    length) for every row x column pair. SequenceMatcher.ratio() never
+    exceeds it, so any pair below a threshold here can be skipped.
+    """
+    alphabet = {}
+    for text in row_texts + col_texts:
+        for char in text:
+            alphabet.setdefault(char, len(alphabet))
+
+    rows = char_count_vectors(row_texts, alphabet)
+    cols = char_count_vectors(col_texts, alphabet)
+    row_lengths = np.array([len(t) for t in row_texts], dtype=np.float64)
+    col_lengths = np.array([len(t) for t in col_texts], dtype=np.float64)
+
+    shared = np.empty((len(row_texts), len(col_texts)), dtype=np.float64)
+    chunk = max(1, MAX_CHUNK_CELLS // max(1, len(col_texts) * len(alphabet)))
+    for start in range(0, len(row_texts), chunk):
+        block = rows[start : start + chunk, None, :]
+        shared[start : start + chunk] = np.minimum(block, cols[None, :, :]).sum(axis=2)
+
+    totals = row_lengths[:, None] + col_lengths[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bounds = np.where(totals > 0, 2.0 * shared / totals, 1.0)
+    return bounds
+
+
+def char_count_table(texts: list) -> tuple:
+    """(alphabet, char_count_vectors, text lengths) of `texts`, for `overlap_upper_bounds_for`."""
+    alphabet = {}
+    for text in texts:
+        for char in text:
+            alphabet.setdefault(char, len(alphabet))
+    lengths = np.array([len(text) for text in texts], dtype=np.float64)
+    return alphabet, char_count_vectors(texts, alphabet), lengths
+
+
+def overlap_upper_bounds_for(
+    text: str, counts: "np.ndarray", lengths: "np.ndarray", alphabet: dict
+) -> "np.ndarray":
+    """
+    `overlap_upper_bounds` of one text against every row of a precomputed
+    `char_count_vectors` table (`lengths` holding each row's text length).
+    Characters outside `alphabet` count towards the length only.
+    """
+    query = np.zeros(len(alphabet), dtype=np.int32)
+    for char in text:
+        column = alphabet.get(char)
+        if column is not None:
+            query[column] += 1
+
+    shared = np.minimum(counts, query[None, :]).sum(axis=1)
+    totals = lengths + len(text)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(totals > 0, 2.0 * shared / totals, 1.0)
+
+
+def bound_matrix(row_texts: list, col_texts: list) -> "np.ndarray":
+    """
+    `overlap_upper_bounds` for every row x column text pair, compared
+    case-insensitively. Repeated texts are only counted once.
+    """
+    if not row_texts or not col_texts:
+        return np.zeros((len(row_texts), len(col_texts)), dtype=np.float64)
+
+    distinct_rows = {}
+    row_index = [distinct_rows.setdefault(t.lower(), len(distinct_rows)) for t in row_texts]
+    distinct_cols = {}
+    col_index = [distinct_cols.setdefault(t.lower(), len(distinct_cols)) for t in col_texts]
+
+    bounds = overlap_upper_bounds(list(distinct_rows), list(distinct_cols))
+    return bounds[np.ix_(row_index, col_index)]
+
+
+def best_column(
+    row_text: str,
+    col_texts: list,
+    bounds_row: "np.ndarray",
+    available: list,
+    min_score: float,
+    score_fn,
+) -> tuple:
+    """
+    First available column with the highest `score_fn` score, as a left to
+    right scan would pick it.
+
+    Columns are visited in descending bound order and the search stops once
+    no remaining bound can reach the best score so far; columns whose bound
+    is below min_score are never scored.
+
+    Returns:
+        (column index, score), or (None, 0.0) when no column scores above 0.
+    """
+    candidates = np.flatnonzero(np.asarray(available, dtype=bool) & (bounds_row >= min_score))
+    order = candidates[np.argsort(-bounds_row[candidates], kind="stable")]
+
+    best_col, best_score = None, 0.0
+    for j in order.tolist():
+        if bounds_row[j] < best_score:
+            break
+        score = score_fn(row_text, col_texts[j])
+        if score > best_score or (score == best_score and best_col is not None and j < best_col):
+            best_col, best_score = j, score
+
+    return best_col, best_score
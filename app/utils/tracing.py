@@ -0,0 +1,284 @@
+import argparse
+import functools
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import TRACE_CHROME, TRACE_DIR, TRACE_ENABLED
+
+## The span the running code is inside of; children inherit its invoice / node
+_current_span: ContextVar[Optional[dict]] = ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+
+_exporter: Optional["JsonlSpanExporter"] = None
+_exporter_lock = threading.Lock()
+
+
+class JsonlSpanExporter:
+    """
+    Appends every finished span to a JSONL file, one object per line.
+    Serialising and writing happen on a background thread, so spans closed
+    on the event loop never wait on disk.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._pending: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, record: dict) -> None:
+        self._pending.put(record)
+
+    def _run(self) -> None:
+        with self.path.open("a", encoding="utf-8") as f:
+            while True:
+                record = self._pending.get()
+                if record is None:
+                    break
+                f.write(json.dumps(record, default=str) + "\n")
+                ## Hand finished spans to the OS once the queue is drained
+                if self._pending.empty():
+                    f.flush()
+
+    def close(self) -> None:
+        """Writes every queued span, then closes the file."""
+        if self._thread.is_alive():
+            self._pending.put(None)
+        self._thread.join()
+
+
+def get_exporter() -> Optional[JsonlSpanExporter]:
+    """The process's span exporter, opened on first use; None when tracing is off."""
+    global _exporter
+    if not TRACE_ENABLED:
+        return None
+    with _exporter_lock:
+        if _exporter is None:
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+            _exporter = JsonlSpanExporter(TRACE_DIR / f"trace-{stamp}-{os.getpid()}.jsonl")
+    return _exporter
+
+
+def _new_span(name: str, attributes: dict) -> dict:
+    parent = _current_span.get()
+    span_id = next(_span_ids)
+    return {
+        "name": name,
+        "span_id": span_id,
+        "parent_id": parent["span_id"] if parent else None,
+        ## One trace per invoice: the root span's id
+        "trace_id": parent["trace_id"] if parent else span_id,
+        "invoice": attributes.pop("invoice", parent["invoice"] if parent else None),
+        "node": attributes.pop("node", parent["node"] if parent else None),
+        "start_unix": time.time(),
+        "duration_sec": 0.0,
+        "pid": os.getpid(),
+        "thread": threading.current_thread().name,
+        "error": None,
+        "attributes": attributes,
+    }
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Times the block as a span nested under the current one and exports it
+    when the block exits. `invoice` and `node` attributes are inherited by
+    every span opened inside.
+
+    Yields the span record (attributes may be added to it), or None when
+    tracing is off.
+    """
+    exporter = get_exporter()
+    if exporter is None:
+        yield None
+        return
+
+    record = _new_span(name, attributes)
+    token = _current_span.set(record)
+    starttime = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record["duration_sec"] = round(time.perf_counter() - starttime, 6)
+        _current_span.reset(token)
+        exporter.export(record)
+
+
+def record_span(name: str, duration_sec: float, **attributes) -> None:
+    """Exports a span that just ended, for work timed elsewhere (e.g. a worker process)."""
+    exporter = get_exporter()
+    if exporter is None:
+        return
+
+    record = _new_span(name, attributes)
+    record["start_unix"] -= duration_sec
+    record["duration_sec"] = round(duration_sec, 6)
+    exporter.export(record)
+
+
+def traced(name: str):
+    """Runs an async function (a graph node) inside a span that also sets `node`."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(name, node=name):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def assign_lanes(events: list, parents: list) -> list:
+    """
+    Lane (0, 1, ...) for each "X" event of one trace, such that the events
+    on a lane nest strictly, as Chrome requires of one thread's events.
+    `parents[i]` is the index of event i's parent span, or None.
+
+    A span goes on its parent's lane when the parent is the innermost span
+    still open there, otherwise on the first lane with nothing open, so
+    spans that ran concurrently (OCR pages, threaded tiers) get lanes of
+    their own and never appear nested under a sibling.
+    """
+    depths = [0] * len(events)
+    for i in range(len(events)):
+        parent = parents[i]
+        while parent is not None and depths[i] < len(events):
+            depths[i] += 1
+            parent = parents[parent]
+
+    lanes = [0] * len(events)
+    stacks = []  ## Per lane: (end, event index) of the spans open at the current start
+    ## Parents before children, also when rounding gives them the same start and duration
+    order = sorted(
+        range(len(events)), key=lambda i: (events[i]["ts"], -events[i]["dur"], depths[i])
+    )
+    for i in order:
+        start = events[i]["ts"]
+        for stack in stacks:
+            while stack and stack[-1][0] <= start:
+                stack.pop()
+
+        parent = parents[i]
+        lane = lanes[parent] if parent is not None else None
+        if lane is not None and stacks[lane] and stacks[lane][-1][1] == parent:
+            ## Allow for microsecond rounding past the parent's end
+            events[i]["dur"] = min(events[i]["dur"], stacks[lane][-1][0] - start)
+        else:
+            lane = next((n for n, stack in enumerate(stacks) if not stack), len(stacks))
+            if lane == len(stacks):
+                stacks.append([])
+        stacks[lane].append((start + events[i]["dur"], i))
+        lanes[i] = lane
+    return lanes
+
+
+def to_chrome_trace(jsonl_path: Path, chrome_path: Optional[Path] = None) -> Path:
+    """
+    Converts a span JSONL file to the Chrome trace event format, loadable in
+    chrome://tracing or ui.perfetto.dev. Each invoice gets its own group of
+    rows: one, plus one per level of concurrency inside it (see `assign_lanes`).
+    """
+    chrome_path = chrome_path or jsonl_path.with_suffix(".chrome.json")
+
+    traces = {}  ## (pid, trace_id) -> (invoice, events, span ids, parent ids), in order of first span
+    with jsonl_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            key = (record["pid"], record["trace_id"])
+            if key not in traces:
+                traces[key] = (record["invoice"], [], [], [])
+            traces[key][2].append(record["span_id"])
+            traces[key][3].append(record["parent_id"])
+            traces[key][1].append(
+                {
+                    "name": record["name"],
+                    "cat": record["node"] or "run",
+                    "ph": "X",
+                    "ts": round(record["start_unix"] * 1e6),
+                    "dur": round(record["duration_sec"] * 1e6),
+                    "pid": record["pid"],
+                    "args": {
+                        "invoice": record["invoice"],
+                        "error": record["error"],
+                        **record["attributes"],
+                    },
+                }
+            )
+
+    events, next_row = [], 1
+    for (pid, _), (invoice, trace_events, span_ids, parent_ids) in traces.items():
+        position = {span_id: i for i, span_id in enumerate(span_ids)}
+        lanes = assign_lanes(trace_events, [position.get(parent) for parent in parent_ids])
+        for event, lane in zip(trace_events, lanes):
+            event["tid"] = next_row + lane
+        events.extend(trace_events)
+
+        ## Label each row with its invoice and keep an invoice's rows together
+        label = invoice or f"trace {next_row}"
+        for lane in range(max(lanes, default=0) + 1):
+            row = next_row + lane
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": row,
+                    "args": {"name": label if lane == 0 else f"{label} ({lane + 1})"},
+                }
+            )
+            events.append(
+                {
+                    "name": "thread_sort_index",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": row,
+                    "args": {"sort_index": row},
+                }
+            )
+        next_row += max(lanes, default=0) + 1
+
+    with chrome_path.open("w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return chrome_path
+
+
+def shutdown_tracing() -> None:
+    """Closes the JSONL file and, with TRACE_CHROME, writes its Chrome trace next to it."""
+    global _exporter
+    with _exporter_lock:
+        exporter, _exporter = _exporter, None
+    if exporter is None:
+        return
+
+    exporter.close()
+    print(f"[Tracing]: spans written to {exporter.path}")
+    if TRACE_CHROME:
+        print(f"[Tracing]: Chrome trace written to {to_chrome_trace(exporter.path)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a span JSONL file to a Chrome trace.")
+    parser.add_argument("jsonl", type=Path)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+    print(to_chrome_trace(args.jsonl, args.out))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+from typing import Optional
+
+from app.models.invoice_extraction_model import InvoiceExtractionResults
+from app.models.validation_model import (
+    LineItemPriceVariation,
+    TotalPriceVariation,
+    ValidationAgentOutput,
+)
+from app.models.discrepancies_models.ValidationDiscrepanices import (
+    FinancialArithmeticDiscrepancy,
+    LineItemPriceDiscrepancy,
+    LineItemQuantityDiscrepancy,
+    SupplierNameDiscrepancy,
+    TotalAmountVarianceDiscrepancy,
+    UnexpectedItemDiscrepancy,
+)
+
+## Thresholds of the audit prompt's materiality and mapping rules
+SUPPLIER_SIMILARITY_MIN = 0.90
+ROUNDING_NOISE = 0.05
+LINE_PRICE_TOLERANCE_PERCENT = 15.0
+TOTAL_TOLERANCE_PERCENT = 10.0
+
+## How often the rules decided vs. handed the report to the audit agent
+rule_engine_counters = {"decided": 0, "deferred": 0}
+
+
+def rule_engine_stats() -> dict:
+    decided, deferred = rule_engine_counters["decided"], rule_engine_counters["deferred"]
+    return {
+        "llm_calls_skipped": decided,
+        "llm_calls_made": deferred,
+        "skip_rate": round(decided / (decided + deferred), 3) if decided + deferred else 0.0,
+    }
+
+
+def _unclassifiable(report: dict) -> Optional[str]:
+    """Why the rules can't map this report onto discrepancies, or None if they can."""
+    if "header" not in report:
+        return report.get("reason", "no validation report")
+    if not report["header"]["currency_ok"]:
+        return "non-GBP currency"
+    ## The PO total includes the unbilled lines; the audit agent judges the delivered subset
+    if report["structure"]["status"] == "partial_delivery":
+        return "partial delivery"
+
+    for result in report["item_audit"]["results"]:
+        if result["unit_price_variance"] is None or result["item_total_variance"] is None:
+            return "line item without prices or totals"
+        if not result["invoice_math_consistent"]:
+            return "line item arithmetic inconsistent"
+        ## Line total off with neither quantity nor unit price to explain it
+        if (
+            not result["item_total_variance_within_1percent"]
+            and result["quantity_match"]
+            and result["unit_price_within_2percent"]
+        ):
+            return "unexplained line total variance"
+    return None
+
+
+def build_validation_output(
+    invoice: InvoiceExtractionResults,
+    po: dict,
+    report: dict,
+    pairs: list,
+) -> Optional[ValidationAgentOutput]:
+    """
+    Deterministic audit of a `validate_invoice_wrt_po` report, following the
+    audit prompt's mapping rules. `pairs` are the paired line items the
+    report's `item_audit.results` were computed from, in the same order.
+
+    Returns None (and counts a deferral) when the report holds something the
+    rules don't classify, leaving the decision to the audit agent.
+    """
+    reason = _unclassifiable(report)
+    if reason is not None:
+        rule_engine_counters["deferred"] += 1
+        print(f"[Validation Rules]: deferring to the audit agent ({reason})")
+        return None
+
+    header, financials = report["header"], report["financials"]
+    discrepancies = []
+
+    ## Header
+    if header["supplier_name_similarity"] < SUPPLIER_SIMILARITY_MIN:
+        discrepancies.append(
+            SupplierNameDiscrepancy(
+                details=(
+                    f"Supplier name similarity {header['supplier_name_similarity']} "
+                    f"is below {SUPPLIER_SIMILARITY_MIN}."
+                ),
+                detected_by="validation",
+                invoice_supplier_name=invoice.supplier_name,
+                po_supplier_name=po.get("supplier", ""),
+                similarity_score=header["supplier_name_similarity"],
+            )
+        )
+
+    ## Line items
+    largest_variance = None
+    for pair, result in zip(pairs, report["item_audit"]["results"]):
+        invoice_item, po_item = pair["invoice_item"], pair["po_item"]
+
+        if (
+            not result["unit_price_within_2percent"]
+            and abs(result["unit_price_variance"]) > ROUNDING_NOISE
+        ):
+            discrepancies.append(
+                LineItemPriceDiscrepancy(
+                    details=(
+                        f"Unit price variance {result['unit_price_variance_percent']}% "
+                        f"exceeds the 2% tolerance."
+                    ),
+                    detected_by="validation",
+                    item_id=invoice_item.get("item_id") or None,
+                    description=invoice_item.get("description", ""),
+                    invoice_unit_price=invoice_item["unit_price"],
+                    po_unit_price=po_item["unit_price"],
+                    variance_percent=result["unit_price_variance_percent"],
+                )
+            )
+
+        if not result["quantity_match"]:
+            discrepancies.append(
+                LineItemQuantityDiscrepancy(
+                    details=(
+                        f"Invoiced quantity {invoice_item['quantity']} differs from "
+                        f"ordered quantity {po_item['quantity']}."
+                    ),
+                    detected_by="validation",
+                    item_id=invoice_item.get("item_id") or None,
+                    description=invoice_item.get("description", ""),
+                    invoice_quantity=invoice_item["quantity"],
+                    po_quantity=po_item["quantity"],
+                )
+            )
+
+        ## The most significant line-item *price* variance, per the prompt
+        if abs(result["unit_price_variance"]) > ROUNDING_NOISE and (
+            largest_variance is None
+            or abs(result["unit_price_variance_percent"])
+            > abs(largest_variance[1]["unit_price_variance_percent"])
+        ):
+            largest_variance = (invoice_item, result)
+
+    for item in report["item_audit"]["unmatched_invoice_items"]:
+        discrepancies.append(
+            UnexpectedItemDiscrepancy(
+                detected_by="validation",
+                item_description=item.get("description", ""),
+                item_quantity=item.get("quantity") or 0.0,
+                item_total=item.get("line_total") or 0.0,
+            )
+        )
+
+    ## Financials
+    if financials["math_error_on_invoice"]:
+        discrepancies.append(
+            FinancialArithmeticDiscrepancy(
+                detected_by="validation",
+                invoice_subtotal=invoice.totals.subtotal,
+                invoice_vat_amount=invoice.totals.vat_amount,
+                invoice_total_due=invoice.totals.total_due,
+                calculated_expected_total=round(
+                    invoice.totals.subtotal + invoice.totals.vat_amount, 2
+                ),
+            )
+        )
+
+    if not financials["invoice_total_is_valid"]:
+        discrepancies.append(
+            TotalAmountVarianceDiscrepancy(
+                details=(
+                    f"Invoice total {invoice.totals.total_due} vs PO total {po.get('total')}: "
+                    f"{financials['variance_amount']} ({financials['variance_percent']}%) variance."
+                ),
+                detected_by="validation",
+                invoice_total=invoice.totals.total_due,
+                po_total=po.get("total"),
+                variance_amount=financials["variance_amount"],
+                variance_percent=financials["variance_percent"],
+            )
+        )
+
+    total_variance = TotalPriceVariation(
+        variance_amount=financials["variance_amount"],
+        variance_percent=financials["variance_percent"],
+        within_tolerance=abs(financials["variance_percent"]) <= TOTAL_TOLERANCE_PERCENT,
+    )
+
+    line_item_total_variance = None
+    if largest_variance is not None:
+        invoice_item, result = largest_variance
+        line_item_total_variance = LineItemPriceVariation(
+            item_code=invoice_item.get("item_id") or "",
+            item_desc=invoice_item.get("description", ""),
+            variance_amount=result["unit_price_variance"],
+            variance_percent=result["unit_price_variance_percent"],
+            within_tolerance=abs(result["unit_price_variance_percent"])
+            <= LINE_PRICE_TOLERANCE_PERCENT,
+        )
+
+    ## Status, per the prompt's consistency rules
+    if not discrepancies:
+        status = "clean"
+    elif (
+        not total_variance.within_tolerance
+        or (line_item_total_variance and not line_item_total_variance.within_tolerance)
+        or any(d.severity == "high" for d in discrepancies)
+    ):
+        status = "critical failures"
+    else:
+        status = "minor failures"
+
+    findings = [
+        f"{report['item_audit']['audited_count']} line item(s) paired and audited "
+        f"({report['structure']['status']})",
+        f"supplier name similarity {header['supplier_name_similarity']}",
+        f"total variance {financials['variance_amount']} ({financials['variance_percent']}%)",
+    ]
+    if discrepancies:
+        findings.append("raised: " + ", ".join(d.type for d in discrepancies))
+    else:
+        findings.append("every check within tolerance")
+
+    rule_engine_counters["decided"] += 1
+    return ValidationAgentOutput(
+        status=status,
+        total_variance=total_variance,
+        line_item_total_variance=line_item_total_variance,
+        agent_reasoning="Rule-based audit: " + "; ".join(findings) + ".",
+        discrepancies=discrepancies,
+    )
@@ -1,19 +1,24 @@
 from app.utils.db_helpers import find_po_by_number
 from app.models.invoice_extraction_model import InvoiceExtractionResults
+from app.matching.context import MatchingContext
 from app.utils.helpers import (
     get_date_window_variation,
     string_similarity,
-    pair_invoice_items_to_po_items,
-    validate_item_price,
     validate_total_variance,
 )
 
+## Line pairing threshold of the audit (and of the rule engine reading its pairs)
+ITEM_DESCRIPTION_SIMILARITY_THRESHOLD = 0.7
+
 
 def validate_invoice_wrt_po(
     invoice: InvoiceExtractionResults,
     matched_po_number: str,
-    item_description_similarity_threshold: float = 0.7,
+    item_description_similarity_threshold: float = ITEM_DESCRIPTION_SIMILARITY_THRESHOLD,
+    context: MatchingContext | None = None,  # Shared with the matching tiers
 ):
+    context = context or MatchingContext(invoice)
+
     # Exit if no valid matched_po_number to validate against
     po = find_po_by_number(matched_po_number)
 
@@ -27,8 +32,8 @@ def validate_invoice_wrt_po(
 
     # Supplier sanity check
     supplier_score = string_similarity(
-        invoice.supplier_name.strip().lower(),
-        po.get("supplier", "").strip().lower(),
+        context.normalized(invoice.supplier_name),
+        context.normalized(po.get("supplier", "")),
     )
 
     # Date window sanity check
@@ -44,12 +49,7 @@ def validate_invoice_wrt_po(
     }
 
     ## STRUCTURAL VALIDATION
-    invoice_line_items = [item.model_dump() for item in invoice.line_items]
-    pairing_result = pair_invoice_items_to_po_items(
-        invoice_items=invoice_line_items,
-        po_items=po.get("line_items", []),
-        desc_similarity_threshold=item_description_similarity_threshold,
-    )
+    pairing_result = context.pair_with_po(po, item_description_similarity_threshold)
 
     pairs = pairing_result["pairs"]
     unmatched_invoice_items = pairing_result["unmatched_invoice_items"]
@@ -84,9 +84,7 @@ def validate_invoice_wrt_po(
     # Price Audit (Only audit paired items)
     item_price_results = []
     for pair in pairs:
-        math_check = validate_item_price(
-            invoice_item=pair["invoice_item"], po_item=pair["po_item"]
-        )
+        math_check = context.validate_item_price(pair["invoice_item"], pair["po_item"])
         ## Attach Id and description
         if pair["invoice_item"].get("item_id"):
             math_check["item_id"] = pair["invoice_item"].get("item_id")
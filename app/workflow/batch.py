@@ -0,0 +1,317 @@
+import asyncio
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from pydantic import ValidationError
+from app.workflow.graph import compiled_graph
+from app.models.graph import GraphState
+from app.core.config import RESULT_PRETTY_ENABLED
+from app.utils.helpers import (
+    format_workflow_output,
+    save_json_output,
+    workflow_output_record,
+)
+from app.utils.metrics import (
+    fast_path_summary,
+    llm_call_summary,
+    node_latency_summary,
+    node_counter_totals,
+)
+from app.pdf_data_extraction.ocr_cache import get_ocr_cache
+from app.utils.result_sink import get_result_sink
+from app.utils.tracing import span
+
+
+async def run_invoice(file_name: str, print_output: bool = True) -> dict:
+    """
+    Runs a single invoice through the compiled graph.
+
+    Errors are caught and reported per invoice so that one bad document
+    never aborts a batch.
+
+    The result is appended to the JSONL result sink; the indented
+    output/<invoice>.json file is only written with RESULT_PRETTY_ENABLED
+    (and `print_output` prints the same indented JSON).
+
+    Returns:
+        {
+          "file_name": str,
+          "status": "ok" | "error",
+          "error": str | None,
+          "duration_sec": float,
+          "execution_times": { node_name: seconds },
+          "llm_cache_hits": { node_name: hits },
+          "llm_calls": { node_name: [ app.llm.telemetry call record ] },
+          "matching_decision": "fast_path" | "llm" | None,
+          "validation_decision": "rules" | "llm" | None,
+          "resolution_decision": "rules" | "llm" | None,
+        }
+    """
+    starttime = time.perf_counter()
+    outcome = {
+        "file_name": file_name,
+        "status": "error",
+        "error": None,
+        "execution_times": {},
+        "llm_cache_hits": {},
+        "llm_calls": {},
+        "matching_decision": None,
+        "validation_decision": None,
+        "resolution_decision": None,
+    }
+
+    try:
+        initial_state = GraphState(file_name=file_name)
+
+        ## Root span of this invoice's trace; every node / stage span nests under it
+        with span("invoice", invoice=Path(file_name).stem, file=file_name):
+            print(f"--- Starting Workflow for: {file_name} ---")
+            result = await compiled_graph.ainvoke(initial_state)
+            print(f"--- Workflow Completed Successfully: {file_name} ---")
+
+            with span("output.save"):
+                sink = get_result_sink()
+                if sink is not None:
+                    sink.write(workflow_output_record(result))
+
+                if print_output or RESULT_PRETTY_ENABLED:
+                    formatted_json = format_workflow_output(result)
+                    if print_output:
+                        print("\n## FINAL SYSTEM OUTPUT")
+                        print(formatted_json)
+                    if RESULT_PRETTY_ENABLED:
+                        save_json_output(formatted_json, file_name)
+
+        outcome["status"] = "ok"
+        outcome["execution_times"] = dict(result.get("execution_times", {}))
+        outcome["llm_cache_hits"] = dict(result.get("llm_cache_hits", {}))
+        outcome["llm_calls"] = dict(result.get("llm_calls", {}))
+        outcome["matching_decision"] = result.get("matching_decision")
+        outcome["validation_decision"] = result.get("validation_decision")
+        outcome["resolution_decision"] = result.get("resolution_decision")
+
+    except ValidationError as e:
+        print(f"[Schema Error] {file_name}: State validation failed.")
+        for error in e.errors():
+            print(f"  - Field {error['loc']}: {error['msg']}")
+        outcome["error"] = f"ValidationError - {e.error_count()} error(s)"
+
+    except FileNotFoundError as e:
+        print(f"[File Error] {file_name}: Could not locate the document. {e}")
+        outcome["error"] = f"FileNotFoundError - {e}"
+
+    except TypeError as e:
+        print(
+            f"[Type Error] {file_name}: An operation was performed on an incompatible type. {e}"
+        )
+        outcome["error"] = f"TypeError - {e}"
+
+    except ValueError as e:
+        print(f"[Value Error] {file_name}: Received an inappropriate value. {e}")
+        outcome["error"] = f"ValueError - {e}"
+
+    except RuntimeError as e:
+        print(
+            f"[Runtime Error] {file_name}: An error occurred during runtime execution. {e}"
+        )
+        outcome["error"] = f"RuntimeError - {e}"
+
+    except Exception as e:
+        print(f"[Unexpected Error] {file_name}: {type(e).__name__} - {str(e)}")
+        outcome["error"] = f"{type(e).__name__} - {e}"
+
+    outcome["duration_sec"] = round(time.perf_counter() - starttime, 3)
+    return outcome
+
+
+def collect_invoice_files(
+    directory: Optional[str] = None,
+    manifest: Optional[str] = None,
+) -> List[str]:
+    """
+    Builds the list of invoice paths for a batch run.
+
+    - directory: every `*.pdf` inside it (sorted, non-recursive).
+    - manifest: a text file with one PDF path per line. Blank lines and
+      lines starting with '#' are ignored; relative paths are resolved
+      against the manifest's own folder.
+    """
+    files = []
+
+    if directory:
+        dir_path = Path(directory).resolve()
+        if not dir_path.is_dir():
+            raise FileNotFoundError(f"Invoice directory not found: {dir_path}")
+        files.extend(str(p) for p in sorted(dir_path.glob("*.pdf")))
+
+    if manifest:
+        manifest_path = Path(manifest).resolve()
+        if not manifest_path.is_file():
+            raise FileNotFoundError(f"Manifest not found: {manifest_path}")
+
+        with manifest_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                entry = line.strip()
+                if not entry or entry.startswith("#"):
+                    continue
+                entry_path = Path(entry)
+                if not entry_path.is_absolute():
+                    entry_path = manifest_path.parent / entry_path
+                files.append(str(entry_path.resolve()))
+
+    return files
+
+
+async def run_batch(files: List[str], concurrency: int = 4) -> dict:
+    """
+    Drives many invoices through the compiled graph concurrently,
+    with at most `concurrency` invoices in flight at any time.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded_run(file_name: str) -> dict:
+        async with semaphore:
+            return await run_invoice(file_name, print_output=False)
+
+    starttime = time.perf_counter()
+    outcomes = await asyncio.gather(*(bounded_run(f) for f in files))
+    wall_time_sec = time.perf_counter() - starttime
+
+    report = summarize_batch(outcomes, wall_time_sec, concurrency)
+    ocr_cache = get_ocr_cache()
+    report["ocr_cache"] = ocr_cache.stats() if ocr_cache is not None else None
+    print_batch_report(report)
+    return report
+
+
+def summarize_batch(outcomes: List[dict], wall_time_sec: float, concurrency: int) -> dict:
+    succeeded = [o for o in outcomes if o["status"] == "ok"]
+    failed = [o for o in outcomes if o["status"] != "ok"]
+
+    throughput = (len(outcomes) / wall_time_sec) * 60 if wall_time_sec > 0 else 0.0
+
+    return {
+        "total_invoices": len(outcomes),
+        "succeeded": len(succeeded),
+        "failed": len(failed),
+        "concurrency": concurrency,
+        "wall_time_sec": round(wall_time_sec, 3),
+        "throughput_invoices_per_min": round(throughput, 2),
+        "node_latency_sec": node_latency_summary(
+            [o["execution_times"] for o in succeeded]
+        ),
+        "node_llm_cache_hits": node_counter_totals(
+            [o["llm_cache_hits"] for o in succeeded]
+        ),
+        "llm_calls": llm_call_summary([o["llm_calls"] for o in succeeded]),
+        "matching_fast_path": fast_path_summary(
+            [
+                {
+                    "path": o["matching_decision"],
+                    "sec": o["execution_times"].get("document_matching_agent.decision"),
+                }
+                for o in succeeded
+            ]
+        ),
+        "validation_rules": fast_path_summary(
+            [
+                {
+                    "path": o["validation_decision"],
+                    "sec": o["execution_times"].get("auditing_and_validation_agent.decision"),
+                }
+                for o in succeeded
+            ],
+            fast_path="rules",
+        ),
+        "resolution_rules": fast_path_summary(
+            [
+                {
+                    "path": o["resolution_decision"],
+                    "sec": o["execution_times"].get("resolution_recommendation_agent.decision"),
+                }
+                for o in succeeded
+            ],
+            fast_path="rules",
+        ),
+        "failures": [{"file_name": o["file_name"], "error": o["error"]} for o in failed],
+    }
+
+
+def format_saved(estimated_saved_sec: Optional[float]) -> str:
+    ## None when no invoice in the run went to the LLM to compare against
+    return "n/a" if estimated_saved_sec is None else f"{estimated_saved_sec}s"
+
+
+def print_batch_report(report: dict):
+    print("\n" + "═" * 60)
+    print("--- BATCH RUN SUMMARY ---".center(60))
+    print("═" * 60)
+
+    print(
+        f"\nINVOICES:   {report['total_invoices']} "
+        f"({report['succeeded']} ok / {report['failed']} failed)"
+    )
+    print(f"CONCURRENCY: {report['concurrency']}")
+    print(f"WALL TIME:  {report['wall_time_sec']}s")
+    print(f"THROUGHPUT: {report['throughput_invoices_per_min']} invoices/min")
+
+    print(f"\n[PER-NODE LATENCY (s)]")
+    if not report["node_latency_sec"]:
+        print("  ⚪ No successful runs to summarise.")
+    for node_name, stats in report["node_latency_sec"].items():
+        cache_hits = report["node_llm_cache_hits"].get(node_name, 0)
+        print(
+            f"  {node_name}: n={stats['count']} p50={stats['p50']} "
+            f"p90={stats['p90']} p99={stats['p99']} max={stats['max']} "
+            f"llm_cache_hits={cache_hits}"
+        )
+
+    print(f"\n[LLM CALLS PER AGENT]")
+    if not report["llm_calls"]:
+        print("  ⚪ No LLM calls recorded.")
+    for node_name, stats in report["llm_calls"].items():
+        print(
+            f"  {node_name}: calls={stats['calls']} cache_hits={stats['cache_hits']} "
+            f"errors={stats['errors']} retries={stats['retries']} "
+            f"tokens={stats['prompt_tokens']}+{stats['completion_tokens']}"
+        )
+        print(
+            f"    queue_wait p50={stats['queue_wait_sec']['p50']} max={stats['queue_wait_sec']['max']} | "
+            f"response p50={stats['response_sec']['p50']} p90={stats['response_sec']['p90']} | "
+            f"parse p50={stats['parse_sec']['p50']}"
+        )
+
+    fast_path = report["matching_fast_path"]
+    print(f"\n[DECISIONS WITHOUT LLM]")
+    print(
+        f"  matching: fast_path={fast_path['fast_path']} llm={fast_path['llm']} "
+        f"rate={fast_path['fast_path_rate']:.0%} "
+        f"estimated_saved={format_saved(fast_path['estimated_saved_sec'])}"
+    )
+    for stage in ("validation", "resolution"):
+        rules = report[f"{stage}_rules"]
+        print(
+            f"  {stage}: rules={rules['fast_path']} llm={rules['llm']} "
+            f"rate={rules['fast_path_rate']:.0%} "
+            f"estimated_saved={format_saved(rules['estimated_saved_sec'])}"
+        )
+
+    if report.get("ocr_cache"):
+        ocr_cache = report["ocr_cache"]
+        print(f"\n[OCR PAGE CACHE]")
+        print(
+            f"  hits={ocr_cache['hits']} misses={ocr_cache['misses']} "
+            f"hit_rate={ocr_cache['hit_rate']:.0%} "
+            f"size={ocr_cache['size_bytes'] / 1024:.1f}KB / {ocr_cache['max_bytes'] / 1024:.0f}KB"
+        )
+
+    if report["failures"]:
+        print(f"\n[FAILURES]")
+        for failure in report["failures"]:
+            print(f"  🚨 {failure['file_name']}: {failure['error']}")
+
+    print("═" * 60)
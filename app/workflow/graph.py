@@ -5,11 +5,17 @@ from app.pdf_data_extraction.extract import process_file
 from app.ai.document_extraction import validate_invoice
 from app.ai.matching import match_invoice_with_db
 from app.ai.validation import validate_invoice_with_po
-from app.ai.resolution import resolve_invoice_findings
+from app.ai.resolution import decide_resolution
 from app.audit.document_extraction_trail import log_document_intelligence_agent_results
 from app.audit.matching_trail import log_matching_agent_results
 from app.audit.audit_validation_trail import log_validation_agent_results
 from app.audit.resolution_trail import log_resolution_agent_results
+from app.llm.cache import track_cache_hits
+from app.llm.telemetry import track_llm_calls
+from app.utils.tracing import span, traced
+from app.matching.context import MatchingContext
+from app.validation.rules import rule_engine_stats
+from app.resolution.rules import resolution_rule_stats
 from app.models.discrepancies_models.DocumentIntelligenceDiscrepancies import (
     CreditNoteDiscrepancy,
     CurrencyMismatchDiscrepancy,
@@ -24,6 +30,7 @@ import time
 
 
 # Create nodes (functions)
+@traced("document_intelligence_agent")
 async def document_extraction_and_validation_node(
     state: GraphState,
 ):
@@ -35,14 +42,16 @@ async def document_extraction_and_validation_node(
     try:
         file_name = state.file_name
 
-        # Extract the text from the given file
-        file_processing_result = await process_file(file_name)
+        with track_cache_hits() as cache_hits, track_llm_calls() as llm_calls:
+            # Extract the text from the given file
+            file_processing_result = await process_file(file_name)
 
-        # Validate the invoice results
-        result = await validate_invoice(file_processing_result["content"])
+            # Validate the invoice results
+            result = await validate_invoice(file_processing_result["content"])
 
         # --- LOG CONFIDENCE SCORES & REASONING ---
-        log_document_intelligence_agent_results(result)
+        with span("audit.log"):
+            log_document_intelligence_agent_results(result)
 
         duration = round(time.perf_counter() - starttime, 3)
 
@@ -55,6 +64,8 @@ async def document_extraction_and_validation_node(
             "discrepancies": result.discrepancies or [],
             "last_node_triggered": "document_intelligence_node",
             "execution_times": {node_name: duration},
+            "llm_cache_hits": {node_name: len(cache_hits)},
+            "llm_calls": {node_name: llm_calls},
         }
 
     except Exception as e:
@@ -63,6 +74,7 @@ async def document_extraction_and_validation_node(
         raise e  ## Re-raise
 
 
+@traced("document_matching_agent")
 async def matching_node(state: GraphState):
     print("\n" + "=" * 60)
     print("---DOCUMENT MATCHING AGENT NODE---")
@@ -74,18 +86,36 @@ async def matching_node(state: GraphState):
         if invoice is None:
             raise ValueError("No extracted invoice data.")
 
-        result = await match_invoice_with_db(invoice)
+        matching_context = MatchingContext(invoice)
+        with track_cache_hits() as cache_hits, track_llm_calls() as llm_calls:
+            result = await match_invoice_with_db(invoice, context=matching_context)
 
         # --- LOG CONFIDENCE SCORES & REASONING ---
-        log_matching_agent_results(result)
+        with span("audit.log"):
+            log_matching_agent_results(result)
+        print(
+            f"[Matching Decision]: {matching_context.decision} "
+            f"({matching_context.decision_sec}s)"
+        )
 
         duration = round(time.perf_counter() - starttime, 3)
 
         return {
             "matching_agent_state": result,
+            "matching_context": matching_context,
+            "matching_decision": matching_context.decision,
             "discrepancies": result.discrepancies or [],
             "last_node_triggered": "po_matching_node",
-            "execution_times": {node_name: duration},
+            "execution_times": {
+                node_name: duration,
+                **{
+                    f"{node_name}.{tier}": tier_time
+                    for tier, tier_time in matching_context.tier_times.items()
+                },
+                f"{node_name}.decision": matching_context.decision_sec,
+            },
+            "llm_cache_hits": {node_name: len(cache_hits)},
+            "llm_calls": {node_name: llm_calls},
         }
 
     except Exception as e:
@@ -94,6 +124,7 @@ async def matching_node(state: GraphState):
         raise e  ## Re-raise
 
 
+@traced("auditing_and_validation_agent")
 async def auditing_validation_node(state: GraphState):
     print("\n" + "=" * 60)
     print("---AUDITING AND VALIDATION AGENT NODE---")
@@ -113,18 +144,36 @@ async def auditing_validation_node(state: GraphState):
         if matched_po_number is None:
             raise ValueError("No Matching PO Number.")
 
-        result = await validate_invoice_with_po(invoice, matched_po_number)
+        ## Reuse the matching node's pairings and price checks
+        matching_context = state.matching_context or MatchingContext(invoice)
+        with track_cache_hits() as cache_hits, track_llm_calls() as llm_calls:
+            result = await validate_invoice_with_po(
+                invoice, matched_po_number, context=matching_context
+            )
 
         # --- LOG CONFIDENCE SCORES & REASONING ---
-        log_validation_agent_results(result)
+        with span("audit.log"):
+            log_validation_agent_results(result)
+
+        print(f"[Matching Context]: {matching_context.stats()}")
+        print(
+            f"[Validation Decision]: {matching_context.validation_decision} "
+            f"({matching_context.validation_decision_sec}s) | {rule_engine_stats()}"
+        )
 
         duration = round(time.perf_counter() - starttime, 3)
 
         return {
             "audit_validation_agent_state": result,
+            "validation_decision": matching_context.validation_decision,
             "discrepancies": result.discrepancies or [],
             "last_node_triggered": "audit_and_validation_node",
-            "execution_times": {node_name: duration},
+            "execution_times": {
+                node_name: duration,
+                f"{node_name}.decision": matching_context.validation_decision_sec,
+            },
+            "llm_cache_hits": {node_name: len(cache_hits)},
+            "llm_calls": {node_name: llm_calls},
         }
     except Exception as e:
         duration = round(time.perf_counter() - starttime, 3)
@@ -132,6 +181,7 @@ async def auditing_validation_node(state: GraphState):
         raise e  ## Re-raise
 
 
+@traced("resolution_recommendation_agent")
 async def resolution_node(state: GraphState):
     print("\n" + "=" * 60)
     print("---RESOLUTION AGENT NODE---")
@@ -141,21 +191,33 @@ async def resolution_node(state: GraphState):
         if state.early_exit:
             print("Early Exit Triggered -> Resolving Based on accumulated data yet.")
 
-        result = await resolve_invoice_findings(
-            state.document_intelligence_agent_state,
-            state.matching_agent_state,
-            state.audit_validation_agent_state,
-        )
+        with track_cache_hits() as cache_hits, track_llm_calls() as llm_calls:
+            result, resolution_decision, decision_sec = await decide_resolution(
+                state.document_intelligence_agent_state,
+                state.matching_agent_state,
+                state.audit_validation_agent_state,
+            )
 
         # --- LOG CONFIDENCE SCORES & REASONING ---
-        log_resolution_agent_results(result)
+        with span("audit.log"):
+            log_resolution_agent_results(result)
+        print(
+            f"[Resolution Decision]: {resolution_decision} ({decision_sec}s) | "
+            f"{resolution_rule_stats()}"
+        )
 
         duration = round(time.perf_counter() - starttime, 3)
 
         return {
             "resolution_agent_state": result,
+            "resolution_decision": resolution_decision,
             "last_node_triggered": "resolution_node",
-            "execution_times": {node_name: duration},
+            "execution_times": {
+                node_name: duration,
+                f"{node_name}.decision": decision_sec,
+            },
+            "llm_cache_hits": {node_name: len(cache_hits)},
+            "llm_calls": {node_name: llm_calls},
         }
         
     except Exception as e: